@@ -1,91 +1,394 @@
-import os
+import codecs
+import io
+import posixpath
+import shlex
+import time
+from collections import deque
+from filesystem import DiskFileSystem, normalize_path
+from registry import CommandError, CommandRegistry, ErrorOutput, ShellArgumentParser, non_negative_int
+
+TAIL_DEFAULT_LINES = 10
+TAIL_BLOCK_SIZE = 8192  # Размер блока при чтении файла с конца
+
+# Команды из плагинов: модуль импортируется при первом вызове команды
+PLUGIN_COMMANDS = {
+    "find": "search:find_command",
+    "grep": "search:grep_command",
+    "cat": "text_commands:cat_command",
+    "head": "text_commands:head_command",
+    "wc": "text_commands:wc_command",
+    "sort": "text_commands:sort_command",
+}
 
 class CommandExecutor:
-    def __init__(self, vfs_root, current_dir):
+    def __init__(self, vfs_root, current_dir, fs=None, registry=None):
         """Инициализация исполнителя команд."""
         self.vfs_root = vfs_root
         self.current_dir = current_dir
+        # По умолчанию VFS - распакованная на диск директория vfs_root
+        self.fs = fs if fs is not None else DiskFileSystem(vfs_root)
+        self.registry = registry if registry is not None else create_registry()
+        self.follow_interval = 1.0  # Период опроса файла в режиме tail -f, с
+        self.stdin = None  # Входные строки команды внутри конвейера
+        self.cancelled = False  # Выставляется, когда вывод команды больше не нужен
 
     def execute(self, command):
-        parts = command.split(maxsplit=1)
-        cmd = parts[0]
-        arg = parts[1] if len(parts) > 1 else ""
-
-        if cmd == "ls":
-            return self.ls(arg)
-        elif cmd == "cd":
-            return self.cd(arg)
-        elif cmd == "pwd":
-            return self.pwd()
-        elif cmd == "tail":
-            return self.tail(arg)
-        elif cmd == "exit":
-            return "Exiting..."
-        else:
-            return f"Error: Unknown command '{command}'"
+        """Выполнение команды или конвейера 'cmd1 | cmd2 > file'.
+
+        Команды конвейера связаны итераторами строк: следующая команда
+        получает вывод предыдущей в executor.stdin и читает его лениво,
+        поэтому промежуточный вывод целиком в памяти не собирается.
+        """
+        try:
+            stages, redirect = parse_pipeline(split_command(command))
+        except (ValueError, CommandError) as e:
+            return ErrorOutput(f"Error: {e}")
+        if not stages:
+            return None
+
+        output = None
+        for i, args in enumerate(stages):
+            stdin = iter_lines(output) if i > 0 else None
+            output = self.run_command(args, stdin)
+            # Ошибка прерывает конвейер; файл перенаправления при этом не создаётся
+            if isinstance(output, ErrorOutput):
+                return output
+        if redirect is None:
+            return output
+        try:
+            self.write_output(output, *redirect)
+        except (OSError, CommandError) as e:
+            return ErrorOutput(f"Error: Cannot write to '{redirect[1]}': {e}")
+        return None
+
+    def run_command(self, args, stdin=None):
+        """Выполнение одной команды; stdin - итератор входных строк или None.
+
+        Ошибка команды (CommandError) возвращается как ErrorOutput.
+        """
+        cmd = args[0]
+        self.stdin = stdin
+        try:
+            if self.registry.get(cmd) is None:
+                raise CommandError(f"Unknown command '{shlex.join(args)}'")
+            return self.registry.call(cmd, self, args[1:])
+        except CommandError as e:
+            return ErrorOutput(f"Error: {e}")
+        finally:
+            self.stdin = None
+
+    def write_output(self, output, mode, file_name):
+        """Перенаправление вывода в файл VFS ('>' - перезапись, '>>' - дописывание)."""
+        if self.fs.read_only:
+            raise CommandError("VFS is read-only")
+        path = self.resolve(file_name)
+        if self.fs.isdir(path):
+            raise CommandError("is a directory")
+        with self.fs.open_write(path, append=mode == ">>") as file:
+            for line in iter_lines(output):
+                file.write(line.encode("utf-8") + b"\n")
 
-    def ls(self, directory=""):
+    def resolve(self, path):
+        """Абсолютный путь VFS относительно текущей директории."""
+        return normalize_path(posixpath.join(self.current_dir, path))
+
+    def ls(self, args=()):
         """Вывод содержимого текущей директории или указанной поддиректории."""
+        directory = args[0] if args else ""
+        target_path = self.current_dir
+        if directory:
+            target_path = self.resolve(directory)
+            if not self.fs.exists(target_path):
+                raise CommandError(f"'{directory}' does not exist.")
+            if not self.fs.isdir(target_path):
+                raise CommandError(f"'{directory}' is not a directory.")
         try:
-            base_path = os.path.join(self.vfs_root, self.current_dir.strip("/"))
-            if directory:
-                target_path = os.path.join(base_path, directory)
-                if not os.path.exists(target_path):
-                    return f"Error: '{directory}' does not exist."
-                if os.path.isdir(target_path):
-                    contents = os.listdir(target_path)
-                    return "\n".join(contents) if contents else "No files or directories."
-                return f"Error: '{directory}' is not a directory."
-            else:
-                contents = os.listdir(base_path)
-                return "\n".join(contents) if contents else "No files or directories."
+            contents = self.fs.listdir(target_path)
         except Exception as e:
-            return f"Error accessing directory contents: {e}"
+            raise CommandError(f"Cannot access directory contents: {e}")
+        return "\n".join(contents) if contents else "No files or directories."
 
-    def cd(self, new_dir):
+    def cd(self, args=()):
         """Изменение текущей директории."""
+        new_dir = args[0] if args else ""
         if not new_dir:
-            return "Error: No directory specified."
+            raise CommandError("No directory specified.")
 
         if new_dir == "..":
             if self.current_dir == "/":
-                return "Error: Already at root directory."
+                raise CommandError("Already at root directory.")
             else:
-                self.current_dir = os.path.dirname(self.current_dir.strip("/"))
-                self.current_dir = "/" + self.current_dir if self.current_dir else "/"
+                self.current_dir = posixpath.dirname(normalize_path(self.current_dir))
                 return None
 
         if new_dir == ".":
-            return "Error: Already in the current directory."
+            raise CommandError("Already in the current directory.")
 
-        target_dir = os.path.join(self.vfs_root, self.current_dir.strip("/"), new_dir)
-        target_dir = os.path.normpath(target_dir)
+        target_dir = self.resolve(new_dir)
 
-        if not os.path.exists(target_dir) or not os.path.isdir(target_dir):
-            return f"Error: Directory '{new_dir}' does not exist."
+        if not self.fs.isdir(target_dir):
+            raise CommandError(f"Directory '{new_dir}' does not exist.")
 
-        self.current_dir = os.path.relpath(target_dir, self.vfs_root)
-        if not self.current_dir.startswith("/"):
-            self.current_dir = "/" + self.current_dir
+        self.current_dir = target_dir
         return None
 
-    def pwd(self):
+    def pwd(self, args=()):
         """Вывод текущей директории."""
         return self.current_dir
 
-    def tail(self, file_name):
-        """Вывод последних строк файла."""
+    def exit(self, args=()):
+        return "Exiting..."
+
+    def cmdstats(self, args=()):
+        """Число вызовов и время выполнения каждой команды."""
+        lines = []
+        for name, (calls, total) in sorted(self.registry.stats.items()):
+            lines.append(f"{name}: {calls} calls, {total * 1000:.3f} ms total, {total / calls * 1000:.3f} ms avg")
+        return "\n".join(lines) if lines else "No commands executed yet."
+
+    def cachestats(self, args=()):
+        """Вывод счётчиков кэша директорий."""
+        if not hasattr(self.fs, "stats"):
+            return "Directory cache is disabled."
+        stats = self.fs.stats()
+        lookups = stats["hits"] + stats["misses"]
+        hit_rate = stats["hits"] / lookups * 100 if lookups else 0.0
+        return (
+            f"Directory cache: {stats['hits']} hits, {stats['misses']} misses "
+            f"({hit_rate:.1f}% hit rate), {stats['invalidations']} invalidations, "
+            f"{stats['size']}/{stats['maxsize']} entries"
+        )
+
+    def tail(self, args=()):
+        """Вывод последних строк (или байтов) файла: tail [-n N] [-c BYTES] [-f] file."""
+        options = TAIL_PARSER.parse(args)
+        file_name = options.file
+        if not file_name and self.stdin is not None:
+            if options.bytes is not None or options.follow:
+                raise CommandError("tail: only -n is supported for piped input")
+            # Из входного потока держим в памяти только последние строки
+            return iter(deque(self.stdin, maxlen=options.lines) if options.lines else ())
         if not file_name:
-            return "Error: No file name provided."
+            raise CommandError("No file name provided.")
 
-        file_path = os.path.join(self.vfs_root, self.current_dir.strip("/"), file_name)
+        file_path = self.resolve(file_name)
 
-        if not os.path.exists(file_path) or not os.path.isfile(file_path):
-            return f"Error: File '{file_name}' does not exist."
+        if not self.fs.isfile(file_path):
+            raise CommandError(f"File '{file_name}' does not exist.")
 
         try:
-            with open(file_path, "r") as file:
-                lines = file.readlines()
-                return "".join(lines[-10:]) if lines else "File is empty."
+            with self.fs.open(file_path) as file:
+                if options.bytes is not None:
+                    data = read_last_bytes(file, options.bytes, self.fs.fast_seek)
+                else:
+                    data = read_last_lines(file, options.lines, self.fs.fast_seek)
+                offset = file.tell()
         except Exception as e:
-            return f"Error reading file '{file_name}': {e}"
+            raise CommandError(f"Cannot read file '{file_name}': {e}")
+
+        text = decode_text(data)
+        if not options.follow or self.fs.read_only:
+            if not data and offset == 0:
+                return "File is empty."
+            return text
+        return self._follow_output(text, file_path, offset)
+
+    def _follow_output(self, text, file_path, offset):
+        """Вывод хвоста файла, а затем строк, дописываемых в него."""
+        yield from text.splitlines()
+        yield from self.follow(file_path, offset)
+
+    def follow(self, file_path, offset, interval=None, max_polls=None):
+        """Генератор строк, дописываемых в файл после позиции offset.
+
+        Файл не перечитывается: опрашивается только его конец, а при
+        усечении файла чтение начинается сначала.
+        """
+        interval = self.follow_interval if interval is None else interval
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        pending = ""
+        polls = 0
+        with self.fs.open(file_path) as file:
+            file.seek(offset)
+            while (max_polls is None or polls < max_polls) and not self.cancelled:
+                chunk = file.read(TAIL_BLOCK_SIZE)
+                if chunk:
+                    pending += decoder.decode(chunk)
+                    *lines, pending = pending.split("\n")
+                    for line in lines:
+                        yield line.rstrip("\r")
+                    continue
+                if self.fs.getsize(file_path) < file.tell():
+                    file.seek(0)
+                    pending = ""
+                    continue
+                polls += 1
+                time.sleep(interval)
+
+
+TAIL_PARSER = ShellArgumentParser("tail")
+TAIL_PARSER.add_argument("-n", dest="lines", type=non_negative_int, default=TAIL_DEFAULT_LINES)
+TAIL_PARSER.add_argument("-c", dest="bytes", type=non_negative_int)
+TAIL_PARSER.add_argument("-f", dest="follow", action="store_true")
+TAIL_PARSER.add_argument("file", nargs="?", default="")
+
+
+def create_registry():
+    """Таблица встроенных команд и команд из плагинов."""
+    registry = CommandRegistry()
+    for name in ("ls", "cd", "pwd", "tail", "cachestats", "cmdstats", "exit"):
+        registry.register(name, getattr(CommandExecutor, name))
+    for name, target in PLUGIN_COMMANDS.items():
+        registry.register_plugin(name, target)
+    return registry
+
+
+def read_last_lines(file, count, from_end=True, block_size=TAIL_BLOCK_SIZE):
+    """Последние count строк бинарного файла.
+
+    При from_end файл читается блоками от конца, пока не наберётся count
+    переводов строк, так что объём чтения зависит от размера вывода, а не
+    от размера файла. Иначе файл читается один раз потоком, а в памяти
+    держатся только последние count строк.
+    """
+    if count == 0:
+        file.seek(0, io.SEEK_END)
+        return b""
+    if not from_end:
+        return b"".join(deque(file, maxlen=count))
+
+    end = file.seek(0, io.SEEK_END)
+    position = end
+    blocks = []
+    newlines = 0
+    # Нужен ещё один перевод строки перед первой из выводимых строк
+    while position > 0 and newlines <= count:
+        size = min(block_size, position)
+        position -= size
+        file.seek(position)
+        block = file.read(size)
+        blocks.append(block)
+        newlines += block.count(b"\n")
+    file.seek(end)
+    data = b"".join(reversed(blocks))
+    return b"".join(data.splitlines(keepends=True)[-count:])
+
+
+def read_last_bytes(file, count, from_end=True, block_size=TAIL_BLOCK_SIZE):
+    """Последние count байт бинарного файла."""
+    if from_end:
+        end = file.seek(0, io.SEEK_END)
+        file.seek(max(0, end - count))
+        return file.read(count)
+    data = b""
+    while True:
+        block = file.read(block_size)
+        if not block:
+            return data[-count:] if count else b""
+        data = (data + block)[-count:] if count else b""
+
+
+class Operator(str):
+    """Оператор конвейера или перенаправления, записанный без кавычек."""
+
+
+OPERATOR_CHARS = "|>"
+
+
+def split_command(command):
+    """Разбиение строки на слова и операторы '|', '>' и '>>'.
+
+    Правила кавычек - как в shlex (posix): '...' без экранирования, "..." и
+    вне кавычек - обратная косая черта. Операторами (Operator) становятся
+    только символы '|' и '>' вне кавычек, поэтому grep '>' a.txt ищет '>'.
+    """
+    tokens = []
+    word = []
+    in_word = False  # Пустые кавычки '' тоже дают слово
+    i = 0
+    while i < len(command):
+        char = command[i]
+        if char in "'\"":
+            end = i + 1
+            while True:
+                if end >= len(command):
+                    raise ValueError("No closing quotation")
+                if command[end] == char:
+                    break
+                if char == '"' and command[end] == "\\" and end + 1 < len(command) and command[end + 1] in '"\\':
+                    end += 1
+                word.append(command[end])
+                end += 1
+            in_word = True
+            i = end + 1
+        elif char == "\\":
+            if i + 1 >= len(command):
+                raise ValueError("No escaped character")
+            word.append(command[i + 1])
+            in_word = True
+            i += 2
+        elif char.isspace() or char in OPERATOR_CHARS:
+            if in_word:
+                tokens.append("".join(word))
+                word = []
+                in_word = False
+            if char in OPERATOR_CHARS:
+                end = i
+                while end < len(command) and command[end] in OPERATOR_CHARS:
+                    end += 1
+                tokens.append(Operator(command[i:end]))
+                i = end
+            else:
+                i += 1
+        else:
+            word.append(char)
+            in_word = True
+            i += 1
+    if in_word:
+        tokens.append("".join(word))
+    return tokens
+
+
+def parse_pipeline(tokens):
+    """Список команд конвейера и перенаправление (режим, файл) или None."""
+    stages = [[]]
+    redirect = None
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if redirect is not None:
+            raise CommandError(f"unexpected '{token}' after redirection")
+        if not isinstance(token, Operator):
+            stages[-1].append(token)
+        elif token == "|":
+            if not stages[-1]:
+                raise CommandError("empty command in pipeline")
+            stages.append([])
+        elif token in (">", ">>"):
+            if not stages[-1] or i + 1 >= len(tokens) or isinstance(tokens[i + 1], Operator):
+                raise CommandError(f"syntax error near '{token}'")
+            redirect = (str(token), tokens[i + 1])
+            i += 1
+        else:
+            raise CommandError(f"syntax error near '{token}'")
+        i += 1
+    if not stages[-1]:
+        if len(stages) > 1:
+            raise CommandError("empty command in pipeline")
+        return [], redirect
+    return stages, redirect
+
+
+def iter_lines(output):
+    """Вывод команды (строка, итератор строк или None) как итератор строк."""
+    if output is None:
+        return iter(())
+    if isinstance(output, str):
+        return iter(output.splitlines())
+    return iter(output)
+
+
+def decode_text(data):
+    """Декодирование байтов файла с приведением переводов строк к '\n'."""
+    text = data.decode("utf-8", errors="replace")
+    return text.replace("\r\n", "\n").replace("\r", "\n")
@@ -0,0 +1,237 @@
+import os
+import posixpath
+import threading
+import zipfile
+from collections import OrderedDict
+
+
+def normalize_path(path):
+    """Приведение пути VFS к абсолютному виду '/a/b' без '.' и '..'."""
+    return posixpath.normpath("/" + path.strip("/"))
+
+
+class DiskFileSystem:
+    """VFS поверх распакованной на диск директории."""
+
+    read_only = False
+    fast_seek = True
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+
+    def real_path(self, path):
+        """Путь на диске для пути VFS."""
+        relative = normalize_path(path).lstrip("/")
+        return os.path.join(self.root, relative) if relative else self.root
+
+    def exists(self, path):
+        return os.path.exists(self.real_path(path))
+
+    def isdir(self, path):
+        return os.path.isdir(self.real_path(path))
+
+    def isfile(self, path):
+        return os.path.isfile(self.real_path(path))
+
+    def listdir(self, path):
+        return os.listdir(self.real_path(path))
+
+    def scandir(self, path):
+        """Содержимое директории: {имя: является ли директорией}."""
+        with os.scandir(self.real_path(path)) as entries:
+            return {entry.name: entry.is_dir() for entry in entries}
+
+    def getsize(self, path):
+        return os.path.getsize(self.real_path(path))
+
+    def getmtime(self, path):
+        return os.stat(self.real_path(path)).st_mtime_ns
+
+    def open(self, path):
+        """Открытие файла на чтение в бинарном режиме."""
+        return open(self.real_path(path), "rb")
+
+    def open_write(self, path, append=False):
+        """Открытие файла на запись в бинарном режиме."""
+        return open(self.real_path(path), "ab" if append else "wb")
+
+
+class ZipFileSystem:
+    """VFS только для чтения, читающая файлы прямо из ZIP-архива.
+
+    Индекс директорий строится один раз по центральному каталогу архива,
+    поэтому ничего не распаковывается на диск, а содержимое файлов
+    читается потоком только при обращении к ним.
+    """
+
+    read_only = True
+    # Распакованный поток перематывается назад только повторной
+    # распаковкой с начала, поэтому читать файл с конца блоками невыгодно
+    fast_seek = False
+
+    def __init__(self, zip_path):
+        self.zip_path = os.path.abspath(zip_path)
+        self._zip = zipfile.ZipFile(self.zip_path, "r")
+        self._dirs = {"/": {}}  # путь директории -> {имя: является ли директорией}
+        self._files = {}  # путь файла -> ZipInfo
+        for info in self._zip.infolist():
+            path = normalize_path(info.filename)
+            if path == "/":
+                continue
+            if info.is_dir():
+                self._add_dir(path)
+            else:
+                self._add_dir(posixpath.dirname(path))
+                self._dirs[posixpath.dirname(path)][posixpath.basename(path)] = False
+                self._files[path] = info
+
+    def _add_dir(self, path):
+        """Регистрация директории вместе со всеми её родителями."""
+        while path not in self._dirs:
+            self._dirs[path] = {}
+            parent = posixpath.dirname(path)
+            self._dirs.setdefault(parent, {})[posixpath.basename(path)] = True
+            path = parent
+
+    def close(self):
+        self._zip.close()
+
+    def exists(self, path):
+        path = normalize_path(path)
+        return path in self._dirs or path in self._files
+
+    def isdir(self, path):
+        return normalize_path(path) in self._dirs
+
+    def isfile(self, path):
+        return normalize_path(path) in self._files
+
+    def listdir(self, path):
+        path = normalize_path(path)
+        if path not in self._dirs:
+            if path in self._files:
+                raise NotADirectoryError(f"Not a directory: '{path}'")
+            raise FileNotFoundError(f"No such directory: '{path}'")
+        return list(self._dirs[path])
+
+    def scandir(self, path):
+        self.listdir(path)
+        return dict(self._dirs[normalize_path(path)])
+
+    def getsize(self, path):
+        return self._get_info(path).file_size
+
+    def getmtime(self, path):
+        # Архив неизменяем, поэтому время изменения любого пути постоянно
+        if not self.exists(path):
+            raise FileNotFoundError(f"No such file or directory: '{path}'")
+        return 0
+
+    def open(self, path):
+        """Потоковое чтение файла из архива без распаковки на диск."""
+        return self._zip.open(self._get_info(path), "r")
+
+    def open_write(self, path, append=False):
+        raise PermissionError("VFS is read-only")
+
+    def _get_info(self, path):
+        path = normalize_path(path)
+        if path not in self._files:
+            raise FileNotFoundError(f"No such file: '{path}'")
+        return self._files[path]
+
+
+class CachedFileSystem:
+    """LRU-кэш содержимого директорий поверх другой VFS.
+
+    Ключ кэша - нормализованный путь директории, значение - её содержимое
+    вместе с типами записей, так что exists/isdir/isfile отвечают по кэшу
+    родительской директории. Запись проверяется одним stat директории и
+    сбрасывается при изменении её mtime. Путь, который не является
+    директорией (например, файл), кэшируется так же - со значением None.
+    """
+
+    def __init__(self, fs, maxsize=1024):
+        self.fs = fs
+        self.maxsize = maxsize
+        self.read_only = fs.read_only
+        self.fast_seek = fs.fast_seek
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()  # путь -> (mtime, {имя: является ли директорией} или None)
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # Остальные операции (open, getsize, ...) выполняются без кэша
+        return getattr(self.fs, name)
+
+    def exists(self, path):
+        return self._lookup(path) is not None
+
+    def isdir(self, path):
+        return self._lookup(path) is True
+
+    def isfile(self, path):
+        return self._lookup(path) is False
+
+    def listdir(self, path):
+        return list(self.scandir(path))
+
+    def scandir(self, path):
+        entries = self._listing(normalize_path(path))
+        if entries is None:
+            raise FileNotFoundError(f"No such directory: '{path}'")
+        return dict(entries)
+
+    def stats(self):
+        """Счётчики попаданий и промахов кэша."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _lookup(self, path):
+        """Тип записи по кэшу родителя: True - директория, False - файл, None - нет."""
+        path = normalize_path(path)
+        if path == "/":
+            return True if self._listing(path) is not None else None
+        entries = self._listing(posixpath.dirname(path))
+        if entries is None:
+            return None
+        return entries.get(posixpath.basename(path))
+
+    def _listing(self, path):
+        """Содержимое директории из кэша; None, если это не директория."""
+        try:
+            mtime = self.fs.getmtime(path)
+        except OSError:
+            with self._lock:
+                self._entries.pop(path, None)
+            return None
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached is not None and cached[0] == mtime:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return cached[1]
+            if cached is not None:
+                self.invalidations += 1
+            self.misses += 1
+        try:
+            entries = self.fs.scandir(path)
+        except OSError:
+            entries = None  # Не директория: повторный вызов ответит по кэшу
+        with self._lock:
+            self._entries[path] = (mtime, entries)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entries
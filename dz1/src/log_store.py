@@ -0,0 +1,299 @@
+import argparse
+import csv
+import os
+import struct
+import sys
+import zlib
+from datetime import datetime
+
+# Журнал - последовательность независимых сегментов. Заголовок сегмента:
+# сигнатура, число записей, минимальное и максимальное время, длина списка
+# пользователей и длина сжатых данных. За ним идут имена пользователей
+# сегмента и сжатые zlib записи. По заголовку и списку пользователей можно
+# решить, нужен ли сегмент запросу, не распаковывая его.
+SEGMENT_MAGIC = b"SLG1"
+SEGMENT_HEADER = struct.Struct("<4sIddII")
+RECORD_HEADER = struct.Struct("<ddIII")  # время, длительность, длины строк
+SEGMENT_RECORDS = 4096  # Записей в полном сегменте
+# Хвост журнала (path + ".tail") - записи, ещё не попавшие в сегмент, без сжатия.
+# В начале хвоста - размер журнала при его создании: если журнал с тех пор
+# вырос, записи хвоста уже сохранены в сегменте.
+TAIL_SUFFIX = ".tail"
+TAIL_HEADER = struct.Struct("<Q")
+
+
+class LogRecord:
+    """Запись журнала: пользователь, команда, время (unix), директория, длительность (с)."""
+
+    __slots__ = ("username", "command", "timestamp", "cwd", "duration")
+
+    def __init__(self, username, command, timestamp=0.0, cwd="", duration=0.0):
+        self.username = username
+        self.command = command
+        self.timestamp = timestamp
+        self.cwd = cwd
+        self.duration = duration
+
+    def as_row(self):
+        """Строка в формате session_log.csv."""
+        return [
+            self.username,
+            self.command,
+            datetime.fromtimestamp(self.timestamp).isoformat(timespec="milliseconds") if self.timestamp else "",
+            self.cwd,
+            f"{self.duration * 1000:.3f}",
+        ]
+
+
+class SegmentLogWriter:
+    """Запись журнала сжатыми сегментами с индексом по пользователям и времени.
+
+    Записи копятся в памяти и пишутся сегментом по segment_records штук
+    (неполный сегмент - только при закрытии). sync() не режет сегмент:
+    новые записи дописываются в хвост журнала, который сбрасывается на диск.
+    После сбоя записи хвоста восстанавливаются при следующем открытии.
+    """
+
+    def __init__(self, path, segment_records=SEGMENT_RECORDS, compression_level=6):
+        check_segment_log(path)
+        self.path = path
+        self.segment_records = segment_records
+        self.compression_level = compression_level
+        self._file = open(path, "ab")
+        self._tail_path = os.fspath(path) + TAIL_SUFFIX
+        self._tail = None
+        self._tail_count = 0  # Сколько записей из _pending уже в хвосте
+        self._pending = read_tail(path, os.path.getsize(path))
+        if self._pending:
+            self._rewrite_tail()
+        elif os.path.exists(self._tail_path):
+            os.remove(self._tail_path)  # Устаревший хвост: его записи уже в сегменте
+
+    def write(self, records):
+        for record in records:
+            self._pending.append(record)
+            if len(self._pending) >= self.segment_records:
+                self._write_segment()
+
+    def sync(self):
+        """Сброс на диск всех записанных записей без создания нового сегмента."""
+        if self._tail_count == len(self._pending):
+            return
+        if self._tail is None:
+            self._rewrite_tail()
+            return
+        self._tail.write(encode_records(self._pending[self._tail_count:]))
+        self._tail.flush()
+        os.fsync(self._tail.fileno())
+        self._tail_count = len(self._pending)
+
+    def close(self):
+        if not self._file.closed:
+            self._write_segment()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _rewrite_tail(self):
+        """Новый хвост со всеми незаписанными в сегмент записями (атомарно, через замену файла)."""
+        if self._tail is not None:
+            self._tail.close()
+        self._file.flush()
+        temp_path = self._tail_path + ".tmp"
+        with open(temp_path, "wb") as tail:
+            tail.write(TAIL_HEADER.pack(self._file.tell()) + encode_records(self._pending))
+            tail.flush()
+            os.fsync(tail.fileno())
+        os.replace(temp_path, self._tail_path)
+        self._tail = open(self._tail_path, "ab")
+        self._tail_count = len(self._pending)
+
+    def _write_segment(self):
+        if not self._pending:
+            return
+        records, self._pending = self._pending, []
+        compressed = zlib.compress(encode_records(records), self.compression_level)
+        users = "\n".join(sorted({record.username for record in records})).encode("utf-8")
+        timestamps = [record.timestamp for record in records]
+        header = SEGMENT_HEADER.pack(
+            SEGMENT_MAGIC, len(records), min(timestamps), max(timestamps), len(users), len(compressed)
+        )
+        self._file.write(header + users + compressed)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        # Записи хвоста теперь в сегменте; если удалить хвост не успели, он устарел по размеру журнала
+        if self._tail is not None:
+            self._tail.close()
+            self._tail = None
+        if os.path.exists(self._tail_path):
+            os.remove(self._tail_path)
+        self._tail_count = 0
+
+
+class SegmentLogReader:
+    """Чтение сегментного журнала с распаковкой только подходящих сегментов."""
+
+    def __init__(self, path):
+        self.path = path
+        self.segments_total = 0
+        self.segments_read = 0
+
+    def query(self, username=None, since=None, until=None):
+        """Записи пользователя username с временем в [since, until], включая хвост журнала."""
+        with open(self.path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            while True:
+                header = file.read(SEGMENT_HEADER.size)
+                if not header:
+                    break
+                if len(header) < SEGMENT_HEADER.size:
+                    raise ValueError(f"Truncated segment header in '{self.path}'.")
+                magic, count, min_ts, max_ts, users_size, payload_size = SEGMENT_HEADER.unpack(header)
+                if magic != SEGMENT_MAGIC:
+                    raise ValueError(f"'{self.path}' is not a segment log.")
+                users = file.read(users_size).decode("utf-8").split("\n")
+                self.segments_total += 1
+                if (
+                    username is not None and username not in users
+                    or since is not None and max_ts < since
+                    or until is not None and min_ts > until
+                ):
+                    file.seek(payload_size, os.SEEK_CUR)
+                    continue
+                self.segments_read += 1
+                yield from self._matching(decode_segment(zlib.decompress(file.read(payload_size))),
+                                          username, since, until)
+        yield from self._matching(read_tail(self.path, size), username, since, until)
+
+    @staticmethod
+    def _matching(records, username, since, until):
+        for record in records:
+            if username is not None and record.username != username:
+                continue
+            if since is not None and record.timestamp < since or until is not None and record.timestamp > until:
+                continue
+            yield record
+
+
+def check_segment_log(path):
+    """Ошибка, если непустой файл - не сегментный журнал (например, session_log.csv)."""
+    try:
+        with open(path, "rb") as file:
+            magic = file.read(len(SEGMENT_MAGIC))
+    except FileNotFoundError:
+        return
+    if magic and magic != SEGMENT_MAGIC:
+        raise ValueError(f"'{path}' is not a segment log; use a separate file for the segment format.")
+
+
+def encode_records(records):
+    payload = bytearray()
+    for record in records:
+        fields = [value.encode("utf-8") for value in (record.username, record.command, record.cwd)]
+        payload += RECORD_HEADER.pack(record.timestamp, record.duration, *map(len, fields))
+        for field in fields:
+            payload += field
+    return bytes(payload)
+
+
+def decode_segment(payload, partial=False):
+    """Записи из несжатых данных; partial - оборванная запись в конце допустима (хвост после сбоя)."""
+    offset = 0
+    while offset < len(payload):
+        if partial and offset + RECORD_HEADER.size > len(payload):
+            return
+        timestamp, duration, *sizes = RECORD_HEADER.unpack_from(payload, offset)
+        offset += RECORD_HEADER.size
+        if partial and offset + sum(sizes) > len(payload):
+            return
+        fields = []
+        for size in sizes:
+            fields.append(payload[offset:offset + size].decode("utf-8"))
+            offset += size
+        username, command, cwd = fields
+        yield LogRecord(username, command, timestamp, cwd, duration)
+
+
+def read_tail(path, log_size):
+    """Записи хвоста журнала, если он относится к журналу размера log_size, иначе []."""
+    try:
+        with open(os.fspath(path) + TAIL_SUFFIX, "rb") as file:
+            data = file.read()
+    except FileNotFoundError:
+        return []
+    if len(data) < TAIL_HEADER.size or TAIL_HEADER.unpack_from(data)[0] != log_size:
+        return []
+    return list(decode_segment(data[TAIL_HEADER.size:], partial=True))
+
+
+def read_csv_log(csv_path):
+    """Записи из session_log.csv (старые строки - только пользователь и команда).
+
+    Строки, не являющиеся UTF-8, декодируются как windows-1251.
+    """
+    def lines():
+        with open(csv_path, "rb") as file:
+            for raw in file:
+                try:
+                    yield raw.decode("utf-8")
+                except UnicodeDecodeError:
+                    yield raw.decode("windows-1251", errors="replace")
+
+    for row in csv.reader(lines()):
+        if len(row) < 2:
+            continue
+        timestamp = datetime.fromisoformat(row[2]).timestamp() if len(row) > 2 and row[2] else 0.0
+        cwd = row[3] if len(row) > 3 else ""
+        duration = float(row[4]) / 1000 if len(row) > 4 and row[4] else 0.0
+        yield LogRecord(row[0], row[1], timestamp, cwd, duration)
+
+
+def convert_csv(csv_path, log_path, segment_records=SEGMENT_RECORDS):
+    """Перевод session_log.csv в сегментный журнал; возвращает число записей."""
+    count = 0
+    with SegmentLogWriter(log_path, segment_records) as writer:
+        for record in read_csv_log(csv_path):
+            writer.write([record])
+            count += 1
+    return count
+
+
+def parse_time(value):
+    return datetime.fromisoformat(value).timestamp() if value else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Segment session log tool")
+    commands = parser.add_subparsers(dest="command", required=True)
+    convert = commands.add_parser("convert", help="Convert session_log.csv to the segment format")
+    convert.add_argument("csv_path")
+    convert.add_argument("log_path")
+    convert.add_argument("--segment-records", type=int, default=SEGMENT_RECORDS)
+    query = commands.add_parser("query", help="Print matching records as CSV rows")
+    query.add_argument("log_path")
+    query.add_argument("--user", help="Only commands of this user")
+    query.add_argument("--since", help="ISO date/time, inclusive")
+    query.add_argument("--until", help="ISO date/time, inclusive")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "convert":
+            count = convert_csv(args.csv_path, args.log_path, args.segment_records)
+            print(f"Converted {count} records to {args.log_path}")
+            return
+        reader = SegmentLogReader(args.log_path)
+        writer = csv.writer(sys.stdout)
+        for record in reader.query(args.user, parse_time(args.since), parse_time(args.until)):
+            writer.writerow(record.as_row())
+        print(f"Decompressed {reader.segments_read} of {reader.segments_total} segments", file=sys.stderr)
+    except (OSError, ValueError, zlib.error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import argparse
+import importlib
+import threading
+import time
+from collections.abc import Iterator
+
+
+class CommandError(Exception):
+    """Ошибка выполнения команды (в том числе в её аргументах)."""
+
+
+class ErrorOutput(str):
+    """Сообщение об ошибке команды: отличается от обычного вывода типом, а не текстом."""
+
+
+def non_negative_int(value):
+    """Тип аргумента: целое число не меньше нуля."""
+    if not value.isdigit():
+        raise ValueError(value)
+    return int(value)
+
+
+class ShellArgumentParser(argparse.ArgumentParser):
+    """Разбор аргументов команды, который не завершает процесс при ошибке."""
+
+    def __init__(self, prog, **kwargs):
+        super().__init__(prog=prog, add_help=False, exit_on_error=False, **kwargs)
+
+    def error(self, message):
+        raise CommandError(f"{self.prog}: {message}")
+
+    def parse(self, args):
+        try:
+            return self.parse_args(args)
+        except argparse.ArgumentError as e:
+            raise CommandError(f"{self.prog}: {e}")
+
+
+class CommandRegistry:
+    """Таблица команд: имя -> обработчик handler(executor, args).
+
+    Команды из плагинов регистрируются строкой 'модуль:атрибут' и
+    импортируются только при первом вызове, поэтому их число не влияет на
+    время запуска. Для каждой команды считаются вызовы и суммарное время.
+    """
+
+    def __init__(self):
+        self._commands = {}
+        self._plugins = {}
+        self.stats = {}  # имя -> [число вызовов, суммарное время в секундах]
+        self._timing = threading.local()  # Время вложенных замеров в текущем потоке
+
+    def register(self, name, handler):
+        self._commands[name] = handler
+        self._plugins.pop(name, None)
+
+    def register_plugin(self, name, target):
+        """Регистрация команды из плагина без его импорта."""
+        module_name, _, attribute = target.partition(":")
+        if not module_name or not attribute:
+            raise ValueError(f"Invalid plugin target '{target}', expected 'module:attribute'.")
+        self._plugins[name] = target
+        self._commands.pop(name, None)
+
+    def get(self, name):
+        handler = self._commands.get(name)
+        if handler is None and name in self._plugins:
+            handler = self._load(name)
+        return handler
+
+    def is_loaded(self, name):
+        return name in self._commands
+
+    def names(self):
+        return sorted(set(self._commands) | set(self._plugins))
+
+    def call(self, name, executor, args):
+        """Вызов команды с замером времени.
+
+        Если команда возвращает итератор (find, grep, cat, sort, tail -f),
+        время учитывается и по мере чтения её вывода.
+        """
+        handler = self.get(name)
+        if handler is None:
+            raise KeyError(name)
+        stats = self.stats.setdefault(name, [0, 0.0])
+        stats[0] += 1
+        result = self._measure(stats, handler, executor, args)
+        if not isinstance(result, Iterator):
+            return result
+        return self._timed(stats, result)
+
+    def _measure(self, stats, func, *args):
+        """Вызов func с добавлением собственного времени к stats.
+
+        Время вложенных замеров (например, предыдущей команды конвейера,
+        из которой читается stdin) вычитается, чтобы не считать его дважды.
+        """
+        outer = getattr(self._timing, "nested", 0.0)
+        self._timing.nested = 0.0
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            stats[1] += elapsed - self._timing.nested
+            self._timing.nested = outer + elapsed
+
+    def _timed(self, stats, iterator):
+        """Итератор, который добавляет к stats время получения каждого элемента."""
+        try:
+            while True:
+                try:
+                    item = self._measure(stats, next, iterator)
+                except StopIteration:
+                    return
+                yield item
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    def _load(self, name):
+        module_name, _, attribute = self._plugins[name].partition(":")
+        try:
+            handler = getattr(importlib.import_module(module_name), attribute)
+        except (ImportError, AttributeError) as e:
+            raise CommandError(f"{name}: cannot load plugin '{self._plugins[name]}': {e}")
+        self._commands[name] = handler
+        del self._plugins[name]
+        return handler
@@ -0,0 +1,219 @@
+import codecs
+import fnmatch
+import posixpath
+import queue
+import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from registry import CommandError, ShellArgumentParser
+
+SEARCH_WORKERS = 4  # Потоков для параллельного просмотра файлов
+SEARCH_CHUNK_SIZE = 64 * 1024  # Файлы читаются кусками, а не целиком
+SEARCH_QUEUE_BATCHES = 16  # Пакетов совпадений в очереди одного файла
+
+
+def walk(fs, top):
+    """Обход дерева VFS в глубину: пары (путь, является ли директорией).
+
+    Директории читаются по мере обхода, поэтому первые результаты
+    появляются сразу, не дожидаясь просмотра всего дерева.
+    """
+    if not fs.isdir(top):
+        yield top, False
+        return
+    yield top, True
+    stack = [(top, iter(sorted(fs.scandir(top).items())))]
+    while stack:
+        directory, entries = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+        name, is_dir = entry
+        path = posixpath.join(directory, name)
+        yield path, is_dir
+        if is_dir:
+            try:
+                stack.append((path, iter(sorted(fs.scandir(path).items()))))
+            except OSError:
+                continue
+
+
+def find_paths(fs, top, name_pattern=None, entry_type=None):
+    """Пути VFS под top, подходящие под маску имени и тип ('f' или 'd')."""
+    for path, is_dir in walk(fs, top):
+        if entry_type == "f" and is_dir or entry_type == "d" and not is_dir:
+            continue
+        if name_pattern is not None and not fnmatch.fnmatchcase(posixpath.basename(path), name_pattern):
+            continue
+        yield path
+
+
+def grep_file(fs, path, regex, chunk_size=SEARCH_CHUNK_SIZE):
+    """Совпадения regex в файле пакетами: список пар (номер строки, строка) на каждый кусок.
+
+    Файл читается кусками по chunk_size байт, в памяти держится только
+    текущий кусок, незавершённая строка и совпадения в нём.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    line_number = 0
+    with fs.open(path) as file:
+        while True:
+            chunk = file.read(chunk_size)
+            pending += decoder.decode(chunk, final=not chunk)
+            lines = pending.split("\n")
+            pending = lines.pop() if chunk else ""
+            matches = []
+            for line in lines:
+                line_number += 1
+                line = line.rstrip("\r")
+                if regex.search(line):
+                    matches.append((line_number, line))
+            if matches:
+                yield matches
+            if not chunk:
+                return
+
+
+def grep_files(fs, files, regex, workers=SEARCH_WORKERS, chunk_size=SEARCH_CHUNK_SIZE):
+    """Параллельный поиск по файлам.
+
+    files - пары (метка, путь VFS), результат - тройки (метка, номер
+    строки, строка). Файлы просматриваются пулом потоков, одновременно в
+    работе не больше 4 * workers файлов. Совпадения передаются через
+    ограниченные очереди и выдаются по мере нахождения, в том числе внутри
+    одного файла, в порядке файлов, так что вывод не зависит от числа потоков.
+    """
+    pending = deque()
+    cancelled = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        for label, path in files:
+            batches = queue.Queue(maxsize=SEARCH_QUEUE_BATCHES)
+            pending.append((label, batches))
+            pool.submit(_scan_file, fs, path, regex, chunk_size, batches, cancelled)
+            # Готовые совпадения первого файла выдаются сразу; при полной очереди файлов - с ожиданием
+            while pending:
+                finished = yield from _file_matches(*pending[0], block=len(pending) >= 4 * workers)
+                if not finished:
+                    break
+                pending.popleft()
+        while pending:
+            yield from _file_matches(*pending.popleft())
+    finally:
+        # Если вывод прервали, не дочитываем оставшиеся файлы
+        cancelled.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _scan_file(fs, path, regex, chunk_size, batches, cancelled):
+    """Поиск в файле в потоке пула; пакеты, ошибка OSError и None (конец) - в очередь batches."""
+    try:
+        for matches in grep_file(fs, path, regex, chunk_size):
+            if not _put(batches, matches, cancelled):
+                return
+    except OSError as e:
+        _put(batches, e, cancelled)
+        return
+    _put(batches, None, cancelled)
+
+
+def _put(batches, item, cancelled):
+    """Запись в ограниченную очередь с ожиданием, пока вывод не прервали."""
+    while not cancelled.is_set():
+        try:
+            batches.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _file_matches(label, batches, block=True):
+    """Выдаёт совпадения файла из очереди; возвращает True, когда файл просмотрен."""
+    while True:
+        try:
+            item = batches.get(block=block)
+        except queue.Empty:
+            return False
+        if item is None:
+            return True
+        if isinstance(item, OSError):
+            yield label, None, f"Error reading file: {item}"
+            return True
+        for line_number, line in item:
+            yield label, line_number, line
+
+
+FIND_PARSER = ShellArgumentParser("find")
+FIND_PARSER.add_argument("directory", nargs="?", default=".")
+FIND_PARSER.add_argument("-name", dest="name_pattern")
+FIND_PARSER.add_argument("-type", dest="entry_type", choices=["f", "d"])
+
+GREP_PARSER = ShellArgumentParser("grep")
+GREP_PARSER.add_argument("-r", dest="recursive", action="store_true")
+GREP_PARSER.add_argument("-i", dest="ignore_case", action="store_true")
+GREP_PARSER.add_argument("-n", dest="line_numbers", action="store_true")
+GREP_PARSER.add_argument("pattern")
+GREP_PARSER.add_argument("paths", nargs="*")
+
+
+def find_command(executor, args):
+    """Поиск путей: find [dir] [-name GLOB] [-type f|d]. Результаты выдаются по мере обхода."""
+    options = FIND_PARSER.parse(args)
+    top = executor.resolve(options.directory)
+    if not executor.fs.exists(top):
+        raise CommandError(f"'{options.directory}' does not exist.")
+    paths = find_paths(executor.fs, top, options.name_pattern, options.entry_type)
+    return (display_path(options.directory, top, path) for path in paths)
+
+
+def grep_command(executor, args):
+    """Поиск строк: grep [-r] [-i] [-n] pattern path... Файлы просматриваются параллельно."""
+    options = GREP_PARSER.parse(args)
+    try:
+        regex = re.compile(options.pattern, re.IGNORECASE if options.ignore_case else 0)
+    except re.error as e:
+        raise CommandError(f"grep: invalid pattern '{options.pattern}': {e}")
+    if not options.paths and not options.recursive and executor.stdin is not None:
+        # Фильтр входного потока внутри конвейера
+        return (line for line in executor.stdin if regex.search(line))
+    names = options.paths or (["."] if options.recursive else [])
+    if not names:
+        raise CommandError("No file name provided.")
+
+    targets = []
+    for name in names:
+        path = executor.resolve(name)
+        if not executor.fs.exists(path):
+            raise CommandError(f"File '{name}' does not exist.")
+        if executor.fs.isdir(path) and not options.recursive:
+            raise CommandError(f"'{name}' is a directory.")
+        targets.append((name, path))
+    with_names = options.recursive or len(targets) > 1
+    return _grep_output(executor.fs, targets, regex, with_names, options.line_numbers, SEARCH_WORKERS)
+
+
+def _grep_output(fs, targets, regex, with_names, with_numbers, workers):
+    files = (
+        (display_path(name, top, path), path)
+        for name, top in targets
+        for path, is_dir in walk(fs, top)
+        if not is_dir
+    )
+    for name, line_number, line in grep_files(fs, files, regex, workers):
+        if line_number is None:
+            yield f"Error: '{name}': {line}"
+            continue
+        prefix = f"{name}:" if with_names else ""
+        if with_numbers:
+            prefix += f"{line_number}:"
+        yield prefix + line
+
+
+def display_path(name, top, path):
+    """Путь для вывода: относительно аргумента команды, как в find/grep."""
+    relative = posixpath.relpath(path, top)
+    return name if relative == "." else posixpath.join(name, relative)
@@ -0,0 +1,210 @@
+import asyncio
+import itertools
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from commands import CommandExecutor, iter_lines
+from shell_emulator import batch_stats, format_batch_stats
+
+SERVER_WORKERS = 32  # Потоков для выполнения команд всех сессий
+OUTPUT_QUEUE_SIZE = 4096  # Строк вывода в очереди к клиенту; больше - команда ждёт
+
+_DONE = object()  # Маркер конца вывода команды
+
+
+class Session:
+    """Состояние одного подключения: своя текущая директория и исполнитель команд."""
+
+    def __init__(self, session_id, username, peer, executor):
+        self.session_id = session_id
+        self.username = username
+        self.peer = peer
+        self.executor = executor
+        self.latencies = []
+        self.started = time.perf_counter()
+
+    def stats(self):
+        return batch_stats(self.latencies, time.perf_counter() - self.started)
+
+
+class ShellServer:
+    """Сервер многих сессий эмулятора поверх asyncio (TCP или Unix-сокет).
+
+    Все сессии используют одну VFS (например, общий индекс ZIP-архива)
+    и один журнал сессий. Команды выполняются в пуле потоков, чтобы
+    медленная команда одной сессии не задерживала остальные.
+    """
+
+    def __init__(self, hostname, vfs_root, fs, logger, workers=SERVER_WORKERS, plugins=None):
+        self.hostname = hostname
+        self.vfs_root = vfs_root
+        self.fs = fs
+        self.logger = logger
+        self.plugins = plugins or {}  # Команды из плагинов: {имя: 'модуль:атрибут'}
+        self.sessions = {}
+        self.latencies = []  # Задержки команд всех сессий
+        self.started = time.perf_counter()
+        self.server = None
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="shell-session")
+        # Запись журнала (fsync или ожидание места в очереди) - вне цикла событий, по порядку
+        self._log_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shell-log")
+        self._ids = itertools.count(1)
+
+    async def start(self, host="127.0.0.1", port=0, unix_path=None):
+        if unix_path:
+            self.server = await asyncio.start_unix_server(self.handle, path=unix_path)
+        else:
+            self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        for session in self.sessions.values():
+            session.executor.cancelled = True
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._log_pool.shutdown(wait=True)
+
+    def stats(self):
+        """Суммарная статистика задержек по всем сессиям."""
+        return batch_stats(self.latencies, time.perf_counter() - self.started)
+
+    async def handle(self, reader, writer):
+        """Обслуживание одного подключения."""
+        peer = writer.get_extra_info("peername") or "unix"
+        session = None
+        try:
+            writer.write(b"login: ")
+            await writer.drain()
+            line = await reader.readline()
+            if not line:
+                return
+            username = line.decode("utf-8", errors="replace").strip() or "guest"
+            executor = CommandExecutor(self.vfs_root, "/", self.fs)
+            for name, target in self.plugins.items():
+                executor.registry.register_plugin(name, target)
+            session = Session(next(self._ids), username, peer, executor)
+            self.sessions[session.session_id] = session
+            await self.send(writer, f"Welcome to the shell emulator, {username} on {self.hostname}!")
+
+            while True:
+                writer.write(f"{username}@{self.hostname}:{executor.current_dir}$ ".encode("utf-8"))
+                await writer.drain()
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode("utf-8", errors="replace").strip()
+                if not command:
+                    continue
+                if command == "exit":
+                    await self.log(username, command, executor.current_dir)
+                    await self.send(writer, "Exiting shell emulator.")
+                    break
+                if command == "latency":
+                    await self.send(writer, self.latency_report(session))
+                    continue
+                await self.run_command(session, command, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if session is not None:
+                session.executor.cancelled = True
+                del self.sessions[session.session_id]
+                print(f"Session {session.session_id} ({session.username}, {session.peer}) closed. "
+                      f"{format_batch_stats(session.stats())}")
+            writer.close()
+
+    async def run_command(self, session, command, writer):
+        """Выполнение команды в пуле потоков с потоковой передачей вывода клиенту."""
+        loop = asyncio.get_running_loop()
+        lines = queue.Queue(maxsize=OUTPUT_QUEUE_SIZE)
+        ready = asyncio.Event()
+        cwd = session.executor.current_dir
+        started = time.perf_counter()
+        producer = loop.run_in_executor(self._pool, self._produce, session.executor, command, lines, loop, ready)
+        try:
+            done = False
+            while not done:
+                await ready.wait()
+                ready.clear()
+                batch = []
+                while True:
+                    try:
+                        line = lines.get_nowait()
+                    except queue.Empty:
+                        break
+                    if line is _DONE:
+                        done = True
+                        break
+                    batch.append(line)
+                if batch:
+                    writer.write(("\n".join(batch) + "\n").encode("utf-8"))
+                    await writer.drain()
+            await producer
+        finally:
+            if not producer.done():
+                # Клиент отключился: останавливаем команду и освобождаем очередь
+                session.executor.cancelled = True
+                while not producer.done():
+                    try:
+                        lines.get_nowait()
+                    except queue.Empty:
+                        await asyncio.sleep(0.01)
+        duration = time.perf_counter() - started
+        session.latencies.append(duration)
+        self.latencies.append(duration)
+        await self.log(session.username, command, cwd, duration)
+
+    async def log(self, username, command, cwd, duration=0.0):
+        """Запись команды в журнал в отдельном потоке: медленный диск не задерживает другие сессии."""
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self._log_pool, self.logger.log, username, command, cwd, duration)
+        except Exception as e:
+            print(f"Error logging command: {e}")
+
+    @staticmethod
+    def _produce(executor, command, lines, loop, ready):
+        """Выполнение команды в рабочем потоке и передача строк вывода в очередь."""
+
+        def put(item):
+            lines.put(item)
+            # Будим сессию, только когда очередь была пуста
+            if lines.qsize() == 1 or item is _DONE:
+                loop.call_soon_threadsafe(ready.set)
+
+        try:
+            output = executor.execute(command)
+            for line in iter_lines(output):
+                if executor.cancelled:
+                    break
+                put(line)
+        except Exception as e:
+            put(f"Error: {e}")
+        finally:
+            put(_DONE)
+
+    def latency_report(self, session):
+        return (
+            f"Session {session.session_id}: {format_batch_stats(session.stats())}\n"
+            f"All sessions ({len(self.sessions)} active): {format_batch_stats(self.stats())}"
+        )
+
+    async def send(self, writer, text):
+        writer.write((text + "\n").encode("utf-8"))
+        await writer.drain()
+
+
+async def serve(server, host="127.0.0.1", port=0, unix_path=None):
+    """Запуск сервера до прерывания с выводом итоговой статистики."""
+    await server.start(host, port, unix_path)
+    addresses = ", ".join(str(sock.getsockname()) for sock in server.server.sockets)
+    print(f"Shell server listening on {addresses}")
+    try:
+        await server.server.serve_forever()
+    except asyncio.CancelledError:
+        pass
+    finally:
+        await server.close()
+        print(f"All sessions: {format_batch_stats(server.stats())}")
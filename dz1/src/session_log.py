@@ -0,0 +1,138 @@
+import atexit
+import csv
+import os
+import queue
+import threading
+import time
+from log_store import LogRecord, SegmentLogWriter
+
+# fsync - каждая команда сразу сбрасывается на диск (надёжно, но медленно);
+# batch - команды копятся в очереди и пишутся пачками фоновым потоком
+DURABILITY_MODES = ("fsync", "batch")
+# csv - текстовый session_log.csv; segment - сжатые сегменты с индексом (log_store.py)
+LOG_FORMATS = ("csv", "segment")
+
+_STOP = object()  # Маркер завершения фонового потока
+
+
+class CsvLogWriter:
+    """Запись журнала строками CSV."""
+
+    def __init__(self, path):
+        self._file = open(path, mode="a", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+
+    def write(self, records):
+        self._writer.writerows(record.as_row() for record in records)
+
+    def sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class SessionLogger:
+    """Журнал команд сессии в CSV-файле или сегментном журнале.
+
+    Файл открывается один раз на всю сессию. Строка журнала:
+    пользователь, команда, время, текущая директория, длительность в мс.
+    В формате segment сброшенные пачки дописываются в хвост журнала, а
+    сегмент создаётся по мере накопления записей.
+    """
+
+    def __init__(self, log_path, durability="batch", batch_size=100, flush_interval=1.0, queue_size=10000,
+                 log_format="csv"):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode '{durability}', expected one of {DURABILITY_MODES}.")
+        if log_format not in LOG_FORMATS:
+            raise ValueError(f"Unknown log format '{log_format}', expected one of {LOG_FORMATS}.")
+        self.log_path = log_path
+        self.durability = durability
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.log_format = log_format
+        self._writer = CsvLogWriter(log_path) if log_format == "csv" else SegmentLogWriter(log_path)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._queue = None
+        self._thread = None
+        if durability == "batch":
+            # Ограниченная очередь: при переполнении log() ждёт фоновый поток
+            self._queue = queue.Queue(maxsize=queue_size)
+            self._thread = threading.Thread(target=self._run, name="session-log-writer", daemon=True)
+            self._thread.start()
+        atexit.register(self.close)
+
+    def log(self, username, command, cwd="", duration=0.0, timestamp=None):
+        """Запись команды в журнал."""
+        if self._closed:
+            raise ValueError("Session log is closed.")
+        timestamp = timestamp if timestamp is not None else time.time()
+        record = LogRecord(username, command, timestamp, cwd, duration)
+        if self._queue is None:
+            with self._lock:
+                self._writer.write([record])
+                self._writer.sync()
+        else:
+            self._queue.put(record)
+
+    def flush(self):
+        """Ожидание записи всех поставленных в очередь строк."""
+        if self._queue is not None and not self._closed:
+            done = threading.Event()
+            self._queue.put(done)
+            done.wait()
+
+    def close(self):
+        """Сброс оставшихся строк и закрытие файла журнала."""
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+        with self._lock:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _run(self):
+        """Фоновый поток: сброс пачки по размеру, по таймеру и при завершении."""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                self._write(batch)
+                return
+            if isinstance(item, threading.Event):
+                self._write(batch)
+                batch = []
+                item.set()
+                continue
+            if item is not None:
+                batch.append(item)
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._write(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _write(self, batch):
+        if not batch:
+            return
+        with self._lock:
+            try:
+                self._writer.write(batch)
+                self._writer.sync()
+            except Exception as e:
+                print(f"Error logging command: {e}")
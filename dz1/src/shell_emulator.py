@@ -1,58 +1,222 @@
 import zipfile
 from pathlib import Path
-import csv
 import argparse
+import asyncio
+import csv
+import math
+import sys
+import time
+import xml.etree.ElementTree as ET
 from commands import CommandExecutor
+from filesystem import CachedFileSystem, DiskFileSystem, ZipFileSystem
+from session_log import DURABILITY_MODES, LOG_FORMATS, SessionLogger
 
 
 class ShellEmulator:
-    def __init__(self, username, hostname, vfs_path, log_path):
+    def __init__(self, username, hostname, vfs_path, log_path, fs=None, log_durability="batch",
+                 dir_cache_size=1024, plugins=None, log_format="csv"):
         self.username = username
         self.hostname = hostname
         self.vfs_path = Path(vfs_path).resolve()  # Корень VFS
         self.log_path = Path(log_path).resolve()  # Путь до файла логов
         self.current_dir = "/"  # Начальная директория
-        self.executor = CommandExecutor(str(self.vfs_path), self.current_dir)
+        if fs is None:
+            fs = DiskFileSystem(str(self.vfs_path))
+            # Индекс ZIP и так в памяти, кэшируем только обращения к диску
+            if dir_cache_size > 0:
+                fs = CachedFileSystem(fs, dir_cache_size)
+        self.executor = CommandExecutor(str(self.vfs_path), self.current_dir, fs)
+        # Команды из плагинов: {имя: 'модуль:атрибут'}, импорт при первом вызове
+        for name, target in (plugins or {}).items():
+            self.executor.registry.register_plugin(name, target)
+        # Файл журнала открыт всю сессию, запись идёт пачками в фоне
+        self.logger = SessionLogger(self.log_path, durability=log_durability, log_format=log_format)
 
-    def log_action(self, command):
+    def log_action(self, command, cwd=None, duration=0.0):
         """Логирование команды в CSV файл."""
         try:
-            with open(self.log_path, mode="a", newline="") as log_file:
-                writer = csv.writer(log_file)
-                writer.writerow([self.username, command])
+            cwd = self.current_dir if cwd is None else cwd
+            self.logger.log(self.username, command, cwd, duration)
         except Exception as e:
             print(f"Error logging command: {e}")
 
     def start(self):
         """Запуск эмулятора shell."""
         print(f"Welcome to the shell emulator, {self.username} on {self.hostname}!")
+        try:
+            self.run_loop()
+        finally:
+            self.logger.close()
+
+    def run_loop(self):
         while True:
             try:
                 # Показываем приглашение для ввода с текущей директорией
                 print(f"{self.username}@{self.hostname}:{self.current_dir}$ ", end="")
                 command = input().strip()
 
-                # Логируем команду
-                self.log_action(command)
-
                 # Обработка команды "exit"
                 if command == "exit":
+                    self.log_action(command)
                     print("Exiting shell emulator.")
                     break
 
                 # Выполняем команду
+                cwd = self.current_dir
+                started = time.perf_counter()
                 output = self.executor.execute(command)
 
                 # Выводим результат команды
-                if output:
-                    print(output)
+                if isinstance(output, str):
+                    if output:
+                        print(output)
+                elif output is not None:
+                    # Потоковый вывод (например, tail -f) печатаем построчно
+                    try:
+                        for line in output:
+                            print(line, flush=True)
+                    except KeyboardInterrupt:
+                        print()
+
+                # Логируем команду вместе с длительностью выполнения
+                self.log_action(command, cwd, time.perf_counter() - started)
 
                 # Синхронизируем текущую директорию
                 self.current_dir = self.executor.current_dir
 
+            except EOFError:
+                # Ввод закончился (например, при чтении из канала)
+                print()
+                break
             except Exception as e:
                 print(f"Error: {e}")
 
+    def run_batch(self, commands, out=None, buffer_size=64 * 1024, replay=False):
+        """Пакетное выполнение команд без приглашений.
+
+        Вывод копится в буфере и сбрасывается в out крупными порциями.
+        В режиме replay (проигрывание журнала из многих сессий) команда
+        exit не останавливает выполнение, а начинает новую сессию в '/'.
+        Возвращает статистику производительности (см. batch_stats).
+        """
+        out = out if out is not None else sys.stdout
+        buffer = []
+        buffered = 0
+        latencies = []
+        started = time.perf_counter()
+        for command in commands:
+            command = command.strip()
+            if not command:
+                continue
+            if command == "exit":
+                self.log_action(command)
+                if not replay:
+                    break
+                self.current_dir = self.executor.current_dir = "/"
+                continue
+
+            cwd = self.current_dir
+            command_started = time.perf_counter()
+            try:
+                output = self.executor.execute(command)
+                if isinstance(output, str):
+                    output = [output] if output else None
+                # Пустые строки потокового вывода - тоже вывод (например, cat)
+                for line in output or ():
+                    buffer.append(line)
+                    buffered += len(line) + 1
+            except Exception as e:
+                buffer.append(f"Error: {e}")
+            duration = time.perf_counter() - command_started
+            latencies.append(duration)
+            self.log_action(command, cwd, duration)
+            self.current_dir = self.executor.current_dir
+
+            if buffered >= buffer_size:
+                out.write("\n".join(buffer) + "\n")
+                buffer = []
+                buffered = 0
+        if buffer:
+            out.write("\n".join(buffer) + "\n")
+        out.flush()
+        return batch_stats(latencies, time.perf_counter() - started)
+
+
+def percentile(sorted_values, percent):
+    """Перцентиль отсортированного списка (метод ближайшего ранга)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(percent / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def batch_stats(latencies, total_time):
+    """Пропускная способность и перцентили задержки команд (в мс)."""
+    ordered = sorted(latencies)
+    return {
+        "commands": len(ordered),
+        "total_time": total_time,
+        "commands_per_sec": len(ordered) / total_time if total_time > 0 else 0.0,
+        "p50_ms": percentile(ordered, 50) * 1000,
+        "p90_ms": percentile(ordered, 90) * 1000,
+        "p99_ms": percentile(ordered, 99) * 1000,
+        "max_ms": ordered[-1] * 1000 if ordered else 0.0,
+    }
+
+
+def format_batch_stats(stats):
+    return (
+        f"Executed {stats['commands']} commands in {stats['total_time']:.3f} s "
+        f"({stats['commands_per_sec']:.1f} commands/s)\n"
+        f"Latency: p50 {stats['p50_ms']:.3f} ms, p90 {stats['p90_ms']:.3f} ms, "
+        f"p99 {stats['p99_ms']:.3f} ms, max {stats['max_ms']:.3f} ms"
+    )
+
+
+def read_script(script_path):
+    """Команды из файла сценария ('-' - стандартный ввод).
+
+    Строки журнала сессии (*.csv) тоже можно проигрывать: команда берётся
+    из второго столбца. Пустые строки и комментарии '#' пропускаются.
+    """
+    if script_path == "-":
+        yield from _script_commands(sys.stdin, csv_format=False)
+        return
+    try:
+        with open(script_path, newline="", encoding="utf-8", errors="replace") as script:
+            yield from _script_commands(script, csv_format=script_path.lower().endswith(".csv"))
+    except FileNotFoundError:
+        raise ValueError(f"Error: Script '{script_path}' not found.")
+
+
+def _script_commands(lines, csv_format):
+    if csv_format:
+        for row in csv.reader(lines):
+            if len(row) > 1:
+                yield row[1]
+        return
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line
+
+
+def load_config(config_path):
+    """Чтение config.csv: пути к VFS и стартовому скрипту (относительно конфига)."""
+    try:
+        root = ET.parse(config_path).getroot()
+    except FileNotFoundError:
+        raise ValueError(f"Error: Config '{config_path}' not found.")
+    except ET.ParseError as e:
+        raise ValueError(f"Error: Invalid config '{config_path}': {e}")
+    base = Path(config_path).resolve().parent
+    config = {}
+    for key in ("virtual_filesystem_path", "start_script_path"):
+        value = root.findtext(key)
+        if value and value.strip():
+            config[key] = str(base / value.strip())
+    return config
+
 
 def extract_vfs(vfs_path, extract_to="vfs"):
     """Распаковка виртуальной файловой системы."""
@@ -68,28 +232,108 @@ def extract_vfs(vfs_path, extract_to="vfs"):
         raise ValueError(f"Error extracting VFS: {e}")
 
 
+def open_zip_vfs(vfs_path):
+    """Открытие VFS прямо из ZIP-архива без распаковки."""
+    try:
+        return ZipFileSystem(vfs_path)
+    except zipfile.BadZipFile:
+        raise ValueError(f"Error: '{vfs_path}' is not a valid ZIP file.")
+    except FileNotFoundError:
+        raise ValueError(f"Error: File '{vfs_path}' not found.")
+    except Exception as e:
+        raise ValueError(f"Error indexing VFS: {e}")
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Shell Emulator")
-    parser.add_argument("--username", required=True, help="Username for the shell prompt")
+    parser.add_argument("--username", help="Username for the shell prompt (asked on login in server mode)")
     parser.add_argument("--hostname", required=True, help="Hostname for the shell prompt")
-    parser.add_argument("--vfs", required=True, help="Path to the virtual file system (ZIP file)")
-    parser.add_argument("--log", required=True, help="Path to the log file (CSV format)")
+    parser.add_argument("--vfs", help="Path to the virtual file system (ZIP file)")
+    parser.add_argument("--log", required=True, help="Path to the log file")
+    parser.add_argument("--vfs-mode", choices=["extract", "zip"], default="extract",
+                        help="extract: unpack the ZIP to disk; zip: read-only access straight from the archive")
+    parser.add_argument("--log-durability", choices=DURABILITY_MODES, default="batch",
+                        help="fsync: sync every command to disk; batch: write commands in batches from a background thread")
+    parser.add_argument("--log-format", choices=LOG_FORMATS, default="csv",
+                        help="csv: plain session_log.csv; segment: compressed segments indexed by user and time "
+                             "(query with log_store.py)")
+    parser.add_argument("--dir-cache-size", type=int, default=1024,
+                        help="Number of directory listings kept in the LRU cache (0 disables the cache)")
+    parser.add_argument("--script", help="Run commands from a script file ('-' for stdin, *.csv for a session log) "
+                                         "without prompts and report throughput")
+    parser.add_argument("--config", help="Path to config.csv with the VFS and start script paths")
+    parser.add_argument("--serve", metavar="HOST:PORT",
+                        help="Serve many concurrent sessions over TCP instead of the interactive shell")
+    parser.add_argument("--unix", metavar="PATH", help="Serve many concurrent sessions over a Unix socket")
+    parser.add_argument("--plugin", action="append", default=[], metavar="NAME=MODULE:ATTR",
+                        help="Register a command from a plugin module, imported on first use")
 
     args = parser.parse_args()
 
     try:
+        if args.config:
+            config = load_config(args.config)
+            args.vfs = args.vfs or config.get("virtual_filesystem_path")
+            args.script = args.script or config.get("start_script_path")
+        if not args.vfs:
+            parser.error("the following arguments are required: --vfs (or --config)")
+        server_mode = bool(args.serve or args.unix)
+        if not args.username and not server_mode:
+            parser.error("the following arguments are required: --username")
+        plugins = {}
+        for plugin in args.plugin:
+            name, separator, target = plugin.partition("=")
+            if not separator:
+                parser.error(f"--plugin expects NAME=MODULE:ATTR, got '{plugin}'")
+            plugins[name] = target
+
         # Проверяем, существует ли лог-файл и создаем его, если он отсутствует
         log_path = Path(args.log).resolve()
         if not log_path.exists():
             log_path.parent.mkdir(parents=True, exist_ok=True)
             log_path.touch()
 
-        # Распаковываем VFS
-        vfs_root = extract_vfs(args.vfs)
+        if args.vfs_mode == "zip":
+            # Строим индекс по центральному каталогу архива, ничего не распаковывая
+            fs = open_zip_vfs(args.vfs)
+            vfs_root = args.vfs
+        else:
+            # Распаковываем VFS
+            fs = None
+            vfs_root = extract_vfs(args.vfs)
 
-        # Запускаем эмулятор
-        emulator = ShellEmulator(args.username, args.hostname, vfs_root, log_path)
-        emulator.start()
+        if server_mode:
+            # Одна VFS и один журнал на все сессии сервера
+            from server import ShellServer, serve
+
+            if fs is None:
+                fs = DiskFileSystem(str(vfs_root))
+                if args.dir_cache_size > 0:
+                    fs = CachedFileSystem(fs, args.dir_cache_size)
+            logger = SessionLogger(log_path, durability=args.log_durability, log_format=args.log_format)
+            shell_server = ShellServer(args.hostname, str(vfs_root), fs, logger, plugins=plugins)
+            host, _, port = (args.serve or "").rpartition(":")
+            try:
+                asyncio.run(serve(shell_server, host or "127.0.0.1", int(port or 0), args.unix))
+            except KeyboardInterrupt:
+                pass
+            finally:
+                logger.close()
+        else:
+            # Запускаем эмулятор
+            emulator = ShellEmulator(args.username, args.hostname, vfs_root, log_path, fs,
+                                     log_durability=args.log_durability, dir_cache_size=args.dir_cache_size,
+                                     plugins=plugins, log_format=args.log_format)
+            if args.script:
+                # Пакетный режим: без приглашений, со статистикой в конце
+                try:
+                    replay = args.script.lower().endswith(".csv")
+                    stats = emulator.run_batch(read_script(args.script), replay=replay)
+                finally:
+                    emulator.logger.close()
+                print(format_batch_stats(stats), file=sys.stderr)
+            else:
+                emulator.start()
     except ValueError as ve:
         print(ve)
     except Exception as e:
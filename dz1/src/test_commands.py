@@ -1,7 +1,8 @@
 import unittest
 import tempfile
 import os
-from commands import CommandExecutor
+import io
+from commands import CommandExecutor, read_last_lines
 
 
 class TestCommandExecutor(unittest.TestCase):
@@ -64,6 +65,39 @@ class TestCommandExecutor(unittest.TestCase):
         result = self.executor.execute("tail nonexistent.txt")
         self.assertIn("Error:", result)
 
+    def test_tail_lines_option(self):
+        result = self.executor.execute("tail -n 2 file1.txt")
+        self.assertEqual(result, "Line 4\nLine 5\n")
+        result = self.executor.execute("tail -n1 file2.txt")
+        self.assertEqual(result, "Line E\n")
+
+    def test_tail_bytes_option(self):
+        result = self.executor.execute("tail -c 7 file1.txt")
+        self.assertEqual(result, "Line 5\n")
+
+    def test_tail_invalid_option(self):
+        self.assertIn("Error:", self.executor.execute("tail -n abc file1.txt"))
+        self.assertIn("Error:", self.executor.execute("tail -x file1.txt"))
+
+    def test_read_last_lines_matches_full_read(self):
+        content = b"".join(b"line %d %s\n" % (i, b"x" * (i % 37)) for i in range(500)) + b"no newline"
+        for block_size in (1, 7, 64, 8192):
+            for count in (1, 3, 50, 501, 1000):
+                with self.subTest(block_size=block_size, count=count):
+                    file = io.BytesIO(content)
+                    expected = b"".join(content.splitlines(keepends=True)[-count:])
+                    self.assertEqual(read_last_lines(file, count, True, block_size), expected)
+                    file.seek(0)
+                    self.assertEqual(read_last_lines(file, count, False), expected)
+
+    def test_tail_follow(self):
+        path = os.path.join(self.vfs_root, "file1.txt")
+        offset = os.path.getsize(path)
+        with open(path, "a") as f:
+            f.write("Line 6\nLine 7\npartial")
+        lines = list(self.executor.follow("/file1.txt", offset, interval=0, max_polls=1))
+        self.assertEqual(lines, ["Line 6", "Line 7"])
+
     # Тесты для команды exit
     def test_exit_command(self):
         result = self.executor.execute("exit")
@@ -0,0 +1,120 @@
+import unittest
+import tempfile
+import os
+import zipfile
+from commands import CommandExecutor
+from filesystem import CachedFileSystem, DiskFileSystem, ZipFileSystem, normalize_path
+
+
+class TestZipFileSystem(unittest.TestCase):
+    def setUp(self):
+        """Создание тестового ZIP-архива."""
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.zip_path = os.path.join(self.test_dir.name, "vfs.zip")
+        with zipfile.ZipFile(self.zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("dir1/file1.txt", "Line 1\nLine 2\nLine 3\n")
+            zf.writestr("dir1/nested/deep.txt", "deep\n")
+            zf.writestr("empty_dir/", "")
+            zf.writestr("root.txt", "root\n")
+
+        self.fs = ZipFileSystem(self.zip_path)
+        self.executor = CommandExecutor(self.zip_path, "/", self.fs)
+
+    def tearDown(self):
+        self.fs.close()
+        self.test_dir.cleanup()
+
+    def test_normalize_path(self):
+        self.assertEqual(normalize_path(""), "/")
+        self.assertEqual(normalize_path("dir1/../dir1/./nested/"), "/dir1/nested")
+        self.assertEqual(normalize_path("/../.."), "/")
+
+    def test_index(self):
+        self.assertTrue(self.fs.isdir("/dir1/nested"))
+        self.assertTrue(self.fs.isdir("/empty_dir"))
+        self.assertTrue(self.fs.isfile("/dir1/file1.txt"))
+        self.assertFalse(self.fs.exists("/missing"))
+        self.assertEqual(sorted(self.fs.listdir("/")), ["dir1", "empty_dir", "root.txt"])
+        self.assertEqual(self.fs.getsize("/root.txt"), 5)
+
+    def test_nothing_extracted(self):
+        self.assertEqual(os.listdir(self.test_dir.name), ["vfs.zip"])
+
+    def test_ls_cd_pwd(self):
+        self.assertIn("file1.txt", self.executor.execute("ls dir1"))
+        self.assertIsNone(self.executor.execute("cd dir1/nested"))
+        self.assertEqual(self.executor.execute("pwd"), "/dir1/nested")
+        self.assertEqual(self.executor.execute("ls"), "deep.txt")
+        self.executor.execute("cd ..")
+        self.assertEqual(self.executor.execute("pwd"), "/dir1")
+        self.assertIn("Error:", self.executor.execute("cd file1.txt"))
+
+    def test_tail_streams_from_archive(self):
+        result = self.executor.execute("tail dir1/file1.txt")
+        self.assertEqual(result, "Line 1\nLine 2\nLine 3\n")
+
+
+class TestCachedFileSystem(unittest.TestCase):
+    def setUp(self):
+        """Создание VFS на диске с кэшем директорий."""
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.vfs_root = self.test_dir.name
+        os.makedirs(os.path.join(self.vfs_root, "dir1"))
+        os.makedirs(os.path.join(self.vfs_root, "dir2"))
+        with open(os.path.join(self.vfs_root, "dir1", "file1.txt"), "w") as f:
+            f.write("Line 1\n")
+        self.fs = CachedFileSystem(DiskFileSystem(self.vfs_root), maxsize=2)
+        self.executor = CommandExecutor(self.vfs_root, "/", self.fs)
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def test_hits_and_misses(self):
+        self.assertEqual(sorted(self.fs.listdir("/")), ["dir1", "dir2"])
+        self.assertTrue(self.fs.isdir("/dir1"))
+        self.assertTrue(self.fs.isfile("dir1/file1.txt"))
+        self.assertFalse(self.fs.exists("/dir1/missing.txt"))
+        stats = self.fs.stats()
+        self.assertEqual(stats["misses"], 2)
+        self.assertEqual(stats["hits"], 2)
+
+    def test_file_listing_is_cached(self):
+        for _ in range(3):
+            with self.assertRaises(FileNotFoundError):
+                self.fs.scandir("/dir1/file1.txt")
+        self.assertEqual(self.fs.stats()["misses"], 1)
+        self.assertEqual(self.fs.stats()["hits"], 2)
+
+    def test_invalidation_on_mtime_change(self):
+        self.assertEqual(self.fs.listdir("/dir2"), [])
+        with open(os.path.join(self.vfs_root, "dir2", "new.txt"), "w") as f:
+            f.write("new\n")
+        # Гарантируем изменение mtime даже на ФС с грубым разрешением времени
+        os.utime(os.path.join(self.vfs_root, "dir2"), ns=(0, 10 ** 9))
+        self.assertEqual(self.fs.listdir("/dir2"), ["new.txt"])
+        self.assertEqual(self.fs.stats()["invalidations"], 1)
+
+    def test_lru_eviction(self):
+        self.fs.listdir("/")
+        self.fs.listdir("/dir1")
+        self.fs.listdir("/dir2")
+        self.assertEqual(self.fs.stats()["size"], 2)
+        self.fs.listdir("/dir2")
+        self.fs.listdir("/")
+        self.assertEqual(self.fs.stats()["misses"], 4)
+
+    def test_cachestats_command(self):
+        self.executor.execute("ls")
+        self.executor.execute("cd dir1")
+        self.executor.execute("ls")
+        result = self.executor.execute("cachestats")
+        self.assertIn("Directory cache:", result)
+        self.assertIn("2 misses", result)
+
+    def test_cachestats_without_cache(self):
+        executor = CommandExecutor(self.vfs_root, "/")
+        self.assertEqual(executor.execute("cachestats"), "Directory cache is disabled.")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+import tempfile
+import os
+from datetime import datetime
+from log_store import LogRecord, SegmentLogReader, SegmentLogWriter, convert_csv
+from session_log import SessionLogger
+
+
+class TestSegmentLog(unittest.TestCase):
+    def setUp(self):
+        """Создание журнала из трёх сегментов разных дней и пользователей."""
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.log_path = os.path.join(self.test_dir.name, "session_log.slog")
+        self.day = 24 * 3600
+        with SegmentLogWriter(self.log_path, segment_records=10) as writer:
+            for i in range(30):
+                username = "alice" if i < 20 else "bob"
+                writer.write([LogRecord(username, f"cmd {i}", i // 10 * self.day + i, "/dir", 0.001)])
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def test_query_all(self):
+        records = list(SegmentLogReader(self.log_path).query())
+        self.assertEqual([record.command for record in records], [f"cmd {i}" for i in range(30)])
+        self.assertEqual((records[0].cwd, records[0].duration), ("/dir", 0.001))
+
+    def test_query_skips_segments(self):
+        reader = SegmentLogReader(self.log_path)
+        records = list(reader.query("bob"))
+        self.assertEqual(len(records), 10)
+        self.assertEqual((reader.segments_read, reader.segments_total), (1, 3))
+
+        reader = SegmentLogReader(self.log_path)
+        records = list(reader.query("alice", since=self.day, until=self.day + 15))
+        self.assertEqual([record.command for record in records], [f"cmd {i}" for i in range(10, 16)])
+        self.assertEqual(reader.segments_read, 1)
+
+    def test_convert_csv(self):
+        csv_path = os.path.join(self.test_dir.name, "session_log.csv")
+        with open(csv_path, "wb") as f:
+            f.write(b"admin,ls\r\n")
+            f.write("admin,cd папка\r\n".encode("windows-1251"))
+            f.write(b"bob,pwd,2024-11-18T10:00:00.000,/dir1,1.500\r\n")
+        slog_path = os.path.join(self.test_dir.name, "converted.slog")
+        self.assertEqual(convert_csv(csv_path, slog_path), 3)
+        records = list(SegmentLogReader(slog_path).query())
+        self.assertEqual([record.command for record in records], ["ls", "cd папка", "pwd"])
+        self.assertEqual(records[0].timestamp, 0.0)
+        self.assertEqual(records[2].as_row(), ["bob", "pwd", "2024-11-18T10:00:00.000", "/dir1", "1.500"])
+        since = datetime(2024, 11, 18).timestamp()
+        self.assertEqual(len(list(SegmentLogReader(slog_path).query(since=since))), 1)
+
+    def test_session_logger_segment_format(self):
+        slog_path = os.path.join(self.test_dir.name, "session.slog")
+        with SessionLogger(slog_path, batch_size=2, flush_interval=60, log_format="segment") as logger:
+            for i in range(5):
+                logger.log("admin", f"cd dir{i}", "/")
+        reader = SegmentLogReader(slog_path)
+        self.assertEqual([record.command for record in reader.query("admin")], [f"cd dir{i}" for i in range(5)])
+        # Сброс пачек не режет сегменты
+        self.assertEqual(reader.segments_total, 1)
+
+    def test_sync_uses_tail(self):
+        slog_path = os.path.join(self.test_dir.name, "synced.slog")
+        writer = SegmentLogWriter(slog_path, segment_records=4)
+        for i in range(6):
+            writer.write([LogRecord("admin", f"cmd {i}", i)])
+            writer.sync()
+        # Первые 4 записи - в сегменте, остальные - в хвосте, и читатель видит все
+        reader = SegmentLogReader(slog_path)
+        self.assertEqual([record.command for record in reader.query()], [f"cmd {i}" for i in range(6)])
+        self.assertEqual(reader.segments_total, 1)
+        self.assertTrue(os.path.exists(slog_path + ".tail"))
+
+        # Писатель не закрыт (сбой): записи хвоста восстанавливаются при открытии
+        writer._file.close()
+        writer._tail.close()
+        with SegmentLogWriter(slog_path, segment_records=4) as writer:
+            writer.write([LogRecord("admin", "cmd 6", 6)])
+        reader = SegmentLogReader(slog_path)
+        self.assertEqual([record.command for record in reader.query()], [f"cmd {i}" for i in range(7)])
+        self.assertEqual(reader.segments_total, 2)
+        self.assertFalse(os.path.exists(slog_path + ".tail"))
+
+    def test_stale_tail_is_ignored(self):
+        with open(self.log_path + ".tail", "wb") as f:
+            f.write(b"\0" * 8 + b"garbage")
+        self.assertEqual(len(list(SegmentLogReader(self.log_path).query())), 30)
+        with SegmentLogWriter(self.log_path, segment_records=10):
+            pass
+        self.assertFalse(os.path.exists(self.log_path + ".tail"))
+        self.assertEqual(len(list(SegmentLogReader(self.log_path).query())), 30)
+
+    def test_refuses_csv_log(self):
+        csv_path = os.path.join(self.test_dir.name, "session_log.csv")
+        with open(csv_path, "w") as f:
+            f.write("admin,ls\n")
+        with self.assertRaises(ValueError):
+            SessionLogger(csv_path, log_format="segment")
+        with open(csv_path) as f:
+            self.assertEqual(f.read(), "admin,ls\n")
+
+    def test_not_a_segment_log(self):
+        bad_path = os.path.join(self.test_dir.name, "bad.slog")
+        with open(bad_path, "wb") as f:
+            f.write(b"admin,ls\r\n" * 10)
+        with self.assertRaises(ValueError):
+            list(SegmentLogReader(bad_path).query())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+import tempfile
+import os
+import sys
+import time
+from commands import CommandExecutor
+from registry import CommandError, CommandRegistry
+
+
+class TestCommandRegistry(unittest.TestCase):
+    def setUp(self):
+        """Создание модуля-плагина во временной директории."""
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.plugin_dir = os.path.join(self.test_dir.name, "plugins")
+        os.makedirs(self.plugin_dir)
+        with open(os.path.join(self.plugin_dir, "hello_plugin.py"), "w") as f:
+            f.write("def hello(executor, args):\n    return 'Hello, ' + ' '.join(args) + ' from ' + executor.pwd()\n")
+        sys.path.insert(0, self.plugin_dir)
+        self.executor = CommandExecutor(self.test_dir.name, "/")
+
+    def tearDown(self):
+        sys.path.remove(self.plugin_dir)
+        sys.modules.pop("hello_plugin", None)
+        self.test_dir.cleanup()
+
+    def test_plugin_is_loaded_lazily(self):
+        self.executor.registry.register_plugin("hello", "hello_plugin:hello")
+        self.assertNotIn("hello_plugin", sys.modules)
+        self.assertIn("hello", self.executor.registry.names())
+        self.assertEqual(self.executor.execute("hello 'big world'"), "Hello, big world from /")
+        self.assertIn("hello_plugin", sys.modules)
+        self.assertTrue(self.executor.registry.is_loaded("hello"))
+
+    def test_broken_plugin(self):
+        self.executor.registry.register_plugin("broken", "missing_plugin_module:run")
+        self.assertIn("Error:", self.executor.execute("broken"))
+
+    def test_invalid_plugin_target(self):
+        with self.assertRaises(ValueError):
+            CommandRegistry().register_plugin("bad", "no_attribute")
+
+    def test_call_counts_and_timings(self):
+        self.executor.execute("pwd")
+        self.executor.execute("pwd")
+        self.executor.execute("ls")
+        self.assertEqual(self.executor.registry.stats["pwd"][0], 2)
+        result = self.executor.execute("cmdstats")
+        self.assertIn("pwd: 2 calls", result)
+        self.assertIn("ls: 1 calls", result)
+
+    def test_iterator_timings(self):
+        def slow_lines(executor, args):
+            for i in range(3):
+                time.sleep(0.02)
+                yield str(i)
+
+        def passthrough(executor, args):
+            return (line for line in executor.stdin)
+
+        self.executor.registry.register("slow", slow_lines)
+        self.executor.registry.register("pass", passthrough)
+        self.assertEqual(list(self.executor.execute("slow | pass")), ["0", "1", "2"])
+        calls, total = self.executor.registry.stats["slow"]
+        self.assertEqual(calls, 1)
+        self.assertGreaterEqual(total, 0.06)
+        # Время чтения stdin относится к предыдущей команде конвейера
+        self.assertLess(self.executor.registry.stats["pass"][1], 0.03)
+
+    def test_argument_errors(self):
+        self.assertIn("Error:", self.executor.execute("tail -n"))
+        self.assertIn("Error:", self.executor.execute("ls 'unterminated"))
+
+        def fail(executor, args):
+            raise CommandError("fail: bad arguments")
+
+        registry = CommandRegistry()
+        registry.register("fail", fail)
+        with self.assertRaises(CommandError):
+            registry.call("fail", None, [])
+        self.assertEqual(registry.stats["fail"][0], 1)
+
+    def test_empty_command(self):
+        self.assertIsNone(self.executor.execute("   "))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+import tempfile
+import os
+import re
+from commands import CommandExecutor
+from filesystem import DiskFileSystem
+from search import grep_file, grep_files
+
+
+class TestSearchCommands(unittest.TestCase):
+    def setUp(self):
+        """Создание дерева файлов для поиска."""
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.vfs_root = self.test_dir.name
+        os.makedirs(os.path.join(self.vfs_root, "dir1", "nested"))
+        os.makedirs(os.path.join(self.vfs_root, "dir2"))
+        files = {
+            "dir1/app.log": "INFO start\nERROR disk full\nINFO stop\n",
+            "dir1/nested/deep.log": "ERROR deep\n",
+            "dir2/notes.txt": "привет, мир\nerror in lowercase",
+        }
+        for name, content in files.items():
+            with open(os.path.join(self.vfs_root, name), "w", encoding="utf-8") as f:
+                f.write(content)
+        self.fs = DiskFileSystem(self.vfs_root)
+        self.executor = CommandExecutor(self.vfs_root, "/", self.fs)
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def run_command(self, command):
+        result = self.executor.execute(command)
+        return result if isinstance(result, str) else list(result)
+
+    def test_find_by_name(self):
+        self.assertEqual(self.run_command("find . -name *.log"), ["./dir1/app.log", "./dir1/nested/deep.log"])
+        self.assertEqual(self.run_command("find dir1 -type d"), ["dir1", "dir1/nested"])
+
+    def test_find_errors(self):
+        self.assertIn("Error:", self.run_command("find missing"))
+        self.assertIn("Error:", self.run_command("find . -type x"))
+
+    def test_grep_single_file(self):
+        self.assertEqual(self.run_command("grep ERROR dir1/app.log"), ["ERROR disk full"])
+        self.assertEqual(self.run_command("grep -n INFO dir1/app.log"), ["1:INFO start", "3:INFO stop"])
+
+    def test_grep_recursive(self):
+        self.assertEqual(
+            self.run_command("grep -ri error ."),
+            ["./dir1/app.log:ERROR disk full", "./dir1/nested/deep.log:ERROR deep", "./dir2/notes.txt:error in lowercase"],
+        )
+
+    def test_grep_errors(self):
+        self.assertIn("Error:", self.run_command("grep ERROR dir1"))
+        self.assertIn("Error:", self.run_command("grep ( dir1/app.log"))
+        self.assertIn("Error:", self.run_command("grep ERROR missing.log"))
+
+    def test_grep_file_in_small_chunks(self):
+        regex = re.compile("мир|lower")
+        for chunk_size in (1, 2, 3, 1024):
+            with self.subTest(chunk_size=chunk_size):
+                matches = [match for batch in grep_file(self.fs, "/dir2/notes.txt", regex, chunk_size) for match in batch]
+                self.assertEqual(matches, [(1, "привет, мир"), (2, "error in lowercase")])
+
+    def test_grep_files_keeps_order(self):
+        files = [(str(i), "/dir1/app.log") for i in range(50)]
+        results = list(grep_files(self.fs, files, re.compile("ERROR"), workers=8))
+        self.assertEqual([label for label, _, _ in results], [str(i) for i in range(50)])
+
+    def test_grep_streams_within_file(self):
+        # Первые совпадения большого файла выдаются до того, как файл прочитан целиком
+        with open(os.path.join(self.vfs_root, "big.log"), "w") as f:
+            for i in range(20000):
+                f.write(f"ERROR line {i}\n")
+        opened = []
+        real_open = self.fs.open
+
+        class CountingFile:
+            def __init__(self, file):
+                self.file = file
+                self.read_bytes = 0
+
+            def read(self, size):
+                data = self.file.read(size)
+                self.read_bytes += len(data)
+                return data
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                self.file.close()
+
+        def counting_open(path):
+            opened.append(CountingFile(real_open(path)))
+            return opened[-1]
+
+        self.fs.open = counting_open
+        results = grep_files(self.fs, [("big", "/big.log")], re.compile("ERROR"), workers=1, chunk_size=256)
+        self.assertEqual(next(results), ("big", 1, "ERROR line 0"))
+        size = os.path.getsize(os.path.join(self.vfs_root, "big.log"))
+        self.assertLess(opened[0].read_bytes, size)
+        results.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
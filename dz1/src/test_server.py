@@ -0,0 +1,109 @@
+import unittest
+import tempfile
+import os
+import asyncio
+import time
+import zipfile
+from filesystem import ZipFileSystem
+from server import ShellServer
+from session_log import SessionLogger
+
+
+class TestShellServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        """Запуск сервера с общим индексом ZIP-архива на свободном порту."""
+        self.test_dir = tempfile.TemporaryDirectory()
+        zip_path = os.path.join(self.test_dir.name, "vfs.zip")
+        with zipfile.ZipFile(zip_path, "w") as zf:
+            zf.writestr("dir1/file1.txt", "".join(f"Line {i}\n" for i in range(1, 6)))
+            zf.writestr("dir2/file2.txt", "Line A\n")
+        self.fs = ZipFileSystem(zip_path)
+        self.log_path = os.path.join(self.test_dir.name, "session_log.csv")
+        self.logger = SessionLogger(self.log_path)
+        self.server = ShellServer("mypc", zip_path, self.fs, self.logger, workers=4)
+        await self.server.start("127.0.0.1", 0)
+        self.port = self.server.server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        await self.server.close()
+        self.logger.close()
+        self.fs.close()
+        self.test_dir.cleanup()
+
+    async def connect(self, username):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        await reader.readuntil(b"login: ")
+        writer.write(f"{username}\n".encode())
+        await reader.readuntil(b"$ ")
+        return reader, writer
+
+    async def send_command(self, reader, writer, command):
+        writer.write(f"{command}\n".encode())
+        output = await reader.readuntil(b"$ ")
+        # Последняя строка ответа - приглашение для следующей команды
+        text, _, prompt = output.decode().rpartition("\n")
+        return text
+
+    async def test_sessions_have_own_cwd(self):
+        alice = await self.connect("alice")
+        bob = await self.connect("bob")
+        self.assertEqual(await self.send_command(*alice, "cd dir1"), "")
+        self.assertEqual(await self.send_command(*bob, "cd dir2"), "")
+        self.assertEqual(await self.send_command(*alice, "pwd"), "/dir1")
+        self.assertEqual(await self.send_command(*bob, "pwd"), "/dir2")
+        self.assertEqual(len(self.server.sessions), 2)
+        for reader, writer in (alice, bob):
+            writer.close()
+
+    async def test_concurrent_sessions(self):
+        async def session(i):
+            reader, writer = await self.connect(f"user{i}")
+            result = await self.send_command(reader, writer, "cat dir1/file1.txt | tail -n 2")
+            writer.write(b"exit\n")
+            await reader.read()
+            writer.close()
+            return result
+
+        results = await asyncio.gather(*(session(i) for i in range(20)))
+        self.assertEqual(results, ["Line 4\nLine 5"] * 20)
+        self.assertEqual(self.server.stats()["commands"], 20)
+
+    async def test_latency_report_and_log(self):
+        reader, writer = await self.connect("alice")
+        await self.send_command(reader, writer, "ls")
+        report = await self.send_command(reader, writer, "latency")
+        self.assertIn("Session 1: Executed 1 commands", report)
+        self.assertIn("All sessions (1 active)", report)
+        writer.close()
+        self.logger.flush()
+        with open(self.log_path) as f:
+            self.assertIn("alice,ls,", f.read())
+
+    async def test_slow_log_does_not_block_sessions(self):
+        original_log = self.logger.log
+
+        def log(*args):
+            time.sleep(0.5)  # Медленный диск (fsync)
+            original_log(*args)
+
+        self.logger.log = log
+        alice = await self.connect("alice")
+        bob = await self.connect("bob")
+        alice[1].write(b"ls\n")
+        await asyncio.sleep(0.1)
+        started = time.perf_counter()
+        self.assertIn("Session", await self.send_command(*bob, "latency"))
+        self.assertLess(time.perf_counter() - started, 0.3)
+        await alice[0].readuntil(b"$ ")
+        for reader, writer in (alice, bob):
+            writer.close()
+
+    async def test_plugins(self):
+        self.server.plugins = {"count": "text_commands:wc_command"}
+        reader, writer = await self.connect("alice")
+        self.assertEqual(await self.send_command(reader, writer, "cat dir1/file1.txt | count -l"), "5")
+        writer.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
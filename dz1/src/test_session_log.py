@@ -0,0 +1,68 @@
+import unittest
+import tempfile
+import os
+import csv
+import time
+from session_log import SessionLogger
+
+
+class TestSessionLogger(unittest.TestCase):
+    def setUp(self):
+        """Создание временного файла журнала."""
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.log_path = os.path.join(self.test_dir.name, "session_log.csv")
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def read_rows(self):
+        with open(self.log_path, newline="", encoding="utf-8") as f:
+            return list(csv.reader(f))
+
+    def test_fsync_mode_writes_immediately(self):
+        with SessionLogger(self.log_path, durability="fsync") as logger:
+            logger.log("admin", "ls", "/dir1", 0.0015)
+            rows = self.read_rows()
+        self.assertEqual(len(rows), 1)
+        username, command, timestamp, cwd, duration = rows[0]
+        self.assertEqual((username, command, cwd, duration), ("admin", "ls", "/dir1", "1.500"))
+        self.assertTrue(timestamp)
+
+    def test_batch_mode_flushes_on_close(self):
+        logger = SessionLogger(self.log_path, batch_size=1000, flush_interval=60)
+        for i in range(250):
+            logger.log("admin", f"cd dir{i}")
+        logger.close()
+        rows = self.read_rows()
+        self.assertEqual([row[1] for row in rows], [f"cd dir{i}" for i in range(250)])
+
+    def test_batch_mode_flushes_on_size(self):
+        with SessionLogger(self.log_path, batch_size=2, flush_interval=60) as logger:
+            logger.log("admin", "ls")
+            logger.log("admin", "pwd")
+            deadline = time.monotonic() + 5
+            while len(self.read_rows()) < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(len(self.read_rows()), 2)
+
+    def test_batch_mode_flushes_on_interval(self):
+        with SessionLogger(self.log_path, batch_size=1000, flush_interval=0.05) as logger:
+            logger.log("admin", "ls")
+            deadline = time.monotonic() + 5
+            while not self.read_rows() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(len(self.read_rows()), 1)
+
+    def test_flush(self):
+        with SessionLogger(self.log_path, batch_size=1000, flush_interval=60) as logger:
+            logger.log("admin", "ls")
+            logger.flush()
+            self.assertEqual(len(self.read_rows()), 1)
+
+    def test_unknown_durability(self):
+        with self.assertRaises(ValueError):
+            SessionLogger(self.log_path, durability="never")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import tempfile
+import os
+import io
+from shell_emulator import ShellEmulator, percentile, read_script
+
+
+class TestBatchMode(unittest.TestCase):
+    def setUp(self):
+        """Настройка VFS на диске и журнала сессии."""
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.vfs_root = os.path.join(self.test_dir.name, "vfs")
+        os.makedirs(os.path.join(self.vfs_root, "dir1"))
+        with open(os.path.join(self.vfs_root, "dir1", "file1.txt"), "w") as f:
+            f.write("Line 1\nLine 2\n")
+        self.log_path = os.path.join(self.test_dir.name, "session_log.csv")
+        self.emulator = ShellEmulator("admin", "mypc", self.vfs_root, self.log_path)
+
+    def tearDown(self):
+        self.emulator.logger.close()
+        self.test_dir.cleanup()
+
+    def test_run_batch(self):
+        out = io.StringIO()
+        stats = self.emulator.run_batch(["ls", "cd dir1", "", "pwd", "tail -n 1 file1.txt", "exit", "pwd"], out)
+        self.assertEqual(out.getvalue(), "dir1\n/dir1\nLine 2\n\n")
+        self.assertEqual(stats["commands"], 4)
+        self.assertGreater(stats["commands_per_sec"], 0)
+        self.assertLessEqual(stats["p50_ms"], stats["p99_ms"])
+
+    def test_run_batch_keeps_blank_lines(self):
+        with open(os.path.join(self.vfs_root, "blank.txt"), "w") as f:
+            f.write("a\n\nb\n")
+        out = io.StringIO()
+        self.emulator.run_batch(["cat blank.txt"], out)
+        self.assertEqual(out.getvalue(), "a\n\nb\n")
+
+    def test_run_batch_replay(self):
+        out = io.StringIO()
+        stats = self.emulator.run_batch(["cd dir1", "exit", "pwd"], out, replay=True)
+        self.assertEqual(out.getvalue(), "/\n")
+        self.assertEqual(stats["commands"], 2)
+
+    def test_run_batch_is_logged(self):
+        self.emulator.run_batch(["ls", "cd dir1", "exit"], io.StringIO())
+        self.emulator.logger.close()
+        with open(self.log_path) as f:
+            self.assertEqual(len(f.read().splitlines()), 3)
+
+    def test_read_script(self):
+        script_path = os.path.join(self.test_dir.name, "script.sh")
+        with open(script_path, "w") as f:
+            f.write("# comment\nls\n\ncd dir1\n")
+        self.assertEqual(list(read_script(script_path)), ["ls", "cd dir1"])
+
+    def test_read_script_from_session_log(self):
+        with open(self.log_path, "w") as f:
+            f.write("admin,ls\nadmin,cd dir1,2024-11-18T21:56:00.000,/,0.1\n")
+        self.assertEqual(list(read_script(self.log_path)), ["ls", "cd dir1"])
+
+    def test_read_missing_script(self):
+        with self.assertRaises(ValueError):
+            list(read_script(os.path.join(self.test_dir.name, "missing.sh")))
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([], 50), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
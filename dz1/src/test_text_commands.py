@@ -0,0 +1,106 @@
+import unittest
+import tempfile
+import os
+import random
+from commands import CommandExecutor, parse_pipeline, split_command
+from registry import CommandError, ErrorOutput
+from text_commands import external_sort, numeric_key
+
+
+class TestPipelines(unittest.TestCase):
+    def setUp(self):
+        """Создание VFS с журналом для конвейеров."""
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.vfs_root = self.test_dir.name
+        os.makedirs(os.path.join(self.vfs_root, "logs"))
+        with open(os.path.join(self.vfs_root, "logs", "big.log"), "w") as f:
+            for i in range(1, 101):
+                f.write(f"{'ERROR' if i % 10 == 0 else 'INFO'} event {i}\n")
+        self.executor = CommandExecutor(self.vfs_root, "/")
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def run_command(self, command):
+        result = self.executor.execute(command)
+        return result if result is None or isinstance(result, str) else list(result)
+
+    def test_parse_pipeline(self):
+        stages, redirect = parse_pipeline(split_command("cat a.log|grep 'x | y' | tail -n 5 >> out.txt"))
+        self.assertEqual(stages, [["cat", "a.log"], ["grep", "x | y"], ["tail", "-n", "5"]])
+        self.assertEqual(redirect, (">>", "out.txt"))
+        for command in ("ls |", "| ls", "ls >", "ls > a b", "ls || pwd"):
+            with self.subTest(command=command):
+                with self.assertRaises(CommandError):
+                    parse_pipeline(split_command(command))
+
+    def test_quoted_operators(self):
+        self.assertEqual(parse_pipeline(split_command("grep '>' a.txt")), ([["grep", ">", "a.txt"]], None))
+        self.assertEqual(parse_pipeline(split_command('grep "|" a.txt | wc -l')),
+                         ([["grep", "|", "a.txt"], ["wc", "-l"]], None))
+        self.assertEqual(parse_pipeline(split_command('grep ">>" a.txt > "b|c"')),
+                         ([["grep", ">>", "a.txt"]], (">", "b|c")))
+        self.assertEqual(split_command(r'echo "a \"b\"" c\ d x""y \>'), ["echo", 'a "b"', "c d", "xy", ">"])
+        with open(os.path.join(self.vfs_root, "a.txt"), "w") as f:
+            f.write("x > y\nplain\nx | y\n")
+        self.assertEqual(self.run_command("grep '>' a.txt"), ["x > y"])
+        self.assertEqual(self.run_command('grep "[|]" a.txt'), ["x | y"])
+        with self.assertRaises(ValueError):
+            split_command("grep 'x")
+
+    def test_cat_grep_tail(self):
+        result = self.run_command("cat logs/big.log | grep ERROR | tail -n 2")
+        self.assertEqual(result, ["ERROR event 90", "ERROR event 100"])
+
+    def test_head_and_wc(self):
+        self.assertEqual(self.run_command("cat logs/big.log | head -n 2"), ["INFO event 1", "INFO event 2"])
+        self.assertEqual(self.run_command("grep ERROR logs/big.log | wc -l"), "10")
+        size = os.path.getsize(os.path.join(self.vfs_root, "logs", "big.log"))
+        self.assertEqual(self.run_command("wc logs/big.log"), f"100 300 {size} logs/big.log")
+
+    def test_sort(self):
+        result = self.run_command("grep ERROR logs/big.log | sort -r")
+        self.assertEqual(result[:2], ["ERROR event 90", "ERROR event 80"])
+        self.assertEqual(self.run_command("cat logs/big.log | grep INFO | sort -u | wc -l"), "90")
+        self.assertEqual(self.run_command("ls | sort"), ["logs"])
+
+    def test_redirect(self):
+        self.assertIsNone(self.run_command("grep ERROR logs/big.log | head -n 3 > errors.txt"))
+        self.assertIsNone(self.run_command("pwd >> errors.txt"))
+        self.assertEqual(self.run_command("cat errors.txt"), ["ERROR event 10", "ERROR event 20", "ERROR event 30", "/"])
+        self.assertIn("Error:", self.run_command("ls > logs"))
+        # Ошибка последней команды выводится, а не пишется в файл
+        self.assertIn("Error:", self.run_command("ls missing > out.txt"))
+        self.assertIn("Error:", self.run_command("grep ERROR logs/big.log | tail -n x > errors.txt"))
+        self.assertFalse(os.path.exists(os.path.join(self.vfs_root, "out.txt")))
+        self.assertEqual(self.run_command("cat errors.txt | wc -l"), "4")
+
+    def test_output_that_looks_like_error(self):
+        # Строка "Error:" в данных - обычный вывод, конвейер не прерывается
+        with open(os.path.join(self.vfs_root, "a.txt"), "w") as f:
+            f.write("ok\nError: foo\n")
+        self.assertIsNone(self.run_command("tail -n 1 a.txt > b.txt"))
+        self.assertEqual(self.run_command("cat b.txt"), ["Error: foo"])
+        self.assertEqual(self.run_command("tail -n 1 a.txt | wc -l"), "1")
+
+    def test_errors(self):
+        self.assertIsInstance(self.executor.execute("cat missing.log | wc"), ErrorOutput)
+        self.assertIn("Error:", self.run_command("cat missing.log | wc"))
+        self.assertIn("Error:", self.run_command("ls | unknown"))
+        self.assertIn("Error:", self.run_command("wc"))
+
+
+class TestExternalSort(unittest.TestCase):
+    def test_matches_sorted(self):
+        lines = [f"{random.randint(-1000, 1000)} line" for _ in range(1000)]
+        for chunk_lines in (1, 7, 100, 5000):
+            with self.subTest(chunk_lines=chunk_lines):
+                self.assertEqual(list(external_sort(iter(lines), chunk_lines=chunk_lines)), sorted(lines))
+                self.assertEqual(
+                    list(external_sort(iter(lines), numeric_key, True, chunk_lines)),
+                    sorted(lines, key=numeric_key, reverse=True),
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
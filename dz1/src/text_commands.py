@@ -0,0 +1,156 @@
+import heapq
+import io
+import itertools
+import re
+import tempfile
+from registry import CommandError, ShellArgumentParser, non_negative_int
+
+SORT_CHUNK_LINES = 100000  # Строк в памяти sort; больше - сброс во временные файлы
+READ_CHUNK_SIZE = 64 * 1024
+
+NUMBER = re.compile(r"\s*([-+]?(?:\d+(?:\.\d*)?|\.\d+))")
+
+
+CAT_PARSER = ShellArgumentParser("cat")
+CAT_PARSER.add_argument("files", nargs="*")
+
+HEAD_PARSER = ShellArgumentParser("head")
+HEAD_PARSER.add_argument("-n", dest="lines", type=non_negative_int, default=10)
+HEAD_PARSER.add_argument("file", nargs="?")
+
+WC_PARSER = ShellArgumentParser("wc")
+WC_PARSER.add_argument("-l", dest="lines", action="store_true")
+WC_PARSER.add_argument("-w", dest="words", action="store_true")
+WC_PARSER.add_argument("-c", dest="bytes", action="store_true")
+WC_PARSER.add_argument("file", nargs="?")
+
+SORT_PARSER = ShellArgumentParser("sort")
+SORT_PARSER.add_argument("-r", dest="reverse", action="store_true")
+SORT_PARSER.add_argument("-n", dest="numeric", action="store_true")
+SORT_PARSER.add_argument("-u", dest="unique", action="store_true")
+SORT_PARSER.add_argument("file", nargs="?")
+
+
+def cat_command(executor, args):
+    """Вывод файлов (или входного потока) построчно: cat [file...]."""
+    options = CAT_PARSER.parse(args)
+    if not options.files:
+        return input_lines(executor, None)
+    paths = [check_file(executor, name) for name in options.files]
+    return (line for path in paths for line in iter_file_lines(executor.fs, path))
+
+
+def head_command(executor, args):
+    """Первые строки файла или входного потока: head [-n N] [file]."""
+    options = HEAD_PARSER.parse(args)
+    return itertools.islice(input_lines(executor, options.file), options.lines)
+
+
+def wc_command(executor, args):
+    """Число строк, слов и байт: wc [-l] [-w] [-c] [file]."""
+    options = WC_PARSER.parse(args)
+    if options.file is not None:
+        counts = count_file(executor.fs, check_file(executor, options.file))
+    else:
+        counts = count_lines(input_lines(executor, None))
+    selected = [options.lines, options.words, options.bytes]
+    if not any(selected):
+        selected = [True, True, True]
+    result = " ".join(str(count) for count, shown in zip(counts, selected) if shown)
+    return f"{result} {options.file}" if options.file is not None else result
+
+
+def sort_command(executor, args):
+    """Сортировка строк: sort [-r] [-n] [-u] [file].
+
+    Вход сортируется кусками по SORT_CHUNK_LINES строк; если кусков
+    больше одного, они сбрасываются во временные файлы и сливаются.
+    """
+    options = SORT_PARSER.parse(args)
+    key = numeric_key if options.numeric else None
+    lines = external_sort(input_lines(executor, options.file), key, options.reverse)
+    if options.unique:
+        return (line for line, _ in itertools.groupby(lines))
+    return lines
+
+
+def input_lines(executor, file_name):
+    """Строки файла, если он указан, иначе строки входного потока."""
+    if file_name is not None:
+        return iter_file_lines(executor.fs, check_file(executor, file_name))
+    if executor.stdin is None:
+        raise CommandError("no input: specify a file or use a pipeline")
+    return executor.stdin
+
+
+def check_file(executor, file_name):
+    path = executor.resolve(file_name)
+    if not executor.fs.isfile(path):
+        raise CommandError(f"File '{file_name}' does not exist.")
+    return path
+
+
+def iter_file_lines(fs, path):
+    """Потоковое чтение строк файла VFS без символов перевода строки."""
+    with io.TextIOWrapper(fs.open(path), encoding="utf-8", errors="replace") as file:
+        for line in file:
+            yield line.rstrip("\n")
+
+
+def count_lines(lines):
+    """Число строк, слов и байт (UTF-8) во входном потоке."""
+    line_count = word_count = byte_count = 0
+    for line in lines:
+        line_count += 1
+        word_count += len(line.split())
+        byte_count += len(line.encode("utf-8")) + 1
+    return line_count, word_count, byte_count
+
+
+def count_file(fs, path):
+    """Число переводов строки, слов и байт файла, читаемого кусками."""
+    line_count = word_count = byte_count = 0
+    in_word = False
+    with fs.open(path) as file:
+        while True:
+            chunk = file.read(READ_CHUNK_SIZE)
+            if not chunk:
+                return line_count, word_count, byte_count
+            line_count += chunk.count(b"\n")
+            byte_count += len(chunk)
+            word_count += len(chunk.split())
+            # Слово, разрезанное границей кусков, посчитано дважды
+            if in_word and not chunk[:1].isspace():
+                word_count -= 1
+            in_word = not chunk[-1:].isspace()
+
+
+def numeric_key(line):
+    """Ключ sort -n: число в начале строки (0, если его нет), затем сама строка."""
+    match = NUMBER.match(line)
+    return (float(match.group(1)) if match else 0.0, line)
+
+
+def external_sort(lines, key=None, reverse=False, chunk_lines=SORT_CHUNK_LINES):
+    """Сортировка потока строк с ограниченным расходом памяти."""
+    runs = []
+    try:
+        while True:
+            chunk = list(itertools.islice(lines, chunk_lines))
+            if not runs and len(chunk) < chunk_lines:
+                # Всё поместилось в один кусок - временные файлы не нужны
+                yield from sorted(chunk, key=key, reverse=reverse)
+                return
+            if not chunk:
+                break
+            chunk.sort(key=key, reverse=reverse)
+            run = tempfile.TemporaryFile("w+", encoding="utf-8", newline="\n")
+            runs.append(run)
+            for line in chunk:
+                run.write(line + "\n")
+            run.seek(0)
+        streams = [(line.rstrip("\n") for line in run) for run in runs]
+        yield from heapq.merge(*streams, key=key, reverse=reverse)
+    finally:
+        for run in runs:
+            run.close()
@@ -0,0 +1,141 @@
+import csv
+import json
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import networkx as nx
+
+CSV_FIELDS = ["name", "direct_dependencies", "transitive_dependencies", "fan_in", "transitive_fan_in", "longest_chain"]
+
+
+def reach_masks(dag: nx.DiGraph, order: List[int],
+                stats: Optional[Dict[str, int]] = None) -> Iterator[Tuple[int, int]]:
+    """Пары (компонента, маска достижимых из неё компонент, включая её саму).
+
+    Маски - битовые множества (int) по индексам в order, считаются одним
+    проходом: каждая компонента обрабатывается после всех своих преемников.
+    Маска хранится, только пока её не использовали все предшественники,
+    поэтому в памяти одновременно лишь «фронт» прохода. В худшем случае
+    (широкий граф, где много компонент ждут общих предшественников) это
+    всё ещё O(N^2/8) байт, на деревьях и цепочках - почти линейно.
+    Если передан словарь stats, в нём обновляются live_masks (хранимые
+    сейчас маски) и peak_masks (наибольшее их число за проход).
+    """
+    bits = {component: 1 << index for index, component in enumerate(order)}
+    remaining = {component: dag.in_degree(component) for component in order}
+    reach: Dict[int, int] = {}
+    for component in order:
+        mask = bits[component]
+        for successor in dag.successors(component):
+            mask |= reach[successor]
+            remaining[successor] -= 1
+            if not remaining[successor]:
+                del reach[successor]
+        if remaining[component]:
+            reach[component] = mask
+        if stats is not None:
+            stats["live_masks"] = len(reach)
+            stats["peak_masks"] = max(stats.get("peak_masks", 0), len(reach))
+        yield component, mask
+
+
+def reach_counts(dag: nx.DiGraph, order: List[int], sizes: Dict[int, int]) -> Dict[int, int]:
+    """Число исходных узлов, достижимых из каждой компоненты (включая её саму)."""
+    bits = {component: 1 << index for index, component in enumerate(order)}
+    # Компоненты из нескольких узлов (циклы) весят больше одного бита
+    heavy = [(bits[component], sizes[component] - 1) for component in order if sizes[component] > 1]
+    return {
+        component: mask.bit_count() + sum(extra for bit, extra in heavy if mask & bit)
+        for component, mask in reach_masks(dag, order)
+    }
+
+
+def reach_sums(dag: nx.DiGraph, order: List[int], weights: Dict[int, float]) -> Dict[int, float]:
+    """Сумма весов компонент, достижимых из каждой компоненты (включая её саму).
+
+    Каждая достижимая компонента входит в сумму ровно один раз, даже если
+    до неё ведут несколько путей.
+    """
+    by_bit = [weights[component] for component in order]
+    sums: Dict[int, float] = {}
+    for component, mask in reach_masks(dag, order):
+        # Обходим только установленные биты маски
+        total = 0
+        while mask:
+            low = mask & -mask
+            total += by_bit[low.bit_length() - 1]
+            mask ^= low
+        sums[component] = total
+    return sums
+
+
+def analyze(graph: nx.DiGraph, top: int = 10) -> Dict:
+    """Транзитивные зависимости, самые длинные цепочки и самые используемые пакеты.
+
+    Граф сжимается в DAG компонент сильной связности, по нему считается
+    динамика - без отдельного обхода из каждого узла.
+    """
+    dag = nx.condensation(graph)
+    members = {component: sorted(dag.nodes[component]["members"]) for component in dag}
+    sizes = {component: len(names) for component, names in members.items()}
+    # Обратный топологический порядок: преемники раньше предшественников
+    order = list(reversed(list(nx.topological_sort(dag))))
+    dependencies = reach_counts(dag, order, sizes)
+    dependents = reach_counts(dag.reverse(copy=False), order[::-1], sizes)
+
+    # Самая длинная цепочка (в компонентах) от каждой компоненты вниз
+    longest: Dict[int, int] = {}
+    following: Dict[int, int] = {}
+    for component in order:
+        # При равной длине - по алфавиту, чтобы отчёт не зависел от нумерации компонент
+        best = min(dag.successors(component), key=lambda c: (-longest[c], members[c]), default=None)
+        longest[component] = 1 + (longest[best] if best is not None else 0)
+        if best is not None:
+            following[component] = best
+
+    mapping = dag.graph["mapping"]
+    nodes = []
+    for name in graph:
+        component = mapping[name]
+        nodes.append({
+            "name": name,
+            "direct_dependencies": graph.out_degree(name),
+            "transitive_dependencies": dependencies[component] - 1,
+            "fan_in": graph.in_degree(name),
+            "transitive_fan_in": dependents[component] - 1,
+            "longest_chain": longest[component],
+        })
+
+    starts = sorted((c for c in dag if dag.in_degree(c) == 0), key=lambda c: (-longest[c], members[c]))[:top]
+    chains = []
+    for component in starts:
+        chain = [component_label(members[component])]
+        while component in following:
+            component = following[component]
+            chain.append(component_label(members[component]))
+        chains.append(chain)
+
+    return {
+        "nodes": sorted(nodes, key=lambda node: (-node["transitive_dependencies"], node["name"])),
+        "longest_chains": chains,
+        "top_fan_in": [
+            node["name"] for node in sorted(nodes, key=lambda node: (-node["transitive_fan_in"], node["name"]))[:top]
+        ],
+        "cycles": [names for names in sorted(members.values()) if len(names) > 1],
+    }
+
+
+def component_label(names: List[str]) -> str:
+    """Имя узла цепочки; цикл записывается как {a, b}."""
+    return names[0] if len(names) == 1 else "{" + ", ".join(names) + "}"
+
+
+def save_report(report: Dict, path: str):
+    """Сохраняет отчёт в JSON или (для .csv) таблицу по узлам."""
+    if path.lower().endswith(".csv"):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+            writer.writerows(report["nodes"])
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
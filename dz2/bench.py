@@ -0,0 +1,69 @@
+import argparse
+import os
+import tempfile
+import time
+from importlib import metadata
+from typing import List
+
+from main import DependencyVisualizer
+
+
+def installed_packages(limit: int) -> List[str]:
+    """Имена установленных пакетов в алфавитном порядке."""
+    names = {dist.metadata["Name"] for dist in metadata.distributions() if dist.metadata["Name"]}
+    return sorted(names, key=str.lower)[:limit]
+
+
+def build_graph(config_path: str, roots: List[str], max_depth: int) -> DependencyVisualizer:
+    visualizer = DependencyVisualizer(config_path)
+    for root in roots:
+        visualizer.get_dependencies(root, max_depth=max_depth)
+    return visualizer
+
+
+def write_config(directory: str, resolver: str, workers: int, timeout: float) -> str:
+    path = os.path.join(directory, f"bench_{workers}.toml")
+    with open(path, "w") as f:
+        f.write(
+            f"""
+            graphviz_path = "/usr/bin/dot"
+            package_name = "bench"
+            output_path = "bench.dot"
+            max_depth = 1
+            repository_url = "https://pypi.org"
+            resolver = "{resolver}"
+            workers = {workers}
+            timeout = {timeout}
+            """
+        )
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serial vs concurrent dependency resolution benchmark")
+    parser.add_argument("--resolver", choices=["metadata", "pip"], default="pip")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--packages", type=int, default=30, help="Number of installed packages used as roots")
+    parser.add_argument("--max-depth", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds per package")
+    args = parser.parse_args()
+
+    roots = installed_packages(args.packages)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for workers in (1, args.workers):
+            config_path = write_config(directory, args.resolver, workers, args.timeout)
+            started = time.perf_counter()
+            visualizer = build_graph(config_path, roots, args.max_depth)
+            results[workers] = (time.perf_counter() - started, visualizer)
+
+    serial_time, serial = results[1]
+    pool_time, pooled = results[args.workers]
+    print(f"Roots: {len(roots)}, packages resolved: {serial.lookups}, edges: {serial.graph.number_of_edges()}")
+    print(f"Serial:              {serial_time:.2f} s")
+    print(f"Concurrent ({args.workers} workers): {pool_time:.2f} s ({serial_time / pool_time:.1f}x)")
+    print(f"Same graph: {list(serial.graph.edges) == list(pooled.graph.edges)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import itertools
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, TextIO, Tuple
+
+import networkx as nx
+
+# Строки, которые пишет write_dot: "a" -> "b" [...]; и "a" [key="value", ...];
+QUOTED = r'"((?:[^"\\]|\\.)*)"'
+EDGE_LINE = re.compile(rf"^\s*{QUOTED}\s*->\s*{QUOTED}\s*(?:\[.*\])?\s*;\s*$")
+NODE_LINE = re.compile(rf"^\s*{QUOTED}\s*(?:\[(.*)\])?\s*;\s*$")
+ATTRIBUTE = re.compile(rf"(\w+)={QUOTED}")
+PLACEHOLDER = re.compile(r" \(\+\d+ more\)$")
+
+
+def quote(name: str) -> str:
+    """Имя узла в кавычках DOT с экранированием."""
+    escaped = name.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'"{escaped}"'
+
+
+def unquote(text: str) -> str:
+    """Обратное к quote преобразование содержимого кавычек."""
+    return re.sub(r"\\(.)", lambda match: "\n" if match.group(1) == "n" else match.group(1), text)
+
+
+def read_dot(path: str) -> nx.DiGraph:
+    """Загружает граф, сохранённый write_dot (узлы-заглушки свёртки пропускаются)."""
+    graph = nx.DiGraph()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            match = EDGE_LINE.match(line)
+            if match:
+                source, target = unquote(match.group(1)), unquote(match.group(2))
+                if not PLACEHOLDER.search(target):
+                    graph.add_edge(source, target)
+                continue
+            match = NODE_LINE.match(line)
+            if match and not PLACEHOLDER.search(unquote(match.group(1))):
+                attributes = {key: unquote(value) for key, value in ATTRIBUTE.findall(match.group(2) or "")}
+                graph.add_node(unquote(match.group(1)), **attributes)
+    return graph
+
+
+def graph_roots(graph: nx.DiGraph, roots: Optional[Iterable[str]] = None) -> List[str]:
+    """Корни обхода: заданные, иначе узлы без входящих рёбер.
+
+    Узлы, недостижимые из них (например, циклы), тоже становятся корнями.
+    """
+    first = list(roots) if roots is not None else [node for node in graph if graph.in_degree(node) == 0]
+    result = []
+    reached: Set[str] = set()
+    for node in itertools.chain(first, graph.nodes):
+        if node in reached or node not in graph:
+            continue
+        result.append(node)
+        reached.add(node)
+        stack = [node]
+        while stack:
+            for dep in graph.successors(stack.pop()):
+                if dep not in reached:
+                    reached.add(dep)
+                    stack.append(dep)
+    return result
+
+
+def node_depths(graph: nx.DiGraph, roots: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    """Наименьшая глубина каждого узла от корней."""
+    depths: Dict[str, int] = {}
+    for root in graph_roots(graph, roots):
+        if root in depths:
+            continue
+        depths[root] = 0
+        queue = deque([root])
+        while queue:
+            node = queue.popleft()
+            for dep in graph.successors(node):
+                if dep not in depths:
+                    depths[dep] = depths[node] + 1
+                    queue.append(dep)
+    return depths
+
+
+def collapse_fanout(
+    graph: nx.DiGraph, max_fanout: int, roots: Optional[Iterable[str]] = None
+) -> Tuple[List[Tuple[str, str]], Dict[str, int], Set[str]]:
+    """Рёбра графа, в котором у каждого узла не больше max_fanout зависимостей.
+
+    Лишние зависимости узла скрываются вместе с поддеревьями, которые
+    достижимы только через них. Возвращает видимые рёбра, число скрытых
+    зависимостей по узлам и множество видимых узлов.
+    """
+    edges: List[Tuple[str, str]] = []
+    hidden: Dict[str, int] = {}
+    visible: Set[str] = set()
+    for root in graph_roots(graph, roots):
+        if root in visible:
+            continue
+        visible.add(root)
+        queue = deque([root])
+        while queue:
+            node = queue.popleft()
+            successors = list(graph.successors(node))
+            if len(successors) > max_fanout:
+                hidden[node] = len(successors) - max_fanout
+                successors = successors[:max_fanout]
+            for dep in successors:
+                edges.append((node, dep))
+                if dep not in visible:
+                    visible.add(dep)
+                    queue.append(dep)
+    return edges, hidden, visible
+
+
+def write_dot(
+    graph: nx.DiGraph,
+    file: TextIO,
+    roots: Optional[Iterable[str]] = None,
+    depths: Optional[Dict[str, int]] = None,
+    cluster_by_depth: bool = False,
+    max_fanout: int = 0,
+    node_attributes: Optional[Dict[str, Dict[str, str]]] = None,
+):
+    """Пишет граф в формате DOT прямо в файл, без сборки строки в памяти.
+
+    cluster_by_depth - узлы одной глубины объединяются в кластер;
+    max_fanout - зависимости сверх порога заменяются узлом "(+N more)";
+    node_attributes - атрибуты узлов (label, fillcolor и т. п.).
+    """
+    roots = list(roots) if roots is not None else None
+    if max_fanout > 0:
+        edges, hidden, visible = collapse_fanout(graph, max_fanout, roots)
+    else:
+        edges, hidden, visible = graph.edges, {}, graph.nodes
+
+    file.write("digraph dependencies {\n")
+    if cluster_by_depth:
+        depths = depths if depths is not None else node_depths(graph, roots)
+        levels: Dict[int, List[str]] = {}
+        for node in graph:
+            if node in visible and node in depths:
+                levels.setdefault(depths[node], []).append(node)
+        for depth in sorted(levels):
+            file.write(f"  subgraph cluster_depth_{depth} {{\n")
+            file.write(f'    label="depth {depth}";\n')
+            for node in levels[depth]:
+                file.write(f"    {quote(node)};\n")
+            file.write("  }\n")
+    for node, attributes in (node_attributes or {}).items():
+        if node in visible and attributes:
+            values = ", ".join(f"{key}={quote(str(value))}" for key, value in attributes.items())
+            file.write(f"  {quote(node)} [{values}];\n")
+    for node1, node2 in edges:
+        file.write(f"  {quote(node1)} -> {quote(node2)};\n")
+    for node, count in hidden.items():
+        placeholder = quote(f"{node} (+{count} more)")
+        file.write(f"  {placeholder} [shape=box, style=dashed];\n")
+        file.write(f"  {quote(node)} -> {placeholder} [style=dashed];\n")
+    file.write("}\n")
@@ -0,0 +1,136 @@
+import argparse
+import os
+import tempfile
+from typing import Dict, List, NamedTuple, Set, TextIO, Tuple
+
+import networkx as nx
+
+from dot_writer import quote, read_dot
+from resolvers import canonical_name
+
+ADDED_COLOR = "darkgreen"
+REMOVED_COLOR = "red"
+CHANGED_COLOR = "orange"
+
+
+class GraphDiff(NamedTuple):
+    """Различия двух графов зависимостей (имена - как в новом графе, для удалённых - как в старом)."""
+    added_nodes: List[str]
+    removed_nodes: List[str]
+    changed_nodes: Dict[str, Tuple[str, str]]  # имя -> (старая версия, новая версия)
+    added_edges: List[Tuple[str, str]]
+    removed_edges: List[Tuple[str, str]]
+
+
+def canonical_view(graph: nx.DiGraph) -> Tuple[Dict[str, str], Dict[str, str], Set[Tuple[str, str]]]:
+    """Имена, версии и рёбра графа по каноническим именам пакетов."""
+    names = {canonical_name(node): node for node in graph}
+    versions = {canonical_name(node): data.get("version", "") for node, data in graph.nodes(data=True)}
+    edges = {(canonical_name(source), canonical_name(target)) for source, target in graph.edges}
+    return names, versions, edges
+
+
+def diff_graphs(old: nx.DiGraph, new: nx.DiGraph) -> GraphDiff:
+    """Сравнение графов за время, линейное по числу узлов и рёбер.
+
+    Пакеты сопоставляются по каноническому имени, поэтому Jinja2 и jinja2
+    считаются одним узлом.
+    """
+    old_names, old_versions, old_edges = canonical_view(old)
+    new_names, new_versions, new_edges = canonical_view(new)
+    names = {**old_names, **new_names}
+    changed = {
+        new_names[key]: (old_versions[key], new_versions[key])
+        for key in new_names
+        if key in old_names and old_versions[key] and new_versions[key] and old_versions[key] != new_versions[key]
+    }
+    return GraphDiff(
+        added_nodes=sorted(new_names[key] for key in new_names.keys() - old_names.keys()),
+        removed_nodes=sorted(old_names[key] for key in old_names.keys() - new_names.keys()),
+        changed_nodes=dict(sorted(changed.items())),
+        added_edges=sorted((names[source], names[target]) for source, target in new_edges - old_edges),
+        removed_edges=sorted((names[source], names[target]) for source, target in old_edges - new_edges),
+    )
+
+
+def write_diff_dot(old: nx.DiGraph, new: nx.DiGraph, diff: GraphDiff, file: TextIO):
+    """Пишет объединение графов в DOT: добавленное зелёным, удалённое красным, смена версии оранжевым."""
+    added = set(diff.added_nodes)
+    removed = set(diff.removed_nodes)
+    file.write("digraph dependencies {\n")
+    for graph in (new, old):
+        for node, data in graph.nodes(data=True):
+            if graph is old and node not in removed:
+                continue
+            version = data.get("version", "")
+            attributes = {"label": f"{node}\n{version}" if version else node}
+            if node in added:
+                attributes.update(color=ADDED_COLOR, fontcolor=ADDED_COLOR)
+            elif node in removed:
+                attributes.update(color=REMOVED_COLOR, fontcolor=REMOVED_COLOR, style="dashed")
+            elif node in diff.changed_nodes:
+                old_version, new_version = diff.changed_nodes[node]
+                attributes.update(label=f"{node}\n{old_version} -> {new_version}", color=CHANGED_COLOR,
+                                  style="filled", fillcolor="moccasin")
+            values = ", ".join(f"{key}={quote(value)}" for key, value in attributes.items())
+            file.write(f"  {quote(node)} [{values}];\n")
+    added_edges = set(diff.added_edges)
+    for source, target in new.edges:
+        color = f' [color="{ADDED_COLOR}"]' if (source, target) in added_edges else ""
+        file.write(f"  {quote(source)} -> {quote(target)}{color};\n")
+    for source, target in diff.removed_edges:
+        file.write(f'  {quote(source)} -> {quote(target)} [color="{REMOVED_COLOR}", style="dashed"];\n')
+    file.write("}\n")
+
+
+def format_diff(diff: GraphDiff) -> str:
+    lines = [
+        f"Пакеты: +{len(diff.added_nodes)} -{len(diff.removed_nodes)} ~{len(diff.changed_nodes)}, "
+        f"зависимости: +{len(diff.added_edges)} -{len(diff.removed_edges)}"
+    ]
+    lines += [f"+ {name}" for name in diff.added_nodes]
+    lines += [f"- {name}" for name in diff.removed_nodes]
+    lines += [f"~ {name}: {old} -> {new}" for name, (old, new) in diff.changed_nodes.items()]
+    lines += [f"+ {source} -> {target}" for source, target in diff.added_edges]
+    lines += [f"- {source} -> {target}" for source, target in diff.removed_edges]
+    return "\n".join(lines)
+
+
+def resolve_graph(config_path: str, cache_path: str = None) -> nx.DiGraph:
+    """Строит граф по конфигурации (с постоянным кэшем, если он задан)."""
+    from main import DependencyVisualizer
+
+    visualizer = DependencyVisualizer(config_path, cache_path=cache_path)
+    try:
+        max_depth = int(visualizer.config["max_depth"])
+        for root in visualizer.batch_roots() or [visualizer.config["package_name"]]:
+            visualizer.get_dependencies(root, max_depth=max_depth)
+        return visualizer.graph
+    finally:
+        visualizer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff two dependency graphs")
+    parser.add_argument("old", help="Saved .dot graph, or config .toml to resolve")
+    parser.add_argument("new", help="Saved .dot graph, or config .toml to resolve")
+    parser.add_argument("-o", "--output", default="diff.dot", help="Path of the colored diff DOT file")
+    parser.add_argument("--cache", help="Persistent metadata cache shared by both sides (temporary by default)")
+    args = parser.parse_args()
+
+    # Общий кэш: пакеты тех же версий во втором графе не разрешаются повторно
+    with tempfile.TemporaryDirectory() as directory:
+        cache_path = args.cache or os.path.join(directory, "cache.sqlite")
+        graphs = [
+            resolve_graph(path, cache_path) if path.lower().endswith(".toml") else read_dot(path)
+            for path in (args.old, args.new)
+        ]
+    diff = diff_graphs(*graphs)
+    with open(args.output, "w", encoding="utf-8") as f:
+        write_diff_dot(graphs[0], graphs[1], diff, f)
+    print(format_diff(diff))
+    print(f"DOT с различиями сохранён по пути: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
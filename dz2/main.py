@@ -1,15 +1,45 @@
+import io
 import os
+import shutil
+import sys
 import toml
-import subprocess
+import graphviz
 import networkx as nx
-from typing import Dict, List
-from graphviz import Source
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Set, TextIO
+from dot_writer import write_dot
+from metadata_cache import CachedResolver, MetadataCache
+from profiling import Profiler, format_size, subtree_weights
+from resolvers import PackageInfo, canonical_name, create_resolver, requirement_name
 
 
 class DependencyVisualizer:
-    def __init__(self, config_path: str):
+    def __init__(self, config_path: str, cache_path: str = None):
         self.config = self.load_config(config_path)
         self.graph = nx.DiGraph()
+        # metadata - чтение METADATA установленных пакетов; pip - подпроцесс pip show;
+        # index - локальный индекс PEP 503 по адресу repository_url
+        self.resolver = create_resolver(self.config.get("resolver", "metadata"), self.config["repository_url"])
+        # Постоянный кэш зависимостей между запусками (SQLite)
+        cache_path = cache_path or self.config.get("cache_path")
+        self.metadata_cache = MetadataCache(cache_path) if cache_path else None
+        if self.metadata_cache is not None:
+            self.resolver = CachedResolver(self.resolver, self.metadata_cache)
+        self.cache: Dict[str, PackageInfo] = {}  # Разрешённые пакеты по каноническому имени
+        self.lookups = 0
+        self.cache_hits = 0
+        self.lookups_saved = 0  # Запросов, которые сделал бы обход без кэша
+        self.cycles: List[List[str]] = []
+        # Параллельное разрешение пакетов одного уровня; 1 - последовательно
+        self.workers = int(self.config.get("workers", 1))
+        self.timeout = self.config.get("timeout")  # Секунд на один пакет
+        self.roots: List[str] = []
+        self.root_nodes: Dict[str, Set[str]] = {}  # Пакеты, которые тянет каждый корень
+        self.depths: Dict[str, int] = {}  # Наименьшая глубина пакета от корня
+        # Для больших графов: кластеры по глубине и свёртка узлов с большим числом зависимостей
+        self.cluster_by_depth = bool(self.config.get("cluster_by_depth", False))
+        self.max_fanout = int(self.config.get("max_fanout", 0))
+        self.node_attributes: Dict[str, Dict[str, str]] = {}
 
     def load_config(self, path: str) -> Dict:
         """Загружает и валидирует конфигурационный файл."""
@@ -22,56 +52,268 @@ class DependencyVisualizer:
                 raise ValueError(f"Missing required config key: {key}")
         return config
 
+    def resolve(self, package_name: str) -> PackageInfo:
+        """Метаданные пакета; каждый пакет разрешается один раз."""
+        return self.resolve_many([package_name])[0]
+
+    def resolve_many(self, names: List[str], pool: ThreadPoolExecutor = None) -> List[PackageInfo]:
+        """Метаданные пакетов одного уровня.
+
+        Пакеты, которых нет в кэше, разрешаются в пуле потоков, если он передан;
+        результат возвращается в порядке names, поэтому граф не зависит от
+        порядка завершения запросов.
+        """
+        pending: Dict[str, str] = {}
+        for name in names:
+            key = canonical_name(name)
+            if key in self.cache:
+                self.cache_hits += 1
+            else:
+                pending.setdefault(key, name)
+        self.lookups += len(pending)
+        if pool is not None and len(pending) > 1:
+            self.cache.update(zip(pending, pool.map(self._lookup, pending.values())))
+        else:
+            for key, name in pending.items():
+                self.cache[key] = self._lookup(name)
+        return [self.cache[canonical_name(name)] for name in names]
+
+    def _lookup(self, package_name: str) -> PackageInfo:
+        return self.resolver.resolve(package_name, timeout=self.timeout)
+
     def get_dependencies(self, package_name: str, depth: int = 0, max_depth: int = 1) -> Dict[str, List[str]]:
-        """Получает зависимости для указанного пакета."""
-        if depth > max_depth:
-            return {}
+        """Получает зависимости пакета обходом по уровням.
+
+        Каждый пакет разрешается один раз, на самой малой глубине, на которой
+        он встречается; пакеты глубже max_depth попадают в граф, но не раскрываются.
+        Узлы графа - канонические имена (Pillow и pillow - один узел), имя
+        в исходном написании хранится в атрибуте display_name.
+        Возвращает список прямых зависимостей каждого раскрытого пакета.
+        """
+        dependencies: Dict[str, List[str]] = {}
+        start_depth = depth
+        root = canonical_name(package_name)
+        level = [package_name]
+        seen = {root}
+        if root not in self.roots:
+            self.roots.append(root)
+        self.depths.setdefault(root, depth)
+        pool = ThreadPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
         try:
-            output = subprocess.check_output(["pip", "show", package_name], text=True)
-        except subprocess.CalledProcessError:
-            raise ValueError(f"Package {package_name} not found in PyPI.")
-        dependencies = {}
-        for line in output.splitlines():
-            if line.startswith("Requires:"):
-                deps = line.split(":")[1].strip().split(", ")
-                for dep in deps:
-                    if dep:
-                        self.graph.add_edge(package_name, dep)
-                        dependencies[dep] = self.get_dependencies(dep, depth + 1, max_depth)
+            while level and depth <= max_depth:
+                next_level = []
+                for name, info in zip(level, self.resolve_many(level, pool)):
+                    key = canonical_name(name)
+                    dependencies[key] = [canonical_name(dep) for dep in info.requires]
+                    self.graph.add_node(key, version=info.version, display_name=info.name)
+                    for dep, dep_key in zip(info.requires, dependencies[key]):
+                        self.graph.add_edge(key, dep_key)
+                        # Пока пакет не разрешён, показываем имя из Requires-Dist
+                        self.graph.nodes[dep_key].setdefault("display_name", dep)
+                        # Повторно встреченный пакет (в том числе по циклу) не обходим
+                        if dep_key not in seen:
+                            seen.add(dep_key)
+                            next_level.append(dep)
+                            self.depths[dep_key] = min(self.depths.get(dep_key, depth + 1), depth + 1)
+                level = next_level
+                depth += 1
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        self.root_nodes[root] = set(dependencies).union(*dependencies.values())
+        self.cycles = find_cycles(self.graph)
+        walks = count_walks(dependencies, root, max_depth - start_depth)
+        self.lookups_saved += walks - len(dependencies)
         return dependencies
 
+    def write_graph(self, file: TextIO):
+        """Пишет граф в формате DOT в открытый файл (с версиями пакетов для graph_diff.py)."""
+        attributes = {}
+        for node, data in self.graph.nodes(data=True):
+            label = {"label": data["display_name"]} if data.get("display_name", node) != node else {}
+            if data.get("version") or label or node in self.node_attributes:
+                attributes[node] = {"version": data.get("version", ""), **label, **self.node_attributes.get(node, {})}
+        write_dot(self.graph, file, self.roots or None, self.depths, self.cluster_by_depth, self.max_fanout,
+                  attributes)
+
     def generate_graphviz_code(self) -> str:
         """Генерирует код Graphviz для визуализации графа."""
-        graphviz_code = "digraph dependencies {\n"
-        for node1, node2 in self.graph.edges:
-            graphviz_code += f'  "{node1}" -> "{node2}";\n'
-        graphviz_code += "}"
-        return graphviz_code
+        code = io.StringIO()
+        self.write_graph(code)
+        return code.getvalue()
 
     def save_graph(self, output_path: str):
         """Сохраняет граф в файл."""
-        code = self.generate_graphviz_code()
-        with open(output_path, "w") as f:
-            f.write(code)
-
-    def save_png(self, output_path: str):
-        """Генерирует PNG-файл из Graphviz-описания."""
-        dot_code = self.generate_graphviz_code()
-        dot_file = Source(dot_code)
+        with open(output_path, "w", encoding="utf-8") as f:
+            self.write_graph(f)
+
+    def save_png(self, output_path: str, dot_path: str = None):
+        """Генерирует PNG-файл из Graphviz-описания.
+
+        dot_path - уже записанный DOT-файл; если не задан, граф сначала
+        сохраняется в output_path.
+        """
+        if dot_path is None:
+            dot_path = output_path
+            self.save_graph(dot_path)
+        # graphviz_path - каталог с dot или путь к самому dot
+        graphviz_dir = self.config["graphviz_path"]
+        if os.path.isfile(graphviz_dir):
+            graphviz_dir = os.path.dirname(graphviz_dir)
+        os.environ["PATH"] += os.pathsep + graphviz_dir
         png_path = os.path.splitext(output_path)[0] + ".png"
-        dot_file.format = "png"
-        dot_file.render(png_path, cleanup=True)
+        try:
+            graphviz.render("dot", "png", dot_path, outfile=png_path)
+        except graphviz.ExecutableNotFound:
+            print(f"Graphviz не найден ({self.config['graphviz_path']}), PNG не создан.")
+            return
         print(f"PNG граф сохранён по пути: {png_path}")
 
-    def visualize(self):
-        """Основная функция визуализации."""
-        package_name = self.config["package_name"]
+    def cache_report(self) -> str:
+        """Статистика постоянного кэша за запуск."""
+        if self.metadata_cache is None:
+            return "Постоянный кэш не используется (ключ cache_path или --cache)."
+        stats = self.metadata_cache.stats()
+        return (
+            f"Кэш {self.metadata_cache.path}: попаданий {stats['hits']}, промахов {stats['misses']}, "
+            f"записей {stats['entries']}"
+        )
+
+    def close(self):
+        if self.metadata_cache is not None:
+            self.metadata_cache.close()
+
+    def profile_graph(self) -> List[Dict]:
+        """Размер и время импорта каждого пакета и его поддерева.
+
+        Веса записываются в атрибуты узлов графа; в DOT узлы подписываются
+        и окрашиваются тем ярче, чем дольше импортируется их поддерево.
+        Возвращает пакеты по убыванию времени импорта поддерева.
+        """
+        profiler = Profiler(self.metadata_cache)
+        sizes: Dict[str, float] = {}
+        times: Dict[str, float] = {}
+        for node in self.graph:
+            profile = profiler.profile(self.graph.nodes[node].get("display_name", node))
+            sizes[node] = profile.size
+            times[node] = profile.import_time or 0.0
+        subtree_sizes = subtree_weights(self.graph, sizes)
+        subtree_times = subtree_weights(self.graph, times)
+        slowest = max(subtree_times.values(), default=0.0) or 1.0
+        ranking = []
+        for node in self.graph:
+            self.graph.nodes[node].update(
+                size=sizes[node], import_time=times[node],
+                subtree_size=subtree_sizes[node], subtree_import_time=subtree_times[node],
+            )
+            self.node_attributes[node] = {
+                "label": f"{self.graph.nodes[node].get('display_name', node)}\n"
+                         f"{format_size(sizes[node])}, {times[node] * 1000:.1f} ms",
+                "style": "filled",
+                "fillcolor": f"0.000 {subtree_times[node] / slowest:.3f} 1.000",
+            }
+            ranking.append({"name": node, **self.graph.nodes[node]})
+        return sorted(ranking, key=lambda row: (-row["subtree_import_time"], -row["subtree_size"], row["name"]))
+
+    def batch_roots(self) -> List[str]:
+        """Корни пакетного режима: ключ roots или файл requirements_file."""
+        if "roots" in self.config:
+            return list(self.config["roots"])
+        if "requirements_file" in self.config:
+            return read_requirements(self.config["requirements_file"])
+        return []
+
+    def reuse_summary(self) -> Dict[str, Dict[str, int]]:
+        """Для каждого корня: сколько пакетов он тянет, из них только он сам и вместе с другими."""
+        owners: Dict[str, int] = {}
+        for nodes in self.root_nodes.values():
+            for node in nodes:
+                owners[node] = owners.get(node, 0) + 1
+        summary = {}
+        for root, nodes in self.root_nodes.items():
+            exclusive = sum(1 for node in nodes if owners[node] == 1)
+            summary[root] = {"nodes": len(nodes), "exclusive": exclusive, "shared": len(nodes) - exclusive}
+        return summary
+
+    def save_root_graphs(self, output_path: str) -> List[str]:
+        """Сохраняет подграф каждого корня в отдельный DOT-файл рядом с output_path."""
+        stem, extension = os.path.splitext(output_path)
+        paths = []
+        for root, nodes in self.root_nodes.items():
+            path = f"{stem}.{canonical_name(root)}{extension or '.dot'}"
+            with open(path, "w", encoding="utf-8") as f:
+                write_dot(self.graph.subgraph(nodes), f, [root], None, self.cluster_by_depth, self.max_fanout)
+            paths.append(path)
+        return paths
+
+    def visualize(self, roots: List[str] = None, profile: bool = False):
+        """Основная функция визуализации.
+
+        Если задано несколько корней (roots или requirements_file), все они
+        разрешаются в один граф; общие зависимости разрешаются один раз.
+        profile - измерить размер и время импорта пакетов (или ключ profile).
+        """
+        roots = roots or self.batch_roots() or [self.config["package_name"]]
         max_depth = int(self.config["max_depth"])
-        self.get_dependencies(package_name, max_depth=max_depth)
-        graphviz_code = self.generate_graphviz_code()
-        print(graphviz_code)
-        self.save_graph(self.config["output_path"])
-        self.save_png(self.config["output_path"])
+        for root in roots:
+            self.get_dependencies(root, max_depth=max_depth)
+        ranking = self.profile_graph() if profile or self.config.get("profile") else []
+        # DOT формируется один раз: файл выводится на экран и передаётся Graphviz
+        output_path = self.config["output_path"]
+        self.save_graph(output_path)
+        with open(output_path, encoding="utf-8") as f:
+            shutil.copyfileobj(f, sys.stdout)
+        for cycle in self.cycles:
+            print(f"Обнаружен цикл зависимостей: {', '.join(cycle)}")
+        print(f"Разрешено пакетов: {self.lookups}, повторных запросов сэкономлено: {self.lookups_saved}")
+        if len(roots) > 1:
+            self.save_root_graphs(output_path)
+            for root, counts in self.reuse_summary().items():
+                print(f"{root}: пакетов {counts['nodes']}, только свои {counts['exclusive']}, "
+                      f"общие {counts['shared']}")
+        for row in ranking[:int(self.config.get("profile_top", 10))]:
+            print(f"{row['name']}: импорт {row['subtree_import_time'] * 1000:.1f} ms "
+                  f"(сам {row['import_time'] * 1000:.1f} ms), размер {format_size(row['subtree_size'])} "
+                  f"(сам {format_size(row['size'])})")
+        self.save_png(output_path, dot_path=output_path)
+
+
+def read_requirements(path: str) -> List[str]:
+    """Имена пакетов из файла requirements.txt (без опций pip и комментариев)."""
+    roots = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line or line.startswith("-"):
+                continue
+            name = requirement_name(line)
+            if name and name not in roots:
+                roots.append(name)
+    return roots
+
+
+def find_cycles(graph: nx.DiGraph) -> List[List[str]]:
+    """Группы пакетов, зависящих друг от друга по кругу."""
+    cycles = []
+    for component in nx.strongly_connected_components(graph):
+        node = next(iter(component))
+        if len(component) > 1 or graph.has_edge(node, node):
+            cycles.append(sorted(component))
+    return sorted(cycles)
+
+
+def count_walks(dependencies: Dict[str, List[str]], root: str, max_depth: int) -> int:
+    """Число разрешений пакетов при рекурсивном обходе без кэша (по пути на каждое)."""
+    total = 0
+    level = {root: 1}
+    for _ in range(max_depth + 1):
+        total += sum(level.values())
+        next_level: Dict[str, int] = {}
+        for name, paths in level.items():
+            for dep in dependencies.get(name, []):
+                next_level[dep] = next_level.get(dep, 0) + paths
+        level = next_level
+    return total
 
 
 if __name__ == "__main__":
@@ -79,7 +321,27 @@ if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description="Dependency Visualizer")
     parser.add_argument("config", help="Path to the configuration file")
+    parser.add_argument("--cache", help="Path to the persistent metadata cache (overrides cache_path)")
+    parser.add_argument("--cache-stats", action="store_true", help="Print cache hits and misses after the run")
+    parser.add_argument("--roots", nargs="+", help="Resolve several root packages into one graph")
+    parser.add_argument("--requirements", help="Take the root packages from a requirements file")
+    parser.add_argument("--analytics", metavar="PATH",
+                        help="Save transitive counts, longest chains and fan-in to PATH (.json or .csv)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Weight packages by installed size and import time and print the most expensive subtrees")
+    parser.add_argument("--top", type=int, default=10, help="Number of chains and packages in the analytics report")
     args = parser.parse_args()
 
-    visualizer = DependencyVisualizer(args.config)
-    visualizer.visualize()
\ No newline at end of file
+    visualizer = DependencyVisualizer(args.config, cache_path=args.cache)
+    try:
+        roots = args.roots or (read_requirements(args.requirements) if args.requirements else None)
+        visualizer.visualize(roots, profile=args.profile)
+        if args.analytics:
+            from analytics import analyze, save_report
+
+            save_report(analyze(visualizer.graph, args.top), args.analytics)
+            print(f"Аналитика графа сохранена по пути: {args.analytics}")
+        if args.cache_stats:
+            print(visualizer.cache_report())
+    finally:
+        visualizer.close()
\ No newline at end of file
@@ -0,0 +1,129 @@
+import json
+import platform
+import sqlite3
+import sys
+import threading
+from typing import Dict, Optional
+
+from profiling import PackageProfile
+from resolvers import PackageInfo, canonical_name
+
+
+def environment_fingerprint() -> str:
+    """Версия Python и платформа: от них зависят маркеры в Requires-Dist."""
+    return f"{sys.implementation.name}-{platform.python_version()}-{sys.platform}-{platform.machine()}"
+
+
+class MetadataCache:
+    """Постоянный кэш зависимостей пакетов в SQLite.
+
+    Ключ - каноническое имя, версия пакета и отпечаток окружения, поэтому
+    после обновления пакета старая запись просто перестаёт находиться.
+    """
+
+    def __init__(self, path: str, fingerprint: Optional[str] = None):
+        self.path = path
+        self.fingerprint = fingerprint or environment_fingerprint()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Соединение используется из потоков пула, доступ под блокировкой
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS packages (
+                name TEXT NOT NULL,
+                version TEXT NOT NULL,
+                environment TEXT NOT NULL,
+                display_name TEXT NOT NULL,
+                requires TEXT NOT NULL,
+                PRIMARY KEY (name, version, environment)
+            )
+            """
+        )
+        # Время импорта - собственное время модулей пакета; прежняя таблица
+        # profiles хранила накопленное, поэтому её записи не используются
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS package_profiles (
+                name TEXT NOT NULL,
+                version TEXT NOT NULL,
+                environment TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                import_time REAL,
+                PRIMARY KEY (name, version, environment)
+            )
+            """
+        )
+        self._connection.commit()
+
+    def get(self, package_name: str, version: str) -> Optional[PackageInfo]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT display_name, requires FROM packages WHERE name = ? AND version = ? AND environment = ?",
+                (canonical_name(package_name), version, self.fingerprint),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return PackageInfo(row[0], version, json.loads(row[1]))
+
+    def put(self, info: PackageInfo):
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO packages VALUES (?, ?, ?, ?, ?)",
+                (canonical_name(info.name), info.version, self.fingerprint, info.name, json.dumps(info.requires)),
+            )
+            self._connection.commit()
+
+    def get_profile(self, package_name: str, version: str) -> Optional[PackageProfile]:
+        """Сохранённые размер и время импорта пакета или None."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT size, import_time FROM package_profiles WHERE name = ? AND version = ? AND environment = ?",
+                (canonical_name(package_name), version, self.fingerprint),
+            ).fetchone()
+        return PackageProfile(*row) if row is not None else None
+
+    def put_profile(self, package_name: str, version: str, profile: PackageProfile):
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO package_profiles VALUES (?, ?, ?, ?, ?)",
+                (canonical_name(package_name), version, self.fingerprint, profile.size, profile.import_time),
+            )
+            self._connection.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries = self._connection.execute("SELECT COUNT(*) FROM packages").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class CachedResolver:
+    """Резолвер, который обращается к исходному только при промахе кэша.
+
+    Версия установленного пакета берётся через current_version() - это
+    дешевле полного разрешения (например, запуска pip show).
+    """
+
+    def __init__(self, resolver, cache: MetadataCache):
+        self.resolver = resolver
+        self.cache = cache
+
+    def current_version(self, package_name: str) -> Optional[str]:
+        return self.resolver.current_version(package_name)
+
+    def resolve(self, package_name: str, timeout: Optional[float] = None) -> PackageInfo:
+        version = self.resolver.current_version(package_name)
+        if version is not None:
+            info = self.cache.get(package_name, version)
+            if info is not None:
+                return info
+        info = self.resolver.resolve(package_name, timeout=timeout)
+        self.cache.put(info)
+        return info
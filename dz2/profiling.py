@@ -0,0 +1,153 @@
+import os
+import subprocess
+import sys
+from importlib import metadata
+from typing import Dict, List, NamedTuple, Optional
+
+import networkx as nx
+
+from analytics import reach_sums
+from resolvers import canonical_name, installed_version
+
+IMPORT_TIMEOUT = 60.0  # Секунд на импорт одного пакета
+
+
+class PackageProfile(NamedTuple):
+    """Размер установленных файлов пакета (байт) и время его импорта (с)."""
+    size: int
+    import_time: Optional[float]
+
+
+class Profiler:
+    """Измерение размера и времени импорта установленных пакетов.
+
+    Размер считается по RECORD, время импорта - по выводу python -X importtime
+    в отдельном изолированном процессе (-I): собственное время модулей пакета
+    без его зависимостей, чтобы сумма по поддереву учитывала каждый модуль
+    один раз. Результаты кэшируются по версии пакета (в памяти и,
+    если передан, в постоянном кэше метаданных).
+    """
+
+    def __init__(self, cache=None, python: str = sys.executable, timeout: float = IMPORT_TIMEOUT):
+        self.cache = cache
+        self.python = python
+        self.timeout = timeout
+        self._profiles: Dict[str, PackageProfile] = {}
+
+    def profile(self, package_name: str) -> PackageProfile:
+        key = canonical_name(package_name)
+        if key in self._profiles:
+            return self._profiles[key]
+        version = installed_version(package_name)
+        if version is None:
+            profile = PackageProfile(0, None)
+        else:
+            profile = self.cache.get_profile(package_name, version) if self.cache is not None else None
+            if profile is None:
+                distribution = metadata.distribution(package_name)
+                modules = import_names(distribution)
+                profile = PackageProfile(installed_size(distribution), self.import_time(modules))
+                if self.cache is not None:
+                    self.cache.put_profile(package_name, version, profile)
+        self._profiles[key] = profile
+        return profile
+
+    def import_time(self, modules: List[str]) -> Optional[float]:
+        """Собственное время импорта модулей пакета в чистом интерпретаторе."""
+        if not modules:
+            return None
+        try:
+            result = subprocess.run(
+                [self.python, "-I", "-X", "importtime", "-c", f"import {', '.join(modules)}"],
+                capture_output=True, text=True, timeout=self.timeout,
+            )
+        except subprocess.TimeoutExpired:
+            return None
+        if result.returncode != 0:
+            return None
+        return parse_import_time(result.stderr, modules)
+
+
+def installed_size(distribution: metadata.Distribution) -> int:
+    """Размер файлов пакета по RECORD (или по диску, если размер не записан)."""
+    total = 0
+    for file in distribution.files or []:
+        if file.size is not None:
+            total += file.size
+            continue
+        path = distribution.locate_file(file)
+        if os.path.isfile(path):
+            total += os.path.getsize(path)
+    return total
+
+
+def import_names(distribution: metadata.Distribution) -> List[str]:
+    """Модули верхнего уровня пакета: из top_level.txt или по списку файлов."""
+    top_level = distribution.read_text("top_level.txt")
+    if top_level:
+        names = [line.strip().replace("/", ".") for line in top_level.splitlines()]
+    else:
+        names = []
+        for file in distribution.files or []:
+            first = file.parts[0]
+            if first.endswith((".dist-info", ".data")) or first in ("..", "__pycache__"):
+                continue
+            if len(file.parts) > 1:
+                names.append(first)
+            elif first.endswith(".py"):
+                names.append(first[:-3])
+    public = sorted({name for name in names if name.isidentifier() and not name.startswith("_")})
+    return public or sorted({name for name in names if name.isidentifier()})
+
+
+def parse_import_time(output: str, modules: List[str]) -> Optional[float]:
+    """Сумма собственного времени модулей пакета из вывода -X importtime (с).
+
+    Учитываются модули и их подмодули на любой глубине вложенности (их мог
+    импортировать и другой пакет, например хук .pth); время зависимостей
+    в накопленном столбце не нужно - оно войдёт в сумму по поддереву.
+    """
+    prefixes = tuple(module + "." for module in modules)
+    wanted = set(modules)
+    total = 0
+    found = False
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        name = parts[2].strip()
+        if name not in wanted and not name.startswith(prefixes):
+            continue
+        try:
+            total += int(parts[0])
+        except ValueError:
+            continue
+        found = True
+    return total / 1e6 if found else None
+
+
+def subtree_weights(graph: nx.DiGraph, weights: Dict[str, float]) -> Dict[str, float]:
+    """Вес пакета вместе со всеми его транзитивными зависимостями (каждая считается один раз).
+
+    Граф сжимается в DAG компонент сильной связности, суммы считаются
+    одним проходом по битовым маскам достижимости (см. analytics).
+    """
+    dag = nx.condensation(graph)
+    component_weights = {
+        component: sum(weights.get(node, 0) for node in dag.nodes[component]["members"])
+        for component in dag
+    }
+    order = list(reversed(list(nx.topological_sort(dag))))
+    sums = reach_sums(dag, order, component_weights)
+    mapping = dag.graph["mapping"]
+    return {node: sums[mapping[node]] for node in graph}
+
+
+def format_size(size: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
@@ -0,0 +1,234 @@
+import os
+import re
+import subprocess
+import zipfile
+from email.parser import BytesHeaderParser
+from html.parser import HTMLParser
+from importlib import metadata
+from typing import Dict, List, NamedTuple, Optional
+from urllib.parse import unquote, urlparse
+from urllib.request import url2pathname
+
+try:
+    from packaging.requirements import InvalidRequirement, Requirement
+    from packaging.version import InvalidVersion, Version
+except ImportError:  # packaging не установлен - маркеры не вычисляются
+    Requirement = None
+
+REQUIREMENT_NAME = re.compile(r"\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+EXTRA_MARKER = re.compile(r"\bextra\s*==")
+
+
+class PackageInfo(NamedTuple):
+    """Установленный пакет: имя, версия и прямые зависимости."""
+    name: str
+    version: str
+    requires: List[str]
+
+
+def installed_version(package_name: str) -> Optional[str]:
+    """Версия установленного пакета или None, если он не установлен."""
+    try:
+        return metadata.version(package_name)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+class MetadataResolver:
+    """Чтение зависимостей из метаданных установленных пакетов (*.dist-info/METADATA).
+
+    Работает в текущем процессе, без запуска pip. Как и pip show, учитывает
+    только зависимости, нужные без дополнительных extras.
+    """
+
+    def resolve(self, package_name: str, timeout: Optional[float] = None) -> PackageInfo:
+        # Файлы читаются в текущем процессе, ограничение по времени не нужно
+        try:
+            distribution = metadata.distribution(package_name)
+        except metadata.PackageNotFoundError:
+            raise ValueError(f"Package {package_name} not found in PyPI.")
+        requires = parse_requires(distribution.requires or [])
+        return PackageInfo(distribution.metadata["Name"] or package_name, distribution.version, requires)
+
+    def current_version(self, package_name: str) -> Optional[str]:
+        return installed_version(package_name)
+
+
+class PipShowResolver:
+    """Чтение зависимостей через подпроцесс pip show (медленно, но как раньше)."""
+
+    def resolve(self, package_name: str, timeout: Optional[float] = None) -> PackageInfo:
+        try:
+            output = subprocess.check_output(["pip", "show", package_name], text=True, timeout=timeout)
+        except subprocess.CalledProcessError:
+            raise ValueError(f"Package {package_name} not found in PyPI.")
+        except subprocess.TimeoutExpired:
+            raise ValueError(f"Timed out resolving package {package_name} after {timeout} s.")
+        fields = {}
+        for line in output.splitlines():
+            key, separator, value = line.partition(":")
+            if separator:
+                fields[key] = value.strip()
+        requires = [dep for dep in fields.get("Requires", "").split(", ") if dep]
+        return PackageInfo(fields.get("Name", package_name), fields.get("Version", ""), requires)
+
+    def current_version(self, package_name: str) -> Optional[str]:
+        # pip show смотрит в то же окружение, версию можно прочитать без подпроцесса
+        return installed_version(package_name)
+
+
+class IndexResolver:
+    """Чтение зависимостей из локального индекса в формате PEP 503 (без сети).
+
+    Каталог пакета - <индекс>/<каноническое имя>/ со списком файлов в index.html
+    или просто с файлами колёс. Берётся колесо последней версии; его METADATA
+    читается из файла <колесо>.metadata (PEP 658), а если его нет - из архива
+    по центральному каталогу, без распаковки остальных файлов.
+    """
+
+    def __init__(self, repository_url: str):
+        self.root = local_index_path(repository_url)
+        if not os.path.isdir(self.root):
+            raise ValueError(f"Package index {repository_url} not found.")
+        self._wheels: Dict[str, Dict[str, str]] = {}
+
+    def resolve(self, package_name: str, timeout: Optional[float] = None) -> PackageInfo:
+        version = self.current_version(package_name)
+        if version is None:
+            raise ValueError(f"Package {package_name} not found in {self.root}.")
+        headers = BytesHeaderParser().parsebytes(read_wheel_metadata(self.wheels(package_name)[version]))
+        requires = parse_requires(headers.get_all("Requires-Dist") or [])
+        return PackageInfo(headers.get("Name", package_name), headers.get("Version", version), requires)
+
+    def current_version(self, package_name: str) -> Optional[str]:
+        """Последняя версия пакета в индексе."""
+        versions = self.wheels(package_name)
+        return max(versions, key=version_key) if versions else None
+
+    def wheels(self, package_name: str) -> Dict[str, str]:
+        """Колёса пакета в индексе: {версия: путь}."""
+        key = canonical_name(package_name)
+        if key not in self._wheels:
+            self._wheels[key] = find_wheels(os.path.join(self.root, key))
+        return self._wheels[key]
+
+
+class LinkParser(HTMLParser):
+    """Ссылки <a href> страницы пакета простого индекса."""
+
+    def __init__(self):
+        super().__init__()
+        self.links: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        href = dict(attrs).get("href")
+        if tag == "a" and href:
+            self.links.append(href.split("#", 1)[0])
+
+
+def local_index_path(repository_url: str) -> str:
+    """Путь к индексу по file:// URL или пути в файловой системе."""
+    url = urlparse(repository_url)
+    if url.scheme == "file":
+        return url2pathname(unquote(url.path))
+    if url.scheme in ("http", "https"):
+        raise ValueError(f"Resolver 'index' reads local indexes only, got {repository_url}.")
+    return repository_url
+
+
+def find_wheels(project_dir: str) -> Dict[str, str]:
+    if not os.path.isdir(project_dir):
+        return {}
+    index_page = os.path.join(project_dir, "index.html")
+    if os.path.exists(index_page):
+        parser = LinkParser()
+        with open(index_page, encoding="utf-8") as f:
+            parser.feed(f.read())
+        paths = [
+            os.path.normpath(os.path.join(project_dir, url2pathname(unquote(link))))
+            for link in parser.links
+            if not urlparse(link).scheme
+        ]
+    else:
+        paths = [os.path.join(project_dir, name) for name in sorted(os.listdir(project_dir))]
+    wheels = {}
+    for path in paths:
+        if path.endswith(".whl.metadata"):
+            # Файл метаданных (PEP 658) заменяет колесо: read_wheel_metadata прочитает его
+            path = path[:-len(".metadata")]
+        file_name = os.path.basename(path)
+        if file_name.endswith(".whl"):
+            # Имя колеса: {пакет}-{версия}(-{сборка})?-{python}-{abi}-{платформа}.whl
+            wheels.setdefault(file_name.split("-")[1], path)
+    return wheels
+
+
+def read_wheel_metadata(wheel_path: str) -> bytes:
+    sidecar = wheel_path + ".metadata"
+    if os.path.exists(sidecar):
+        with open(sidecar, "rb") as f:
+            return f.read()
+    with zipfile.ZipFile(wheel_path) as wheel:
+        for name in wheel.namelist():
+            parts = name.split("/")
+            if len(parts) == 2 and parts[0].endswith(".dist-info") and parts[1] == "METADATA":
+                return wheel.read(name)
+    raise ValueError(f"No METADATA in wheel {wheel_path}.")
+
+
+def version_key(version: str):
+    """Ключ сравнения версий (по PEP 440, если доступен packaging)."""
+    if Requirement is not None:
+        try:
+            return (1, Version(version), ())
+        except InvalidVersion:
+            pass
+    return (0, None, tuple(int(part) for part in re.findall(r"\d+", version)))
+
+
+RESOLVERS = {
+    "metadata": MetadataResolver,
+    "pip": PipShowResolver,
+    "index": IndexResolver,
+}
+
+
+def create_resolver(name: str = "metadata", repository_url: Optional[str] = None):
+    """Создаёт резолвер по имени из конфигурации."""
+    if name not in RESOLVERS:
+        raise ValueError(f"Unknown resolver: {name}. Expected one of: {', '.join(RESOLVERS)}")
+    if name == "index":
+        return IndexResolver(repository_url)
+    return RESOLVERS[name]()
+
+
+def canonical_name(name: str) -> str:
+    """Нормализованное имя пакета (PEP 503): Python_Dateutil -> python-dateutil."""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def parse_requires(requirements: List[str]) -> List[str]:
+    """Имена зависимостей из строк Requires-Dist, отсортированные как в pip show."""
+    names: Dict[str, str] = {}
+    for requirement in requirements:
+        name = requirement_name(requirement)
+        if name:
+            names.setdefault(canonical_name(name), name)
+    return sorted(names.values(), key=str.lower)
+
+
+def requirement_name(requirement: str) -> Optional[str]:
+    """Имя зависимости или None, если она нужна только для extras или другой платформы."""
+    if Requirement is not None:
+        try:
+            parsed = Requirement(requirement)
+        except InvalidRequirement:
+            return None
+        if parsed.marker is not None and not parsed.marker.evaluate({"extra": ""}):
+            return None
+        return parsed.name
+    requirement, _, marker = requirement.partition(";")
+    if EXTRA_MARKER.search(marker):
+        return None
+    match = REQUIREMENT_NAME.match(requirement)
+    return match.group(1) if match else None
@@ -1,80 +1,36 @@
+import csv
+import io
 import os
-import toml
-import subprocess
-from pathlib import Path
-import networkx as nx
-from typing import Dict, List
-from graphviz import Source
+import tempfile
 import unittest
+import zipfile
+from importlib import metadata
+import networkx as nx
+from analytics import analyze, reach_masks, reach_sums, save_report
+from dot_writer import collapse_fanout, quote, read_dot, write_dot
+from graph_diff import diff_graphs, write_diff_dot
+from main import DependencyVisualizer, count_walks, read_requirements
+from metadata_cache import CachedResolver, MetadataCache
+from profiling import PackageProfile, Profiler, installed_size, parse_import_time, subtree_weights
+from resolvers import IndexResolver, MetadataResolver, PackageInfo, PipShowResolver, create_resolver, parse_requires
+
+
+class FakeResolver:
+    """Резолвер по словарю зависимостей с подсчётом запросов."""
+
+    def __init__(self, packages, version="1.0"):
+        self.packages = packages
+        self.version = version
+        self.calls = []
 
+    def current_version(self, package_name):
+        return self.version if package_name in self.packages else None
 
-class DependencyVisualizer:
-    def __init__(self, config_path: str):
-        self.config = self.load_config(config_path)
-        self.graph = nx.DiGraph()
-
-    def load_config(self, path: str) -> Dict:
-        """Загружает и валидирует конфигурационный файл."""
-        if not os.path.exists(path):
-            raise FileNotFoundError(f"Config file {path} not found.")
-        config = toml.load(path)
-        required_keys = ["graphviz_path", "package_name", "output_path", "max_depth", "repository_url"]
-        for key in required_keys:
-            if key not in config:
-                raise ValueError(f"Missing required config key: {key}")
-        return config
-
-    def get_dependencies(self, package_name: str, depth: int = 0, max_depth: int = 1) -> Dict[str, List[str]]:
-        """Получает зависимости для указанного пакета."""
-        if depth > max_depth:
-            return {}
-        try:
-            output = subprocess.check_output(["pip", "show", package_name], text=True)
-        except subprocess.CalledProcessError:
+    def resolve(self, package_name, timeout=None):
+        self.calls.append(package_name)
+        if package_name not in self.packages:
             raise ValueError(f"Package {package_name} not found in PyPI.")
-        dependencies = {}
-        for line in output.splitlines():
-            if line.startswith("Requires:"):
-                deps = line.split(":")[1].strip().split(", ")
-                for dep in deps:
-                    if dep:
-                        self.graph.add_edge(package_name, dep)
-                        dependencies[dep] = self.get_dependencies(dep, depth + 1, max_depth)
-        return dependencies
-
-    def generate_graphviz_code(self) -> str:
-        """Генерирует код Graphviz для визуализации графа."""
-        graphviz_code = "digraph dependencies {\n"
-        for node1, node2 in self.graph.edges:
-            graphviz_code += f'  "{node1}" -> "{node2}";\n'
-        graphviz_code += "}"
-        return graphviz_code
-
-    def save_graph(self, output_path: str):
-        """Сохраняет граф в файл."""
-        code = self.generate_graphviz_code()
-        with open(output_path, "w") as f:
-            f.write(code)
-
-    def save_png(self, output_path: str):
-        """Генерирует PNG-файл из Graphviz-описания."""
-        os.environ["PATH"] += os.pathsep + os.path.dirname(self.config["graphviz_path"])
-        dot_code = self.generate_graphviz_code()
-        dot_file = Source(dot_code)
-        png_path = os.path.splitext(output_path)[0] + ".png"
-        dot_file.format = "png"
-        dot_file.render(png_path, cleanup=True)
-        print(f"PNG граф сохранён по пути: {png_path}")
-
-    def visualize(self):
-        """Основная функция визуализации."""
-        package_name = self.config["package_name"]
-        max_depth = int(self.config["max_depth"])
-        self.get_dependencies(package_name, max_depth=max_depth)
-        graphviz_code = self.generate_graphviz_code()
-        print(graphviz_code)
-        self.save_graph(self.config["output_path"])
-        self.save_png(self.config["output_path"])
+        return PackageInfo(package_name, self.version, self.packages[package_name])
 
 
 class TestDependencyVisualizer(unittest.TestCase):
@@ -120,15 +76,406 @@ class TestDependencyVisualizer(unittest.TestCase):
         self.visualizer.save_graph("test_output.dot")
         self.assertTrue(os.path.exists("test_output.dot"))
 
+    def test_traversal_resolves_each_package_once(self):
+        resolver = self.visualizer.resolver = FakeResolver({
+            "app": ["web", "cli"],
+            "web": ["core", "six"],
+            "cli": ["core"],
+            "core": ["six"],
+            "six": [],
+        })
+        dependencies = self.visualizer.get_dependencies("app", max_depth=2)
+        self.assertEqual(sorted(resolver.calls), ["app", "cli", "core", "six", "web"])
+        self.assertEqual(dependencies["web"], ["core", "six"])
+        self.assertIn(("core", "six"), self.visualizer.graph.edges)
+        # Без кэша: app, web, cli, core, six, core
+        self.assertEqual(self.visualizer.lookups_saved, 1)
+        self.assertEqual(self.visualizer.cycles, [])
 
+    def test_traversal_merges_name_spellings(self):
+        resolver = self.visualizer.resolver = FakeResolver({
+            "app": ["Pillow", "typing_extensions"],
+            "Pillow": ["typing-extensions"],
+            "typing_extensions": [],
+        })
+        dependencies = self.visualizer.get_dependencies("app", max_depth=3)
+        self.assertEqual(resolver.calls, ["app", "Pillow", "typing_extensions"])
+        self.assertEqual(dependencies["pillow"], ["typing-extensions"])
+        self.assertEqual(sorted(self.visualizer.graph.nodes), ["app", "pillow", "typing-extensions"])
+        self.assertEqual(self.visualizer.graph.nodes["pillow"]["display_name"], "Pillow")
+        self.assertIn('"pillow" [version="1.0", label="Pillow"]', self.visualizer.generate_graphviz_code())
 
+    def test_traversal_respects_max_depth(self):
+        resolver = self.visualizer.resolver = FakeResolver({"a": ["b"], "b": ["c"], "c": ["d"], "d": []})
+        self.visualizer.get_dependencies("a", max_depth=1)
+        self.assertEqual(resolver.calls, ["a", "b"])
+        self.assertEqual(sorted(self.visualizer.graph.edges), [("a", "b"), ("b", "c")])
 
-if __name__ == "__main__":
-    import argparse
+    def test_traversal_reports_cycles(self):
+        resolver = self.visualizer.resolver = FakeResolver({"a": ["b"], "b": ["c"], "c": ["a"]})
+        self.visualizer.get_dependencies("a", max_depth=10)
+        self.assertEqual(resolver.calls, ["a", "b", "c"])
+        self.assertEqual(self.visualizer.cycles, [["a", "b", "c"]])
+        self.assertEqual(count_walks({"a": ["b"], "b": ["c"], "c": ["a"]}, "a", 10), 11)
+
+    def test_concurrent_traversal_matches_serial(self):
+        packages = {f"p{i}": [f"p{j}" for j in range(i + 1, min(i + 4, 40))] for i in range(40)}
+        self.visualizer.resolver = FakeResolver(packages)
+        self.visualizer.get_dependencies("p0", max_depth=5)
+        concurrent = DependencyVisualizer(self.config_path)
+        concurrent.resolver = FakeResolver(packages)
+        concurrent.workers = 8
+        concurrent.get_dependencies("p0", max_depth=5)
+        self.assertEqual(list(concurrent.graph.edges), list(self.visualizer.graph.edges))
+        self.assertEqual(concurrent.lookups, self.visualizer.lookups)
+
+
+class TestBatchMode(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.config_path = os.path.join(self.test_dir.name, "config.toml")
+        self.output_path = os.path.join(self.test_dir.name, "graph.dot")
+        with open(self.config_path, "w") as f:
+            f.write(
+                f"""
+                graphviz_path = "/nonexistent/dot"
+                package_name = "web"
+                output_path = "{self.output_path}"
+                max_depth = 5
+                repository_url = "https://pypi.org"
+                """
+            )
+        self.visualizer = DependencyVisualizer(self.config_path)
+        self.resolver = self.visualizer.resolver = FakeResolver({
+            "web": ["core", "jinja"],
+            "cli": ["core", "click"],
+            "core": ["six"],
+            "jinja": [],
+            "click": [],
+            "six": [],
+        })
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def test_shared_subtrees_resolved_once(self):
+        self.visualizer.visualize(["web", "cli"])
+        self.assertEqual(sorted(self.resolver.calls), ["cli", "click", "core", "jinja", "six", "web"])
+        summary = self.visualizer.reuse_summary()
+        self.assertEqual(summary["web"], {"nodes": 4, "exclusive": 2, "shared": 2})
+        self.assertEqual(summary["cli"], {"nodes": 4, "exclusive": 2, "shared": 2})
+        with open(os.path.join(self.test_dir.name, "graph.cli.dot")) as f:
+            code = f.read()
+        self.assertIn('"cli" -> "click";', code)
+        self.assertNotIn("jinja", code)
+
+    def test_read_requirements(self):
+        path = os.path.join(self.test_dir.name, "requirements.txt")
+        with open(path, "w") as f:
+            f.write("# service deps\n-r base.txt\nweb>=2.0\ncli[color]==1.0  # pinned\n\n"
+                    'legacy; python_version < "3"\nweb\n')
+        self.assertEqual(read_requirements(path), ["web", "cli"])
+
+
+class TestMetadataCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.test_dir.name, "cache.sqlite")
+        self.packages = {"app": ["core", "six"], "core": ["six"], "six": []}
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def resolve_all(self, resolver):
+        cache = MetadataCache(self.cache_path)
+        cached = CachedResolver(resolver, cache)
+        infos = [cached.resolve(name) for name in ("app", "core", "six")]
+        stats = cache.stats()
+        cache.close()
+        return infos, stats
+
+    def test_warm_run_needs_no_lookups(self):
+        cold, stats = self.resolve_all(FakeResolver(self.packages))
+        self.assertEqual((stats["hits"], stats["misses"]), (0, 3))
+        warm_resolver = FakeResolver(self.packages)
+        warm, stats = self.resolve_all(warm_resolver)
+        self.assertEqual(warm_resolver.calls, [])
+        self.assertEqual((stats["hits"], stats["misses"]), (3, 0))
+        self.assertEqual(warm, cold)
+
+    def test_version_change_invalidates(self):
+        self.resolve_all(FakeResolver(self.packages))
+        upgraded = FakeResolver(self.packages, version="2.0")
+        infos, stats = self.resolve_all(upgraded)
+        self.assertEqual(len(upgraded.calls), 3)
+        self.assertEqual(infos[0].version, "2.0")
+        self.assertEqual(stats["entries"], 6)
+
+    def test_other_environment_misses(self):
+        self.resolve_all(FakeResolver(self.packages))
+        cache = MetadataCache(self.cache_path, fingerprint="cpython-2.7-win32")
+        self.assertIsNone(cache.get("app", "1.0"))
+        cache.close()
+
+
+def write_wheel(directory, name, version, requires):
+    """Колесо с METADATA и ещё одним файлом."""
+    path = os.path.join(directory, f"{name}-{version}-py3-none-any.whl")
+    lines = ["Metadata-Version: 2.1", f"Name: {name}", f"Version: {version}"]
+    lines += [f"Requires-Dist: {requirement}" for requirement in requires]
+    with zipfile.ZipFile(path, "w") as wheel:
+        wheel.writestr(f"{name}/__init__.py", "")
+        wheel.writestr(f"{name}-{version}.dist-info/METADATA", "\n".join(lines) + "\n")
+    return path
+
+
+class TestIndexResolver(unittest.TestCase):
+    def setUp(self):
+        """Локальный индекс: app (две версии), core с файлом .metadata, six со страницей index.html."""
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.root = self.test_dir.name
+        for project in ("app", "core", "six"):
+            os.makedirs(os.path.join(self.root, project))
+        write_wheel(os.path.join(self.root, "app"), "app", "1.0", ["core"])
+        write_wheel(os.path.join(self.root, "app"), "app", "1.10", ["core>=2", "six", 'pytest; extra == "test"'])
+        core = write_wheel(os.path.join(self.root, "core"), "core", "2.0", [])
+        with open(core + ".metadata", "w") as f:
+            f.write("Metadata-Version: 2.1\nName: core\nVersion: 2.0\nRequires-Dist: six\n")
+        os.makedirs(os.path.join(self.root, "files"))
+        write_wheel(os.path.join(self.root, "files"), "six", "1.16.0", [])
+        with open(os.path.join(self.root, "six", "index.html"), "w") as f:
+            f.write('<html><body><a href="../files/six-1.16.0-py3-none-any.whl#sha256=00">six</a></body></html>')
+
+    def tearDown(self):
+        self.test_dir.cleanup()
 
-    parser = argparse.ArgumentParser(description="Dependency Visualizer")
-    parser.add_argument("config", help="Path to the configuration file")
-    args = parser.parse_args()
+    def test_resolve_latest_version(self):
+        resolver = IndexResolver("file://" + self.root)
+        info = resolver.resolve("App")
+        self.assertEqual(info, PackageInfo("app", "1.10", ["core", "six"]))
+        self.assertEqual(resolver.resolve("core").requires, ["six"])
+        self.assertEqual(resolver.resolve("six").version, "1.16.0")
+        with self.assertRaises(ValueError):
+            resolver.resolve("numpy")
 
-    visualizer = DependencyVisualizer(args.config)
-    visualizer.visualize()
+    def test_metadata_files_only(self):
+        project_dir = os.path.join(self.root, "web")
+        os.makedirs(project_dir)
+        for version in ("0.9", "1.0"):
+            with open(os.path.join(project_dir, f"web-{version}-py3-none-any.whl.metadata"), "w") as f:
+                f.write(f"Metadata-Version: 2.1\nName: web\nVersion: {version}\nRequires-Dist: core\n")
+        resolver = IndexResolver(self.root)
+        self.assertEqual(resolver.resolve("web"), PackageInfo("web", "1.0", ["core"]))
+
+    def test_visualizer_uses_index(self):
+        config_path = os.path.join(self.root, "config.toml")
+        with open(config_path, "w") as f:
+            f.write(
+                f"""
+                graphviz_path = "/usr/bin/dot"
+                package_name = "app"
+                output_path = "app.dot"
+                max_depth = 3
+                repository_url = "{self.root}"
+                resolver = "index"
+                """
+            )
+        visualizer = DependencyVisualizer(config_path)
+        visualizer.get_dependencies("app", max_depth=3)
+        self.assertEqual(sorted(visualizer.graph.edges), [("app", "core"), ("app", "six"), ("core", "six")])
+
+    def test_remote_index_rejected(self):
+        with self.assertRaises(ValueError):
+            IndexResolver("https://pypi.org/simple")
+
+
+class TestDotWriter(unittest.TestCase):
+    def test_quote(self):
+        self.assertEqual(quote('a"b\\c'), '"a\\"b\\\\c"')
+
+    def test_write_dot(self):
+        graph = nx.DiGraph([("app", "core"), ("core", 'six "x"')])
+        out = io.StringIO()
+        write_dot(graph, out)
+        self.assertEqual(out.getvalue(), 'digraph dependencies {\n  "app" -> "core";\n  "core" -> "six \\"x\\"";\n}\n')
+
+    def test_cluster_by_depth(self):
+        graph = nx.DiGraph([("app", "core"), ("app", "six"), ("core", "six")])
+        out = io.StringIO()
+        write_dot(graph, out, roots=["app"], cluster_by_depth=True)
+        code = out.getvalue()
+        self.assertIn('subgraph cluster_depth_1 {\n    label="depth 1";\n    "core";\n    "six";\n  }', code)
+        self.assertIn('"core" -> "six";', code)
+
+    def test_collapse_fanout(self):
+        graph = nx.DiGraph([("app", f"dep{i}") for i in range(5)] + [("dep4", "deep"), ("dep0", "core")])
+        edges, hidden, visible = collapse_fanout(graph, 2, ["app"])
+        self.assertEqual(edges, [("app", "dep0"), ("app", "dep1"), ("dep0", "core")])
+        self.assertEqual(hidden, {"app": 3})
+        self.assertNotIn("deep", visible)
+        out = io.StringIO()
+        write_dot(graph, out, roots=["app"], max_fanout=2)
+        self.assertIn('"app" -> "app (+3 more)" [style=dashed];', out.getvalue())
+
+
+class TestAnalytics(unittest.TestCase):
+    def setUp(self):
+        self.graph = nx.DiGraph([
+            ("app", "web"), ("app", "cli"), ("web", "core"), ("cli", "core"),
+            ("core", "six"), ("core", "loop1"), ("loop1", "loop2"), ("loop2", "loop1"),
+        ])
+
+    def test_counts_match_descendants(self):
+        report = analyze(self.graph)
+        nodes = {node["name"]: node for node in report["nodes"]}
+        for name in self.graph:
+            self.assertEqual(nodes[name]["transitive_dependencies"], len(nx.descendants(self.graph, name)), name)
+            self.assertEqual(nodes[name]["transitive_fan_in"], len(nx.ancestors(self.graph, name)), name)
+        self.assertEqual(nodes["core"]["fan_in"], 2)
+        self.assertEqual(report["cycles"], [["loop1", "loop2"]])
+
+    def test_reach_sums_and_released_masks(self):
+        dag = nx.DiGraph([(0, 1), (0, 2), (1, 3), (2, 3)])
+        order = [3, 2, 1, 0]
+        sums = reach_sums(dag, order, {0: 1, 1: 2, 2: 3, 3: 10})
+        self.assertEqual(sums, {0: 16, 1: 12, 2: 13, 3: 10})
+        stats = {}
+        live = [stats["live_masks"] for _ in reach_masks(dag, order, stats)]
+        self.assertEqual(live, [1, 2, 2, 0])
+        self.assertEqual(stats["peak_masks"], 2)
+
+    def test_longest_chain(self):
+        report = analyze(self.graph, top=1)
+        self.assertEqual(report["longest_chains"][0][:3], ["app", "cli", "core"])
+        self.assertEqual(report["longest_chains"][0][-1], "{loop1, loop2}")
+        self.assertEqual(report["top_fan_in"], ["loop1"])
+
+    def test_save_csv(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "analytics.csv")
+            save_report(analyze(self.graph), path)
+            with open(path, newline="") as f:
+                rows = list(csv.DictReader(f))
+        self.assertEqual(rows[0]["name"], "app")
+        self.assertEqual(rows[0]["transitive_dependencies"], "6")
+
+
+class TestProfiling(unittest.TestCase):
+    def test_parse_import_time(self):
+        output = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   six.moves\n"
+            "import time:     14204 |      14204 |   urllib3\n"
+            "import time:       990 |      15314 | six\n"
+            "import time:        30 |         30 |     core\n"
+            "import time:        50 |         80 |   sitecustomize\n"
+            "import time:        70 |         70 | sixth\n"
+        )
+        # Собственное время модулей пакета: зависимости (urllib3) не входят
+        self.assertAlmostEqual(parse_import_time(output, ["six", "core"]), 0.00114)
+        self.assertIsNone(parse_import_time(output, ["missing"]))
+
+    def test_subtree_weights(self):
+        graph = nx.DiGraph([("app", "web"), ("app", "cli"), ("web", "core"), ("cli", "core")])
+        weights = subtree_weights(graph, {"app": 1, "web": 2, "cli": 3, "core": 10})
+        self.assertEqual(weights, {"app": 16, "web": 12, "cli": 13, "core": 10})
+        graph.add_edges_from([("core", "loop"), ("loop", "core")])
+        weights = subtree_weights(graph, {"app": 1, "web": 2, "cli": 3, "core": 10, "loop": 100})
+        self.assertEqual(weights["app"], 116)
+        self.assertEqual(weights["loop"], 110)
+
+    def test_profile_installed_package(self):
+        profile = Profiler().profile("requests")
+        self.assertEqual(profile.size, installed_size(metadata.distribution("requests")))
+        self.assertGreater(profile.size, 0)
+        self.assertGreater(profile.import_time, 0)
+        self.assertEqual(Profiler().profile("no-such-package-xyz"), PackageProfile(0, None))
+
+    def test_profile_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = MetadataCache(os.path.join(directory, "cache.sqlite"))
+            cache.put_profile("requests", metadata.version("requests"), PackageProfile(42, 0.5))
+            self.assertEqual(Profiler(cache).profile("requests"), PackageProfile(42, 0.5))
+            cache.close()
+
+
+class TestGraphDiff(unittest.TestCase):
+    def make_graph(self, versions, edges):
+        graph = nx.DiGraph(edges)
+        for name, version in versions.items():
+            graph.add_node(name, version=version)
+        return graph
+
+    def test_diff_graphs(self):
+        old = self.make_graph({"app": "1.0", "Jinja2": "2.11", "six": "1.15"},
+                              [("app", "Jinja2"), ("app", "six")])
+        new = self.make_graph({"app": "1.1", "jinja2": "3.1", "markupsafe": "2.1"},
+                              [("app", "jinja2"), ("jinja2", "markupsafe")])
+        diff = diff_graphs(old, new)
+        self.assertEqual(diff.added_nodes, ["markupsafe"])
+        self.assertEqual(diff.removed_nodes, ["six"])
+        self.assertEqual(diff.changed_nodes, {"app": ("1.0", "1.1"), "jinja2": ("2.11", "3.1")})
+        self.assertEqual(diff.added_edges, [("jinja2", "markupsafe")])
+        self.assertEqual(diff.removed_edges, [("app", "six")])
+        out = io.StringIO()
+        write_diff_dot(old, new, diff, out)
+        code = out.getvalue()
+        self.assertIn('"app" -> "six" [color="red", style="dashed"];', code)
+        self.assertIn('label="jinja2\\n2.11 -> 3.1"', code)
+
+    def test_saved_graph_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            config_path = os.path.join(directory, "config.toml")
+            dot_path = os.path.join(directory, "graph.dot")
+            with open(config_path, "w") as f:
+                f.write(
+                    f"""
+                    graphviz_path = "/usr/bin/dot"
+                    package_name = "app"
+                    output_path = "{dot_path}"
+                    max_depth = 3
+                    repository_url = "https://pypi.org"
+                    max_fanout = 1
+                    """
+                )
+            visualizer = DependencyVisualizer(config_path)
+            visualizer.resolver = FakeResolver({"app": ["core", 'we"ird'], "core": [], 'we"ird': []})
+            visualizer.get_dependencies("app", max_depth=3)
+            visualizer.save_graph(dot_path)
+            graph = read_dot(dot_path)
+        self.assertEqual(list(graph.edges), [("app", "core")])
+        self.assertEqual(graph.nodes["app"]["version"], "1.0")
+        visualizer.max_fanout = 0
+        self.assertEqual(diff_graphs(visualizer.graph, visualizer.graph).added_edges, [])
+
+
+class TestResolvers(unittest.TestCase):
+    def test_parse_requires(self):
+        requires = parse_requires([
+            "urllib3<3,>=1.26",
+            "idna<4,>=2.5",
+            "Certifi>=2017.4.17",
+            'PySocks!=1.5.7,>=1.5.6; extra == "socks"',
+            "urllib3[socks]",
+        ])
+        self.assertEqual(requires, ["Certifi", "idna", "urllib3"])
+
+    def test_metadata_matches_pip_show(self):
+        metadata_info = MetadataResolver().resolve("requests")
+        pip_info = PipShowResolver().resolve("requests")
+        self.assertEqual(metadata_info.requires, pip_info.requires)
+        self.assertEqual(metadata_info.version, pip_info.version)
+
+    def test_pip_show_timeout(self):
+        with self.assertRaises(ValueError):
+            PipShowResolver().resolve("requests", timeout=0.001)
+
+    def test_unknown_package(self):
+        with self.assertRaises(ValueError):
+            MetadataResolver().resolve("no-such-package-xyz")
+        with self.assertRaises(ValueError):
+            create_resolver("conda")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+import argparse
+import fnmatch
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from config_cache import DEFAULT_MAX_SIZE, CompiledCache
+from config_parser import convert_file
+
+_cache = None  # Кэш процесса-исполнителя
+
+
+class BatchResult:
+    """Итог преобразования одного файла; error - текст ошибки или None."""
+    __slots__ = ("input_file", "output_file", "size", "cached", "written", "error")
+
+    def __init__(self, input_file, output_file, size, cached=False, written=False, error=None):
+        self.input_file = input_file
+        self.output_file = output_file
+        self.size = size
+        self.cached = cached
+        self.written = written
+        self.error = error
+
+
+def collect_files(paths, pattern="*.txt"):
+    """
+    Входные файлы по путям, шаблонам glob и каталогам (рекурсивно, по pattern).
+    :param paths: пути, шаблоны или каталоги
+    :param pattern: шаблон имён файлов в каталогах
+    :return: (список пар (файл, каталог-основа или None), список ошибок)
+    """
+    files = []
+    errors = []
+    seen = set()
+    for path in paths:
+        if os.path.isdir(path):
+            matches = []
+            for directory, subdirectories, names in os.walk(path):
+                subdirectories.sort()
+                matches += [os.path.join(directory, name) for name in sorted(fnmatch.filter(names, pattern))]
+            base = path
+        else:
+            matches = sorted(match for match in glob.glob(path, recursive=True) if os.path.isfile(match))
+            base = None
+        if not matches:
+            errors.append(f"{path}: нет подходящих файлов")
+        for match in matches:
+            key = os.path.abspath(match)
+            if key not in seen:
+                seen.add(key)
+                files.append((match, base))
+    return files, errors
+
+
+def output_path(input_file, base=None, output_dir=None):
+    """
+    Путь YAML файла: рядом с входным или в output_dir (для каталогов - с сохранением вложенности).
+    """
+    if output_dir is None:
+        target = input_file
+    elif base is not None:
+        target = os.path.join(output_dir, os.path.relpath(input_file, base))
+    else:
+        target = os.path.join(output_dir, os.path.basename(input_file))
+    return os.path.splitext(target)[0] + ".yaml"
+
+
+def _init_worker(cache_dir, cache_size):
+    global _cache
+    _cache = CompiledCache(cache_dir, cache_size) if cache_dir else None
+
+
+def _convert(job):
+    input_file, output_file = job
+    try:
+        size = os.path.getsize(input_file)
+        directory = os.path.dirname(output_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        cached, written = convert_file(input_file, output_file, _cache)
+        return BatchResult(input_file, output_file, size, cached, written)
+    except Exception as e:
+        return BatchResult(input_file, output_file, 0, error=str(e))
+
+
+def run_batch(jobs, workers=None, cache_dir=None, cache_size=DEFAULT_MAX_SIZE):
+    """
+    Преобразует файлы в пуле процессов.
+    :param jobs: пары (входной файл, выходной файл)
+    :param workers: число процессов (по умолчанию - число процессоров); 1 - без пула
+    :param cache_dir: каталог кэша разобранных конфигураций или None
+    :param cache_size: предельный размер кэша, байт
+    :return: список BatchResult в порядке jobs
+    """
+    jobs = list(jobs)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs) or 1))
+    if workers == 1:
+        _init_worker(cache_dir, cache_size)
+        return [_convert(job) for job in jobs]
+    # Крупные порции уменьшают накладные расходы на передачу задач между процессами
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(cache_dir, cache_size)) as pool:
+        return list(pool.map(_convert, jobs, chunksize=chunksize))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Пакетное преобразование конфигураций в YAML")
+    arg_parser.add_argument("paths", nargs="+", help="Файлы, шаблоны glob или каталоги")
+    arg_parser.add_argument("-o", "--output-dir", help="Каталог для YAML (по умолчанию - рядом с входными)")
+    arg_parser.add_argument("-j", "--workers", type=int, help="Число процессов (по умолчанию - число процессоров)")
+    arg_parser.add_argument("--pattern", default="*.txt", help="Шаблон имён файлов в каталогах")
+    arg_parser.add_argument("--cache-dir", help="Каталог кэша разобранных конфигураций")
+    arg_parser.add_argument("--cache-size", type=float, default=DEFAULT_MAX_SIZE / 1024 / 1024,
+                            help="Предельный размер кэша, МБ")
+    args = arg_parser.parse_intermixed_args()
+
+    files, errors = collect_files(args.paths, args.pattern)
+    jobs = []
+    outputs = {}
+    for input_file, base in files:
+        target = output_path(input_file, base, args.output_dir)
+        key = os.path.abspath(target)
+        if key in outputs:
+            errors.append(f"{input_file}: выходной файл {target} совпадает с выходным файлом {outputs[key]}")
+            continue
+        outputs[key] = input_file
+        jobs.append((input_file, target))
+
+    started = time.perf_counter()
+    results = run_batch(jobs, args.workers, args.cache_dir, int(args.cache_size * 1024 * 1024))
+    elapsed = max(time.perf_counter() - started, 1e-9)
+
+    errors += [f"{result.input_file}: {result.error}" for result in results if result.error is not None]
+    converted = [result for result in results if result.error is None]
+    megabytes = sum(result.size for result in converted) / 1024 / 1024
+    print(f"Обработано файлов: {len(converted)} из {len(jobs)}, "
+          f"из кэша: {sum(result.cached for result in converted)}, "
+          f"перезаписано: {sum(result.written for result in converted)}")
+    print(f"Время: {elapsed:.2f} с, {len(converted) / elapsed:.1f} файлов/с, {megabytes / elapsed:.2f} МБ/с")
+    if errors:
+        print(f"Ошибки ({len(errors)}):", file=sys.stderr)
+        for error in errors:
+            print(f"  {error}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import argparse
+import io
+import time
+
+from config_parser import ConfigParser
+
+BLOCK = """{{{{!-- Сервер {index} --}}}}
+def port{index} = {port};
+
+begin
+    name := "server-{index}";
+    port := ![port{index}];
+    enabled := true;
+    modules := #( "mod_rewrite", "mod_headers", "mod_ssl" );
+    security := begin
+        ssl := true;
+        certificate := "/etc/ssl/certs/server-{index}.crt";
+    end
+end
+
+"""
+
+
+def generate_config(size: int) -> str:
+    """Конфигурация из повторяющихся блоков размером не меньше size байт."""
+    blocks = []
+    total = 0
+    index = 0
+    while total < size:
+        block = BLOCK.format(index=index, port=1024 + index % 60000)
+        blocks.append(block)
+        total += len(block.encode("utf-8"))
+        index += 1
+    return "".join(blocks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parser throughput on growing configs")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 2, 4, 8], help="Config sizes in MB")
+    parser.add_argument("--repeat", type=int, default=3, help="Best of N runs")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        text = generate_config(int(size * 1024 * 1024))
+        megabytes = len(text.encode("utf-8")) / 1024 / 1024
+        best = None
+        for _ in range(args.repeat):
+            config = ConfigParser()
+            started = time.perf_counter()
+            config.parse(io.StringIO(text))
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"{megabytes:6.1f} MB: {len(config.output_data)} blocks, {best:.2f} s, {megabytes / best:.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import hashlib
+import marshal
+import os
+
+CACHE_VERSION = b"1"  # Меняется вместе с форматом разобранных данных
+CACHE_SUFFIX = ".marshal"
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024  # Байт на весь каталог кэша
+
+
+def content_key(data):
+    """
+    Ключ кэша: хэш содержимого файла и версии формата.
+    Константы файла определяются только его текстом, поэтому хэша достаточно.
+    :param data: содержимое входного файла (bytes или mmap)
+    :return: строка-ключ
+    """
+    digest = hashlib.sha256(CACHE_VERSION + b"\0")
+    digest.update(data)
+    return digest.hexdigest()
+
+
+class CompiledCache:
+    """
+    Кэш разобранных конфигураций в каталоге: один файл marshal на ключ.
+    Размер каталога ограничен max_size; при превышении удаляются
+    давно не использовавшиеся записи (по времени изменения файла).
+    """
+
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + CACHE_SUFFIX)
+
+    def get(self, key):
+        """
+        Сохранённое значение по ключу или None.
+        :param key: ключ из content_key
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as file:
+                data = marshal.load(file)
+        except (OSError, EOFError, ValueError, TypeError):
+            # Нет записи или она повреждена - разбираем заново
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)  # Отметка использования для вытеснения
+        except OSError:
+            pass  # Запись мог вытеснить другой процесс
+        self.hits += 1
+        return data
+
+    def put(self, key, data):
+        """
+        Сохраняет разобранные данные и вытесняет старые записи сверх max_size.
+        :param key: ключ из content_key
+        :param data: значение, поддерживаемое marshal
+        """
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as file:
+            marshal.dump(data, file)
+        os.replace(temp_path, path)
+        self.evict(keep=path)
+
+    def evict(self, keep=None):
+        """
+        Удаляет самые старые записи, пока каталог больше max_size.
+        :param keep: запись, которую удалять нельзя (только что сохранённая)
+        """
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(CACHE_SUFFIX):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, entry.path, stat.st_size))
+            total += stat.st_size
+        entries.sort()
+        for _, path, size in entries:
+            if total <= self.max_size:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
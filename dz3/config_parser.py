@@ -1,12 +1,159 @@
+import argparse
+import codecs
+import hashlib
+import io
+import mmap
+import os
 import re
 import yaml
-import sys
+
+from config_cache import DEFAULT_MAX_SIZE, CompiledCache, content_key
+
+# Один скомпилированный шаблон для всех лексем; группы проверяются по порядку
+TOKEN_PATTERN = re.compile(r"""
+    (?P<comment>\{\{!--.*?--\}\})
+  | (?P<unclosed>\{\{!--)
+  | (?P<space>\s+)
+  | (?P<line_comment>\#(?!\()[^\n]*)
+  | (?P<array>\#\()
+  | (?P<const>!\[\s*(?P<const_name>[A-Za-z_]\w*)\s*\])
+  | (?P<assign>:=)
+  | (?P<equals>=)
+  | (?P<semicolon>;)
+  | (?P<comma>,)
+  | (?P<close>\))
+  | (?P<number>-?\d+(?:\.\d+)?(?![\w.]))
+  | (?P<string>"[^"\n]*")
+  | (?P<name>[A-Za-z_]\w*)
+  | (?P<error>.)
+""", re.VERBOSE | re.DOTALL)
+
+KEYWORDS = {"def", "begin", "end", "true", "false"}
+CHUNK_SIZE = 1 << 16  # Символов за одно чтение из файла
+DETECT_PREFIX = 1 << 16  # Байт, по которым определяется кодировка
+MMAP_THRESHOLD = 1 << 20  # Файлы от этого размера отображаются в память
+
+# Порядок важен: BOM UTF-32 LE начинается с BOM UTF-16 LE
+BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+FALLBACK_ENCODINGS = ('windows-1251', 'latin1')
+
+
+class YamlDumper(getattr(yaml, "CSafeDumper", yaml.SafeDumper)):
+    """Быстрый (на C, если доступен) безопасный дампер без якорей и ссылок.
+
+    Без якорей вывод блока не зависит от соседних блоков, поэтому потоковая
+    запись совпадает с обычной.
+    """
+
+    def ignore_aliases(self, data):
+        return True
+
+
+def dump_yaml(data, stream=None):
+    """
+    Записывает данные в YAML в едином для всех режимов виде.
+    :param data: значения верхнего уровня
+    :param stream: открытый файл; если не задан, возвращается строка
+    """
+    return yaml.dump(data, stream, Dumper=YamlDumper, default_flow_style=False, allow_unicode=True)
+
+
+class ConfigSyntaxError(ValueError):
+    """Синтаксическая ошибка с номером строки и столбца (с 1)."""
+
+    def __init__(self, message, line, column):
+        super().__init__(f"Строка {line}, столбец {column}: {message}")
+        self.line = line
+        self.column = column
+
+
+class Token:
+    __slots__ = ("kind", "value", "line", "column")
+
+    def __init__(self, kind, value, line, column):
+        self.kind = kind
+        self.value = value
+        self.line = line
+        self.column = column
+
+    def describe(self):
+        return "конец файла" if self.kind == "eof" else f"'{self.value}'"
+
+
+def tokenize(source, chunk_size=CHUNK_SIZE):
+    """
+    Разбивает текст на лексемы за один проход.
+    Пробелы и комментарии пропускаются; ключевые слова выделяются из имён.
+    Поток читается частями по chunk_size символов, поэтому весь файл в памяти не держится.
+    :param source: строка или открытый текстовый файл
+    :param chunk_size: размер части при чтении из файла
+    :return: генератор лексем Token
+    """
+    if isinstance(source, str):
+        buffer, read = source, None
+    else:
+        buffer, read = source.read(chunk_size), source.read
+    line = 1
+    line_start = 0
+    # BOM в начале файла (utf-8-sig) не является частью конфигурации
+    position = 1 if buffer.startswith("\ufeff") else 0
+    match_at = TOKEN_PATTERN.match
+    while True:
+        if position >= len(buffer):
+            if read is None:
+                break
+            match = None
+        else:
+            match = match_at(buffer, position)
+            end = match.end()
+            kind = match.lastgroup
+        # Лексема могла оборваться на границе части - дочитываем и разбираем заново
+        # (размер чтения растёт вместе с остатком буфера, так что дочитывание линейно)
+        if read is not None and (match is None or end == len(buffer) or kind in ("unclosed", "error")):
+            chunk = read(max(chunk_size, len(buffer) - position))
+            if not chunk:
+                read = None
+            buffer = buffer[position:] + chunk
+            line_start -= position
+            position = 0
+            continue
+        column = position - line_start + 1
+        if kind in ("space", "comment", "line_comment"):
+            newlines = buffer.count("\n", position, end)
+            if newlines:
+                line += newlines
+                line_start = buffer.rfind("\n", position, end) + 1
+            position = end
+            continue
+        if kind == "unclosed":
+            raise ConfigSyntaxError("незакрытый комментарий {{!--", line, column)
+        if kind == "error":
+            raise ConfigSyntaxError(f"неожиданный символ '{match.group()}'", line, column)
+        if kind == "const_name":
+            kind = "const"
+        value = match.group()
+        if kind == "name" and value in KEYWORDS:
+            kind = value
+        elif kind == "const":
+            value = match.group("const_name")
+        yield Token(kind, value, line, column)
+        position = end
+    yield Token("eof", "", line, position - line_start + 1)
+
 
 class ConfigParser:
     def __init__(self):
         self.variables = {}  # Для хранения переменных (например, serverPort, serverHost)
         self.comments = []   # Для хранения комментариев
         self.output_data = []  # Для хранения структуры конфигурации
+        self._tokens = None
+        self._token = None
 
     def transform_value(self, value):
         """
@@ -14,106 +161,123 @@ class ConfigParser:
         :param value: строка
         :return: преобразованное значение
         """
-        value = value.strip()
+        self._start(value)
+        result = self._value()
+        self._expect("eof")
+        return result
 
-        # Обработка выражений вида ![имя] для вычисления констант
-        if value.startswith('![') and value.endswith(']'):
-            const_name = value[2:-1].strip()
-            if const_name in self.variables:
-                return self.variables[const_name]
+    def parse(self, input_stream):
+        """
+        Разбирает конфигурацию из потока: лексер и рекурсивный спуск за один проход.
+        Словари (begin ... end) и массивы #( ... ) верхнего уровня попадают в output_data.
+        :param input_stream: открытый текстовый файл
+        """
+        self.output_data.extend(self.iter_blocks(input_stream))
+
+    def iter_blocks(self, input_stream):
+        """
+        Разбирает конфигурацию, возвращая значения верхнего уровня по мере разбора.
+        :param input_stream: открытый текстовый файл
+        :return: генератор словарей и массивов верхнего уровня
+        """
+        self._start(input_stream)
+        while self._token.kind != "eof":
+            kind = self._token.kind
+            if kind == "def":
+                self._advance()
+                name = self._expect("name").value
+                self._expect("equals")
+                self.variables[name] = self._value()
+                self._expect("semicolon")
+            elif kind == "name":
+                # Присваивание вне словаря определяет переменную
+                name = self._advance().value
+                self._expect("assign")
+                self.variables[name] = self._value()
+                self._expect("semicolon")
+            elif kind in ("begin", "array"):
+                yield self._value()
+                self._skip("semicolon")
             else:
-                raise ValueError(f"Константа '{const_name}' не найдена.")
+                self._error(f"ожидалось def, begin или #(, получено {self._token.describe()}")
 
-        # Обработка чисел
-        if value.isdigit():
-            return int(value)
+    def _start(self, source):
+        self._tokens = tokenize(source)
+        self._token = next(self._tokens)
 
-        # Обработка строк
-        if value.startswith('"') and value.endswith('"'):
-            return value[1:-1]
+    def _advance(self):
+        token = self._token
+        self._token = next(self._tokens)
+        return token
 
-        # Обработка булевых значений
-        if value.lower() == "true":
-            return True
-        elif value.lower() == "false":
-            return False
+    def _expect(self, kind):
+        if self._token.kind != kind:
+            expected = {"name": "имя", "equals": "'='", "assign": "':='", "semicolon": "';'",
+                        "close": "')'", "end": "end", "eof": "конец файла"}.get(kind, kind)
+            self._error(f"ожидалось {expected}, получено {self._token.describe()}")
+        return self._advance()
 
-        # Если значение - это массив
-        if value.startswith('#(') and value.endswith(')'):
-            values = value[2:-1].split(',')
-            return [v.strip().strip('"') for v in values]
+    def _skip(self, kind):
+        if self._token.kind == kind:
+            self._advance()
 
-        return value
+    def _error(self, message, token=None):
+        token = token or self._token
+        raise ConfigSyntaxError(message, token.line, token.column)
 
-    def parse(self, input_stream):
-        lines = input_stream.readlines()
-        current_scope = None
-
-        for line in lines:
-            line = line.strip()
-
-            # Пропуск пустых строк и комментариев
-            if not line or line.startswith("{{!--") or line.startswith("#"):
-                continue
-
-            # Обработка многострочного комментария
-            if line.startswith("{{!--"):
-                comment = []
-                while not line.endswith("--}}"):
-                    comment.append(line)
-                    line = next(lines).strip()
-                comment.append(line)
-                self.comments.append("\n".join(comment))
-                continue
-
-            # Обработка определения констант
-            if line.startswith("def"):
-                match = re.match(r'def\s+(\w+)\s*=\s*(.*);', line)
-                if match:
-                    const_name = match.group(1).strip()
-                    value = self.transform_value(match.group(2).strip())
-                    self.variables[const_name] = value
-                    continue
-                else:
-                    raise ValueError(f"Ошибка в определении константы: {line}")
-
-            # Обработка начала и конца словаря (begin...end)
-            if line.startswith("begin"):
-                if current_scope is None:  # Если current_scope ещё не инициализирован, инициализируем его
-                    current_scope = {}
-                continue
-
-            if line.startswith("end"):
-                if current_scope is not None:
-                    self.output_data.append(current_scope)
-                    current_scope = None
-                continue
-
-            # Обработка присваивания значений
-            match = re.match(r'(\w+)\s*:=\s*(.*);', line)
-            if match:
-                name = match.group(1).strip()
-                value = self.transform_value(match.group(2).strip())
-                if current_scope is not None:
-                    current_scope[name] = value
-                else:
-                    self.variables[name] = value
-                continue
-
-            # Обработка вложенных блоков (например, logging и security)
-            match_logging = re.match(r'(\w+)\s*:=\s*begin', line)
-            if match_logging:
-                section_name = match_logging.group(1).strip()
-                if current_scope is None:  # Добавлена дополнительная проверка для безопасности
-                    current_scope = {}
-                current_scope[section_name] = {}
-                continue
-
-            match_end_section = re.match(r'end\s*', line)
-            if match_end_section and current_scope:
-                self.output_data.append(current_scope)
-                current_scope = None
-                continue
+    def _value(self):
+        token = self._token
+        kind = token.kind
+        if kind == "number":
+            self._advance()
+            return float(token.value) if "." in token.value else int(token.value)
+        if kind == "string":
+            self._advance()
+            return token.value[1:-1]
+        if kind in ("true", "false"):
+            self._advance()
+            return kind == "true"
+        if kind == "const":
+            self._advance()
+            if token.value not in self.variables:
+                self._error(f"константа '{token.value}' не найдена", token)
+            return self.variables[token.value]
+        if kind == "begin":
+            return self._dict()
+        if kind == "array":
+            return self._array()
+        if kind == "name":
+            self._advance()
+            return token.value
+        self._error(f"ожидалось значение, получено {token.describe()}")
+
+    def _dict(self):
+        """Словарь: begin имя := значение; ... end (';' после вложенного словаря необязательна)."""
+        self._expect("begin")
+        result = {}
+        while self._token.kind != "end":
+            name = self._expect("name").value
+            self._expect("assign")
+            nested = self._token.kind == "begin"
+            result[name] = self._value()
+            if self._token.kind == "semicolon":
+                self._advance()
+            elif not nested and self._token.kind != "end":
+                self._expect("semicolon")
+        self._advance()
+        return result
+
+    def _array(self):
+        """Массив: #( значение, значение, ... )."""
+        self._expect("array")
+        result = []
+        if self._token.kind != "close":
+            result.append(self._value())
+            while self._token.kind == "comma":
+                self._advance()
+                result.append(self._value())
+        self._expect("close")
+        return result
 
     def save_to_yaml(self, output_file):
         """
@@ -121,43 +285,194 @@ class ConfigParser:
         :param output_file: Путь к файлу
         """
         with open(output_file, 'w', encoding='utf-8') as file:
-            yaml.dump(self.output_data, file, default_flow_style=False, allow_unicode=True)
+            dump_yaml(self.output_data, file)
 
+    def stream_to_yaml(self, input_stream, output_file):
+        """
+        Разбирает конфигурацию и пишет каждый блок верхнего уровня в YAML сразу после его end.
+        В памяти одновременно находится только один блок; output_data не заполняется.
+        Результат совпадает с parse + save_to_yaml. При ошибке выходной файл не изменяется.
+        :param input_stream: открытый текстовый файл
+        :param output_file: Путь к файлу
+        """
+        temp_file = output_file + ".tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as file:
+                written = False
+                for block in self.iter_blocks(input_stream):
+                    dump_yaml([block], file)
+                    written = True
+                if not written:
+                    dump_yaml([], file)
+            os.replace(temp_file, output_file)
+        finally:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
 
-def open_file_with_encoding(input_file):
+
+class MappedReader(io.RawIOBase):
+    """Чтение из bytes или mmap частями, без копирования всего содержимого."""
+
+    def __init__(self, data):
+        self._data = data
+        self._view = memoryview(data)
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = min(len(buffer), len(self._view) - self._position)
+        buffer[:count] = self._view[self._position:self._position + count]
+        self._position += count
+        return count
+
+    def close(self):
+        if not self.closed:
+            self._view.release()
+            if isinstance(self._data, mmap.mmap):
+                self._data.close()
+        super().close()
+
+
+def read_input(input_file, mmap_threshold=MMAP_THRESHOLD):
     """
-    Функция для открытия файла с различными кодировками.
-    Пробует открыть файл с кодировками 'utf-8', 'windows-1251', 'latin1'.
+    Содержимое файла: bytes, а для файлов от mmap_threshold байт - mmap только для чтения.
     :param input_file: путь к файлу
-    :return: открытый файл
+    :param mmap_threshold: размер, начиная с которого файл отображается в память
     """
-    encodings = ['utf-8', 'windows-1251', 'latin1']  # Добавлены дополнительные кодировки
-    for encoding in encodings:
+    with open(input_file, 'rb') as file:
+        if os.fstat(file.fileno()).st_size >= mmap_threshold:
+            try:
+                return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                pass  # Пустые и специальные файлы не отображаются
+        return file.read()
+
+
+def detect_encoding(data, prefix_size=DETECT_PREFIX):
+    """
+    Определяет кодировку по байтам: BOM, затем проверка UTF-8 на первых prefix_size байтах,
+    затем windows-1251 и latin1. Файл целиком для этого не читается.
+    :param data: bytes или mmap
+    :param prefix_size: сколько байт проверять
+    :return: имя кодировки
+    """
+    head = data[:4]
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+    prefix = data[:prefix_size]
+    try:
+        # Символ, оборванный на границе префикса, ошибкой не считается
+        codecs.getincrementaldecoder('utf-8')().decode(prefix, final=len(prefix) == len(data))
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    for encoding in FALLBACK_ENCODINGS:
         try:
-            return open(input_file, 'r', encoding=encoding)
+            prefix.decode(encoding)
+            return encoding
         except UnicodeDecodeError:
-            print(f"Ошибка кодировки для файла {input_file} с кодировкой {encoding}. Попробую другую.")
-        except Exception as e:
-            print(f"Не удалось открыть файл {input_file} с кодировкой {encoding}. Ошибка: {e}")
-    raise ValueError(f"Не удалось открыть файл {input_file} с поддерживаемыми кодировками.")
+            continue
+    return FALLBACK_ENCODINGS[-1]
+
+
+def wrap_text(data, encoding):
+    """
+    Текстовый поток поверх bytes или mmap; при закрытии закрывается и mmap.
+    """
+    return io.TextIOWrapper(io.BufferedReader(MappedReader(data), CHUNK_SIZE), encoding=encoding)
+
+
+def open_file_with_encoding(input_file):
+    """
+    Функция для открытия файла с определением кодировки.
+    Кодировка определяется по байтам (BOM, проверка UTF-8 на начале файла,
+    иначе 'windows-1251', 'latin1'); большие файлы отображаются в память,
+    так что определение кодировки и разбор читают данные один раз.
+    Если начало файла - корректный UTF-8, а дальше встречаются другие байты,
+    ошибка декодирования возникнет при чтении.
+    :param input_file: путь к файлу
+    :return: открытый текстовый файл
+    """
+    data = read_input(input_file)
+    return wrap_text(data, detect_encoding(data))
+
+
+def convert_file(input_file, output_file, cache=None):
+    """
+    Преобразует файл в YAML, используя кэш разобранных конфигураций.
+    При попадании в кэш разбор и подстановка констант не выполняются,
+    а если выходной файл совпадает с сохранённым хэшем YAML - не строится и YAML.
+    Выходной файл перезаписывается, только если его содержимое изменилось.
+    :param input_file: путь к файлу конфигурации
+    :param output_file: путь к YAML файлу
+    :param cache: CompiledCache или None
+    :return: (взято из кэша, файл перезаписан)
+    """
+    try:
+        with open(output_file, 'rb') as file:
+            existing = file.read()
+    except OSError:
+        existing = None
+
+    entry = None
+    key = None
+    # Ключ кэша и разбор используют одни и те же прочитанные (или отображённые) байты
+    data = read_input(input_file)
+    with wrap_text(data, detect_encoding(data)) as file:
+        if cache is not None:
+            key = content_key(data)
+            entry = cache.get(key)
+        if entry is None:
+            parser = ConfigParser()
+            parser.parse(file)
+            output_data = parser.output_data
+    if entry is not None:
+        output_data, digest = entry
+        if existing is not None and hashlib.sha256(existing).hexdigest() == digest:
+            return True, False
+
+    text = dump_yaml(output_data).encode('utf-8')
+    if cache is not None and entry is None:
+        cache.put(key, (output_data, hashlib.sha256(text).hexdigest()))
+    if text == existing:
+        return entry is not None, False
+    with open(output_file, 'wb') as file:
+        file.write(text)
+    return entry is not None, True
 
 
 def main():
-    if len(sys.argv) > 1:
-        input_file = sys.argv[1]
-        output_file = sys.argv[2] if len(sys.argv) > 2 else "output.yaml"
+    arg_parser = argparse.ArgumentParser(description="Преобразование конфигурационного языка в YAML")
+    arg_parser.add_argument("input_file", help="Файл конфигурации")
+    arg_parser.add_argument("output_file", nargs="?", default="output.yaml", help="Выходной YAML файл")
+    arg_parser.add_argument("--stream", action="store_true",
+                            help="Писать блоки по мере разбора (память - на один блок)")
+    arg_parser.add_argument("--cache-dir", help="Каталог кэша разобранных конфигураций")
+    arg_parser.add_argument("--cache-size", type=float, default=DEFAULT_MAX_SIZE / 1024 / 1024,
+                            help="Предельный размер кэша, МБ")
+    args = arg_parser.parse_args()
+    if args.stream and args.cache_dir:
+        arg_parser.error("--stream и --cache-dir несовместимы: в потоковом режиме разобранные данные не хранятся")
 
-        # Попытка открыть файл с кодировками
-        try:
-            with open_file_with_encoding(input_file) as file:
-                parser = ConfigParser()
-                parser.parse(file)
-                parser.save_to_yaml(output_file)
-                print(f"Файл успешно обработан и сохранён в {output_file}")
-        except Exception as e:
-            print(f"Ошибка при чтении или сохранении файла: {e}")
-    else:
-        print("Ошибка: Не указан файл входных данных или выходной файл.")
+    # Попытка открыть файл с кодировками
+    try:
+        if args.stream:
+            with open_file_with_encoding(args.input_file) as file:
+                ConfigParser().stream_to_yaml(file, args.output_file)
+            print(f"Файл успешно обработан и сохранён в {args.output_file}")
+        else:
+            cache = CompiledCache(args.cache_dir, int(args.cache_size * 1024 * 1024)) if args.cache_dir else None
+            cached, written = convert_file(args.input_file, args.output_file, cache)
+            source = " (из кэша)" if cached else ""
+            if written:
+                print(f"Файл успешно обработан{source} и сохранён в {args.output_file}")
+            else:
+                print(f"Файл успешно обработан{source}, {args.output_file} не изменился")
+    except Exception as e:
+        print(f"Ошибка при чтении или сохранении файла: {e}")
 
 
 if __name__ == '__main__':
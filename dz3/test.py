@@ -1,6 +1,12 @@
 import unittest
+import io
 import os
-from config_parser import ConfigParser
+import tempfile
+from unittest import mock
+from batch import collect_files, output_path, run_batch
+from config_cache import CompiledCache, content_key
+import mmap
+from config_parser import ConfigParser, ConfigSyntaxError, convert_file, detect_encoding, read_input, tokenize, wrap_text
 from config_parser import open_file_with_encoding  # Ensure you import this function
 
 class TestConfigParser(unittest.TestCase):
@@ -94,19 +100,21 @@ end
             output_data = yaml_file.read()
 
         expected_output = """- documentRoot: /var/www/html
-  firewall: true
   host: example.com
+  logging:
+    accessLog: /var/log/nginx/access.log
+    errorLog: /var/log/nginx/error.log
+    logLevel: warn
   port: 443
-  security: {}
+  security:
+    firewall: true
+    ssl: true
+    sslCertificate: /etc/ssl/certs/server.crt
+    sslKey: /etc/ssl/private/server.key
   server: nginx
-  ssl: true
-  sslCertificate: /etc/ssl/certs/server.crt
-  sslKey: /etc/ssl/private/server.key
-- accessLog: /var/log/nginx/access.log
-  errorLog: /var/log/nginx/error.log
-  logLevel: warn
-  logging: {}
-
+- - mod_rewrite
+  - mod_headers
+  - mod_ssl
 """
         self.assertEqual(output_data.strip(), expected_output.strip())
 
@@ -125,27 +133,193 @@ end
         with open(self.output_file, 'r', encoding='utf-8') as yaml_file:
             output_data = yaml_file.read()
 
-        expected_output = """- devices:
+        expected_output = """- camera:
+    enabled: true
+    recording: Motion Detection
+    storage: Cloud
+  devices:
   - Thermostat
   - Light
   - Camera
+  light:
+    color: Warm White
+    intensity: 75
+    schedule:
+    - 18:00-23:00
+    - 06:00-08:00
   location: Living Room
-  mode: Auto
-  targetTemperature: 22
-  thermostat: {}
-- color: Warm White
-  intensity: 75
-  light: {}
-  schedule:
-  - 18:00-23:00
-  - 06:00-08:00
-- camera: {}
-  enabled: true
-  recording: Motion Detection
-  storage: Cloud
+  thermostat:
+    mode: Auto
+    targetTemperature: 22
+- - Living Room
+  - Bedroom
+  - Kitchen
+  - Garage
 """
         self.assertEqual(output_data.strip(), expected_output.strip())
 
+    def test_bom(self):
+        """BOM в начале файла не мешает разбору."""
+        parser = ConfigParser()
+        parser.parse(io.StringIO("\ufeffdef x = 1;\nbegin a := ![x]; end"))
+        self.assertEqual(parser.output_data, [{"a": 1}])
+
+    def test_nested_values(self):
+        """Вложенные словари и массивы внутри массивов."""
+        parser = ConfigParser()
+        parser.parse(io.StringIO('begin a := #( 1, #( "x" ), begin b := false; end ); c := -2.5; end;'))
+        self.assertEqual(parser.output_data, [{"a": [1, ["x"], {"b": False}], "c": -2.5}])
+
+    def test_syntax_error_position(self):
+        """Ошибки сообщают строку и столбец."""
+        cases = [
+            ("begin\n    a := 1\n    b := 2;\nend", 3, 5),
+            ("def x = ;", 1, 9),
+            ("begin\n  a := ![missing];\nend", 2, 8),
+            ("begin a := 1; end\n{{!-- comment", 2, 1),
+            ("begin a := @; end", 1, 12),
+            ("begin a := 1;", 1, 14),
+        ]
+        for text, line, column in cases:
+            with self.subTest(text=text):
+                with self.assertRaises(ConfigSyntaxError) as context:
+                    ConfigParser().parse(io.StringIO(text))
+                self.assertEqual((context.exception.line, context.exception.column), (line, column))
+                self.assertIsInstance(context.exception, ValueError)
+
+    def test_chunked_tokenize(self):
+        """Разбиение потока на мелкие части не меняет лексемы и позиции ошибок."""
+        with open(self.input_file2, encoding="utf-8") as file:
+            text = file.read()
+        expected = [(t.kind, t.value, t.line, t.column) for t in tokenize(text)]
+        for chunk_size in (1, 3, 7):
+            with self.subTest(chunk_size=chunk_size):
+                tokens = [(t.kind, t.value, t.line, t.column) for t in tokenize(io.StringIO(text), chunk_size)]
+                self.assertEqual(tokens, expected)
+        with self.assertRaises(ConfigSyntaxError) as context:
+            list(tokenize(io.StringIO('begin a := "x";\n{{!-- comment'), chunk_size=2))
+        self.assertEqual((context.exception.line, context.exception.column), (2, 1))
+
+    def test_stream_to_yaml(self):
+        """Потоковая запись совпадает с обычной; при ошибке файл не изменяется."""
+        for input_file in (self.input_file1, self.input_file2):
+            parser = ConfigParser()
+            with open_file_with_encoding(input_file) as file:
+                parser.parse(file)
+            parser.save_to_yaml(self.output_file)
+            with open(self.output_file, encoding="utf-8") as yaml_file:
+                expected = yaml_file.read()
+            streaming = ConfigParser()
+            with open_file_with_encoding(input_file) as file:
+                streaming.stream_to_yaml(file, self.output_file)
+            with open(self.output_file, encoding="utf-8") as yaml_file:
+                self.assertEqual(yaml_file.read(), expected)
+            self.assertEqual(streaming.output_data, [])
+
+        with self.assertRaises(ConfigSyntaxError):
+            ConfigParser().stream_to_yaml(io.StringIO("begin a := 1; end\nbegin b := ; end"), self.output_file)
+        with open(self.output_file, encoding="utf-8") as yaml_file:
+            self.assertEqual(yaml_file.read(), expected)
+        self.assertFalse(os.path.exists(self.output_file + ".tmp"))
+
+    def test_compiled_cache(self):
+        """Неизменённый файл берётся из кэша без разбора, вывод не перезаписывается."""
+        with tempfile.TemporaryDirectory() as directory:
+            cache = CompiledCache(directory)
+            self.assertEqual(convert_file(self.input_file1, self.output_file, cache), (False, True))
+            with open(self.output_file, encoding="utf-8") as yaml_file:
+                expected = yaml_file.read()
+            with mock.patch.object(ConfigParser, "parse", side_effect=AssertionError("parsed again")):
+                self.assertEqual(convert_file(self.input_file1, self.output_file, cache), (True, False))
+            os.remove(self.output_file)
+            self.assertEqual(convert_file(self.input_file1, self.output_file, cache), (True, True))
+            with open(self.output_file, encoding="utf-8") as yaml_file:
+                self.assertEqual(yaml_file.read(), expected)
+            self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+            # Изменённый файл разбирается заново
+            with open(self.input_file1, "a", encoding="utf-8") as file:
+                file.write("begin extra := 1; end\n")
+            self.assertEqual(convert_file(self.input_file1, self.output_file, cache), (False, True))
+
+    def test_compiled_cache_eviction(self):
+        """Старые записи вытесняются сверх предельного размера, повреждённые игнорируются."""
+        with tempfile.TemporaryDirectory() as directory:
+            cache = CompiledCache(directory, max_size=150)
+            keys = [content_key(str(index).encode()) for index in range(3)]
+            for index, key in enumerate(keys):
+                cache.put(key, [{"value": "x" * 50, "index": index}])
+                os.utime(os.path.join(directory, key + ".marshal"), (index, index))
+            self.assertIsNone(cache.get(keys[0]))
+            self.assertEqual(cache.get(keys[2]), [{"value": "x" * 50, "index": 2}])
+
+            with open(os.path.join(directory, keys[2] + ".marshal"), "wb") as file:
+                file.write(b"broken")
+            self.assertIsNone(cache.get(keys[2]))
+
+    def test_batch(self):
+        """Пакетное преобразование в пуле процессов: порядок сохраняется, ошибки собираются."""
+        with tempfile.TemporaryDirectory() as directory:
+            bad_file = os.path.join(directory, "bad.txt")
+            with open(bad_file, "w", encoding="utf-8") as file:
+                file.write("begin\n  a := ;\nend")
+            files, errors = collect_files([self.input_file1, bad_file, directory, "missing*.txt"])
+            self.assertEqual(files, [(self.input_file1, None), (bad_file, None)])
+            self.assertEqual(errors, ["missing*.txt: нет подходящих файлов"])
+
+            jobs = [(input_file, output_path(input_file, base, directory)) for input_file, base in files]
+            jobs.append((self.input_file2, os.path.join(directory, "nested", "test_input2.yaml")))
+            results = run_batch(jobs, workers=2)
+            self.assertEqual([result.input_file for result in results], [self.input_file1, bad_file, self.input_file2])
+            self.assertEqual([result.error is None for result in results], [True, False, True])
+            self.assertIn("Строка 2, столбец 8", results[1].error)
+
+            parser = ConfigParser()
+            with open_file_with_encoding(self.input_file2) as file:
+                parser.parse(file)
+            parser.save_to_yaml(self.output_file)
+            with open(self.output_file, encoding="utf-8") as expected, \
+                    open(os.path.join(directory, "nested", "test_input2.yaml"), encoding="utf-8") as actual:
+                self.assertEqual(actual.read(), expected.read())
+
+    def test_detect_encoding(self):
+        """Кодировка определяется по байтам: BOM, начало файла как UTF-8, затем windows-1251 и latin1."""
+        text = "begin name := \"Привет\"; end"
+        self.assertEqual(detect_encoding(text.encode("utf-8-sig")), "utf-8-sig")
+        self.assertEqual(detect_encoding(text.encode("utf-16")), "utf-16")
+        self.assertEqual(detect_encoding(text.encode("utf-32")), "utf-32")
+        self.assertEqual(detect_encoding(text.encode("utf-8")), "utf-8")
+        self.assertEqual(detect_encoding(text.encode("cp1251")), "windows-1251")
+        self.assertEqual(detect_encoding(b"caf\xe9 \x98"), "latin1")
+        # Многобайтовый символ, оборванный на границе проверяемого префикса
+        data = "ab".encode("utf-8") + "П".encode("utf-8") * 10
+        self.assertEqual(detect_encoding(data, prefix_size=3), "utf-8")
+        self.assertEqual(detect_encoding(data[:3]), "windows-1251")
+
+        with open(self.input_file1, "wb") as file:
+            file.write(text.encode("cp1251"))
+        parser = ConfigParser()
+        with open_file_with_encoding(self.input_file1) as file:
+            parser.parse(file)
+        self.assertEqual(parser.output_data, [{"name": "Привет"}])
+
+    def test_mapped_input(self):
+        """Большие файлы отображаются в память и разбираются так же, как обычные."""
+        data = read_input(self.input_file2, mmap_threshold=0)
+        self.assertIsInstance(data, mmap.mmap)
+        parser = ConfigParser()
+        with wrap_text(data, detect_encoding(data)) as file:
+            parser.parse(file)
+        self.assertTrue(data.closed)
+        expected = ConfigParser()
+        with open(self.input_file2, encoding="utf-8") as file:
+            expected.parse(file)
+        self.assertEqual(parser.output_data, expected.output_data)
+
+        with open(self.output_file, "wb"):
+            pass
+        self.assertEqual(read_input(self.output_file, mmap_threshold=0), b"")
+
 
 if __name__ == "__main__":
     unittest.main()